@@ -0,0 +1,174 @@
+"""
+
+=====================================================
+
+File: bench_batch.py
+Headless batch benchmark for colorTaggingTool.batchFiles(), stand-in Maya
+
+* writes a small library of stand-in scene files to a temp directory
+* serial: workers=0, every file in this process
+* pool: spawned worker processes, start-up included, so it only pays
+  off with several CPUs and real mayapy start-up times
+* direct: the same library as Maya ASCII, rewritten by
+  colorTaggingFiles without opening a scene
+* fails when a file reports an error, or when a rewritten .ma scans
+  back with other colors than the rules give
+
+=====================================================
+
+Usage:
+* run from the repository root
+
+python benchmarks/bench_batch.py
+python benchmarks/bench_batch.py --files 32 --nodes 20000 --workers 4
+
+
+"""
+
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+import bench_core
+
+
+
+
+def writeLibrary(directory, files, nodes):
+	""" files stand-in scenes of nodes transforms each, returns their paths
+	"""
+	import fakescene
+
+	paths = []
+	for i in range(files):
+		fakescene.buildScene(nodes, selectAll=False, depth=4)
+
+		path = os.path.join(directory, 'asset{0:03d}.ma'.format(i))
+		fakescene.scene.save(path)
+		paths.append(path)
+
+	fakescene.scene.clear()
+	return paths
+
+
+
+
+def writeMaFile(path, nodes, depth=4):
+	""" Maya ASCII scene of nodes transforms, chains of depth, each with a curve shape
+	"""
+	with open(path, 'w') as f:
+		f.write('//Maya ASCII 2019 scene\n//Name: {0}\nrequires maya "2019";\n'.format(os.path.basename(path)))
+
+		for i in range(nodes):
+			name = 'node{0}'.format(i)
+
+			if i % depth:
+				f.write('createNode transform -n "{0}" -p "node{1}";\n'.format(name, i - 1))
+			else:
+				f.write('createNode transform -n "{0}";\n'.format(name))
+
+			f.write('\tsetAttr ".t" -type "double3" {0} 0 0 ;\n'.format(i))
+			if i % 3 == 0:
+				f.write('\tsetAttr ".ove" yes;\n\tsetAttr ".ovc" 6;\n')
+
+			f.write('createNode nurbsCurve -n "{0}Shape" -p "{0}";\n\tsetAttr -k off ".v";\n\tsetAttr ".cc" -type "nurbsCurve" \n\t\t1 1 0 no 3\n\t\t2 0 1\n\t\t2\n\t\t0 0 0\n\t\t1 0 0\n\t\t;\n'.format(name))
+
+		f.write('select -ne :time1;\n// End of {0}\n'.format(os.path.basename(path)))
+
+
+
+
+def writeMaLibrary(directory, files, nodes):
+	paths = []
+	for i in range(files):
+		path = os.path.join(directory, 'asset{0:03d}.ma'.format(i))
+		writeMaFile(path, nodes)
+		paths.append(path)
+
+	return paths
+
+
+
+
+def checkDirect(paths, rules):
+	""" scan the rewritten .ma files back, every transform has to show the colors its rules give it
+	"""
+	import colorTaggingFiles
+
+	for path in paths:
+		for longName, nodeType, values in colorTaggingFiles.scanMaFile(path):
+			expected = tuple(colorIndex or 0 for colorIndex in bench_core.referenceMatch(rules, longName, nodeType))
+			found = colorTaggingFiles.nodeColors(values)
+
+			bench_core.check(found == expected, "{0} {1} scanned as {2}, expected {3}".format(os.path.basename(path), longName, found, expected))
+
+
+
+
+def run(files=8, nodes=2000, workers=2, repeat=3, log=None):
+	""" timings of recoloring the library serially and in a pool, {'batch/...': seconds}
+	"""
+	bench_core.useFakeMaya()
+
+	import colorTaggingTool as ctool
+
+	rules = ctool.RuleSet()
+	rules.add('node1_*', outliner=17, wireframe=17)
+	rules.add('*3', wireframe=13)
+
+	directory = tempfile.mkdtemp(prefix='colorTaggingBatch')
+	maDirectory = tempfile.mkdtemp(prefix='colorTaggingBatchMa')
+	results = {}
+
+	try:
+		writeLibrary(directory, files, nodes)
+		maPaths = writeMaLibrary(maDirectory, files, nodes)
+
+		for name, path, count, direct in (('serial', directory, 0, False), ('pool', directory, workers, False), ('direct', maDirectory, 0, True)):
+			key = 'batch/{0}/{1}x{2}'.format(name, files, nodes)
+			results[key], fileResults = bench_core.timed(repeat, None, ctool.batchFiles, [path], rules, True, count, direct=direct)
+
+			failed = [result for result in fileResults if not result['ok']]
+			if failed:
+				raise RuntimeError("{0} failed: {1}".format(failed[0]['path'], failed[0]['error']))
+
+			if direct:
+				checkDirect(maPaths, rules)
+
+			if log:
+				log("{0:<50} {1:>10.2f} ms".format(key, results[key] * 1000))
+
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+		shutil.rmtree(maDirectory, ignore_errors=True)
+
+	return results
+
+
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="colorTaggingTool batch mode benchmark on the stand-in Maya")
+	parser.add_argument('--files', type=int, default=8)
+	parser.add_argument('--nodes', type=int, default=2000)
+	parser.add_argument('--workers', type=int, default=2)
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--json', action='store_true', help="print the results as JSON")
+	args = parser.parse_args(argv)
+
+	results = run(args.files, args.nodes, args.workers, args.repeat, None if args.json else print)
+
+	if args.json:
+		print(json.dumps(results, indent=2, sort_keys=True))
+
+	return 0
+
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,493 @@
+"""
+
+=====================================================
+
+File: bench_core.py
+Core benchmark of colorTaggingTool against the stand-in Maya
+
+* times getSelection, the four override functions and the dialog
+  click handlers on flat scenes of 1k to 1M transforms
+* results are checked next to the timings, a wrong answer raises
+  RuntimeError instead of giving a fast number
+* one tagging click is also split into its phases: selection,
+  state read, diff, write and refresh
+* the scene color index is timed for its full scan and for lookups
+* runs headless, the click handlers need PySide/PySide2 and use the
+  offscreen Qt platform, they are skipped when Qt is missing
+
+=====================================================
+
+Usage:
+* run from the repository root
+
+python benchmarks/bench_core.py
+python benchmarks/bench_core.py --scales 1000,10000,100000,1000000 --backends cmds
+
+
+"""
+
+
+import os
+import re
+import sys
+import gc
+import json
+import time
+import fnmatch
+import argparse
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+FAKE_MAYA = os.path.join(BENCH_DIR, 'fakemaya')
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+DEFAULT_BACKENDS = ['cmds', 'pymel']
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+
+
+def useFakeMaya():
+	""" put the stand-in maya / pymel and the tool first on sys.path
+	"""
+	for path in (REPO_ROOT, FAKE_MAYA):
+		if path in sys.path:
+			sys.path.remove(path)
+		sys.path.insert(0, path)
+
+
+
+
+def timed(repeat, setup, function, *args, **kwargs):
+	""" best of repeat runs of function, setup runs untimed before each one
+	"""
+	best = None
+	result = None
+
+	for i in range(repeat):
+		if setup:
+			setup()
+
+		start = _clock()
+		result = function(*args, **kwargs)
+		elapsed = _clock() - start
+
+		best = elapsed if best is None else min(best, elapsed)
+
+	return best, result
+
+
+
+
+def check(condition, message):
+	""" stop the run when a benchmarked call gave the wrong answer
+	"""
+	if not condition:
+		raise RuntimeError("result check failed: {0}".format(message))
+
+
+
+
+def sceneState(ctool, nodes):
+	""" {attr: [values]} of every SNAPSHOT_ATTRS plug of nodes, compares with ==
+	"""
+	state = ctool.getWriteBackend().read(nodes, ctool.SNAPSHOT_ATTRS)
+	return dict((attr, list(column)) for attr, column in state.columns.items())
+
+
+
+
+def sameColor(a, b):
+	return all(abs(x - y) < 1e-5 for x, y in zip(a, b))
+
+
+
+
+def referenceMatch(rules, node, nodeType='transform'):
+	""" (outliner, wireframe) of rules tried one by one with fnmatch / re, what RuleSet must agree with
+	"""
+	namespace, sep, name = node.rpartition('|')[2].rpartition(':')
+	result = []
+
+	for channel in ('outliner', 'wireframe'):
+		colorIndex = None
+
+		for rule in rules:
+			if rule.colorIndex(channel) is None:
+				continue
+
+			if rule.kind == 'regex':
+				hit = re.fullmatch(rule.pattern, name)
+			else:
+				text = {'glob': name, 'type': nodeType, 'namespace': namespace}[rule.kind]
+				hit = fnmatch.fnmatchcase(text, rule.pattern)
+
+			if hit:
+				colorIndex = rule.colorIndex(channel)
+				break
+
+		result.append(colorIndex)
+
+	return tuple(result)
+
+
+
+
+def checkRules(ctool):
+	""" the module docstring's rules and the regex cases the matcher must keep apart
+	"""
+	rules = ctool.RuleSet()
+	rules.add('*_CTL', outliner=17, wireframe=17)
+	rules.add('L_*', wireframe=6)
+	rules.add('joint', kind='type', wireframe=22)
+	rules.add(r'(?i)r_\w+_jnt', kind='regex', wireframe=13)
+	rules.add(r'(\w)\1_x', kind='regex', wireframe=9)
+	rules.add('L_', kind='regex', outliner=4)
+
+	expected = {
+			('|rig|arm_CTL', 'transform'): (17, 17),
+			('|rig|L_arm', 'transform'): (None, 6),
+			('|rig|ns:L_leg', 'transform'): (None, 6),
+			('|rig|L_', 'transform'): (4, 6),
+			('|rig|spine', 'joint'): (None, 22),
+			('|rig|R_arm_JNT', 'transform'): (None, 13),
+			('|rig|aa_x', 'transform'): (None, 9),
+			('|rig|ab_x', 'transform'): (None, None)
+		}
+
+	for (node, nodeType), colors in sorted(expected.items()):
+		check(rules.match(node, nodeType) == colors, "RuleSet.match({0!r}, {1!r}) gave {2}, expected {3}".format(node, nodeType, rules.match(node, nodeType), colors))
+		check(referenceMatch(rules, node, nodeType) == colors, "reference match of {0!r}".format(node))
+
+
+
+
+def benchPhases(ctool, fakescene, repeat):
+	""" one outliner + wireframe tagging click split into its phases
+	"""
+	results = {}
+	backend = ctool.getWriteBackend()
+
+	results['selection'], nodes = timed(repeat, None, ctool.getSelection)
+
+	plan = ctool.buildPlan(nodes, outliner=13, wireframe=17, skipUnchanged=False)
+	results['read'], state = timed(repeat, None, backend.read, plan.nodes(), plan.attrs())
+	results['diff'], diffed = timed(repeat, None, ctool.diffPlan, plan, state)
+	results['write'], unused = timed(repeat, fakescene.resetAttrs, ctool.applyPlan, diffed)
+
+	def chunked():
+		ctool.ChunkedApply(diffed).run()
+
+	results['chunkedWrite'], unused = timed(repeat, fakescene.resetAttrs, chunked)
+
+	def refresh():
+		ctool.refreshMayaUI(list=nodes)
+		fakescene.scene.runDeferred()
+
+	results['refresh'], unused = timed(repeat, None, refresh)
+
+	return results
+
+
+
+
+def benchFunctions(ctool, fakescene, repeat):
+	""" getSelection, the four override functions, each on a freshly reset scene, snapshots, the tag table, rules, RGB conversion, RGB palettes and stats
+	"""
+	results = {}
+	nodes = ctool.getSelection()
+
+	def colored():
+		fakescene.resetAttrs()
+		ctool.outlinerOverrideOn(nodes, 13)
+		ctool.wireframeOverrideOn(nodes, 17)
+
+	results['getSelection'], unused = timed(repeat, None, ctool.getSelection)
+	results['getSelectionHierarchy'], unused = timed(repeat, None, ctool.getSelection, hierarchy=True)
+	results['outlinerOverrideOn'], unused = timed(repeat, fakescene.resetAttrs, ctool.outlinerOverrideOn, nodes, 13)
+	outliner = sceneState(ctool, nodes)
+	check(all(outliner['useOutlinerColor']), "outlinerOverrideOn left nodes without outliner color")
+	check(sameColor(outliner['outlinerColor'][-3:], ctool.PALETTE.floats[13]), "outlinerOverrideOn wrote the wrong color")
+
+	results['outlinerOverrideOff'], unused = timed(repeat, colored, ctool.outlinerOverrideOff, nodes)
+	check(not any(sceneState(ctool, nodes)['useOutlinerColor']), "outlinerOverrideOff left outliner colors on")
+
+	results['wireframeOverrideOn'], unused = timed(repeat, fakescene.resetAttrs, ctool.wireframeOverrideOn, nodes, 17)
+	check(set(sceneState(ctool, nodes)['overrideColor']) == set([17]), "wireframeOverrideOn wrote the wrong index")
+
+	results['wireframeOverrideOff'], unused = timed(repeat, colored, ctool.wireframeOverrideOff, nodes)
+	check(not any(sceneState(ctool, nodes)['overrideEnabled']), "wireframeOverrideOff left overrides on")
+
+	# same color again, every write is skipped
+	results['reapplyUnchanged'], plan = timed(repeat, colored, ctool.tagNodes, nodes, 13, 17)
+	check(plan.writeCount() == 0, "reapplying the same colors wrote {0} plugs".format(plan.writeCount()))
+
+	# whole scene state to bytes and back onto a recolored scene, some nodes with RGB overrides
+	fakescene.resetAttrs()
+	ctool.outlinerOverrideOn(nodes[::3], 6)
+	ctool.wireframeOverrideOn(nodes[1::3], 22)
+	for node in nodes[2::7]:
+		fakescene.scene.nodes[node].attrs.update(overrideEnabled=True, overrideRGBColors=True, overrideColorRGB=(0.1, 0.2, 0.3))
+	before = sceneState(ctool, nodes)
+
+	results['snapshot'], shot = timed(repeat, None, lambda: ctool.ColorSnapshot.fromBytes(ctool.snapshot().toBytes()))
+	results['restore'], unused = timed(repeat, colored, ctool.restore, shot)
+	check(sceneState(ctool, nodes) == before, "snapshot -> recolor -> restore did not give the scene back")
+
+	# fileInfo tag table with every node tagged, rehydrated onto a scene that lost the tags
+	table = ctool.getTagTable()
+	colored()
+	tagged = sceneState(ctool, nodes)
+
+	results['tagTableSave'], unused = timed(repeat, colored, table.save)
+	results['tagTableRehydrate'], unused = timed(repeat, fakescene.resetAttrs, table.rehydrate)
+	check(sceneState(ctool, nodes) == tagged, "tag table rehydrate did not give the tags back")
+	fakescene.scene.fileInfo.clear()
+
+	# naming convention rules, a prefix, a suffix, a regex and a type rule
+	rules = ctool.RuleSet()
+	rules.add('node0_1*', outliner=17, wireframe=17)
+	rules.add('*5', wireframe=13)
+	rules.add(r'node0_\d*7$', 'regex', outliner=6)
+	rules.add('joint', 'type', wireframe=22)
+
+	results['rulesEvaluate'], evaluated = timed(repeat, None, rules.evaluate)
+	results['applyRules'], unused = timed(repeat, fakescene.resetAttrs, ctool.applyRules, rules)
+
+	checkRules(ctool)
+
+	# a sample of the scene against rules tried one at a time
+	colorOf = dict((channel, {}) for channel in rules.CHANNELS)
+	for channel, groups in evaluated.items():
+		for colorIndex, members in groups.items():
+			for node in members:
+				colorOf[channel][node] = colorIndex
+
+	for node in nodes[::max(1, len(nodes) // 20000)]:
+		found = (colorOf['outliner'].get(node), colorOf['wireframe'].get(node))
+		check(found == referenceMatch(rules, node), "rules.evaluate() colored {0} {1}, expected {2}".format(node, found, referenceMatch(rules, node)))
+
+	# the whole scene arriving at once, one node added callback each, then the idle flush
+	colorer = ctool.AutoColorer(rules)
+
+	def importScene():
+		for node in nodes:
+			colorer.enqueue([node])
+		fakescene.scene.runDeferred()
+
+	results['autoColorImport'], unused = timed(repeat, fakescene.resetAttrs, importScene)
+
+	# RGB overrides from another tool, 64 distinct colors, back to the nearest index
+	def rgbOverrides():
+		fakescene.resetAttrs()
+		for i, node in enumerate(fakescene.scene.nodes.values()):
+			node.attrs.update(overrideEnabled=True, overrideRGBColors=True, overrideColorRGB=((i % 4) / 3.0, (i // 4 % 4) / 3.0, (i // 16 % 4) / 3.0))
+
+	results['rgbToIndex'], unused = timed(repeat, rgbOverrides, ctool.rgbToIndex, nodes)
+
+	converted = sceneState(ctool, nodes)
+	expected = ctool.PALETTE.nearest([c for i in range(len(nodes)) for c in ((i % 4) / 3.0, (i // 4 % 4) / 3.0, (i // 16 % 4) / 3.0)])
+	check(not any(converted['overrideRGBColors']), "rgbToIndex left RGB overrides on")
+	check(converted['overrideColor'] == expected, "rgbToIndex picked other indices than Palette.nearest()")
+
+	# user RGB palette, both channels on every node in one plan
+	palette = ctool.Palette.fromJson(json.dumps(['#{0:06x}'.format(i * 0x030303 + 0x102030) for i in range(64)]))
+	results['tagNodesRGB'], unused = timed(repeat, fakescene.resetAttrs, ctool.tagNodes, nodes, 40, 40, palette=palette)
+
+	rgb = sceneState(ctool, nodes)
+	check(all(rgb['overrideRGBColors']), "RGB palette tag left index overrides")
+	check(sameColor(rgb['overrideColorRGB'][-3:], palette.floats[40]) and sameColor(rgb['outlinerColor'][-3:], palette.floats[40]), "RGB palette tag wrote the wrong color")
+
+	# same click as reapply with phase stats recording, the off case is every other timing
+	ctool.enableStats()
+	try:
+		results['tagNodesStats'], unused = timed(repeat, fakescene.resetAttrs, ctool.tagNodes, nodes, 13, 17)
+	finally:
+		ctool.enableStats(False)
+
+	return results
+
+
+
+
+def benchRig(ctool, fakescene, repeat):
+	""" wireframe color on a whole selected hierarchy, 8 levels deep, plain against minimal writes
+	rebuilds the scene, so it runs last
+	"""
+	fakescene.buildScene(len(fakescene.scene.nodes), depth=8)
+	gc.collect()
+	nodes = ctool.getSelection()
+
+	# few timings and a freshly built scene, best of a few more runs than the other groups
+	repeat = max(repeat, 5)
+
+	results = {}
+	results['wireframePlain'], unused = timed(repeat, fakescene.resetAttrs, ctool.wireframeOverrideOn, nodes, 17)
+	results['wireframeMinimal'], unused = timed(repeat, fakescene.resetAttrs, ctool.wireframeOverrideOn, nodes, 17, minimal=True)
+
+	return results
+
+
+
+
+def benchIndex(ctool, fakescene, repeat):
+	""" scene color index: one full scan, then lookups after a small recolor
+	"""
+	nodes = ctool.getSelection()
+	fakescene.resetAttrs()
+	ctool.tagNodes(nodes[::10], outliner=13, wireframe=17)
+
+	index = ctool.getColorIndex()
+
+	results = {}
+	results['build'], unused = timed(repeat, None, index.build)
+	results['lookup'], found = timed(repeat, None, ctool.nodesWithColor, 17)
+	check(sorted(found) == sorted(nodes[::10]), "index lookup found {0} nodes, expected {1}".format(len(found), len(nodes[::10])))
+
+	def recolor():
+		ctool.tagNodes(nodes[:100], wireframe=5)
+
+	results['lookupAfterRecolor'], found = timed(repeat, recolor, ctool.nodesWithColor, 5)
+	check(sorted(found) == sorted(nodes[:100]), "index lookup after a recolor found {0} nodes, expected {1}".format(len(found), len(nodes[:100])))
+
+	results['selectByColor'], found = timed(repeat, None, ctool.selectByColor, 17, False, True)
+	check(sorted(found) == sorted(set(nodes[::10]).difference(nodes[:100])), "selectByColor picked the wrong nodes")
+
+	# an unbuilt index costs the other benchmarks nothing
+	index.clear()
+
+	return results
+
+
+
+
+def _qtApplication():
+	""" offscreen QApplication, None when Qt is not installed
+	"""
+	os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+	try:
+		from PySide2 import QtWidgets
+	except ImportError:
+		try:
+			from PySide import QtGui as QtWidgets
+		except ImportError:
+			return None
+
+	return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+
+
+def clickSwatch(win, colorIndex):
+	""" click a palette swatch the way a user would
+	"""
+	win.taggingButtonGrp.button(colorIndex).click()
+
+
+
+
+def benchClicks(ctool, fakescene, repeat):
+	""" ColorTaggingUI click handlers, outliner and wireframe both enabled
+	"""
+	app = _qtApplication()
+	if app is None:
+		return None
+
+	win = ctool.ColorTaggingUI()
+	win.wireframeCheckbox.setChecked(True)
+
+	def click():
+		clickSwatch(win, 13)
+		fakescene.scene.runDeferred()
+
+	def disableAll():
+		win.disableAllBtn.click()
+		fakescene.scene.runDeferred()
+
+	results = {}
+	results['taggingButtonClicked'], unused = timed(repeat, fakescene.resetAttrs, click)
+	results['disableAllBtnClicked'], unused = timed(repeat, click, disableAll)
+
+	win.close()
+	return results
+
+
+
+
+def run(scales=None, backends=None, repeat=3, log=None):
+	""" run every benchmark, returns {'group/backend/scale/name': seconds}
+	"""
+	useFakeMaya()
+
+	import fakescene
+	import colorTaggingTool as ctool
+
+	results = {}
+	qtMissing = False
+
+	for backendName in backends or DEFAULT_BACKENDS:
+		ctool.setWriteBackend(backendName)
+
+		for scale in scales or DEFAULT_SCALES:
+			fakescene.buildScene(scale)
+
+			groups = [('phases', benchPhases), ('functions', benchFunctions), ('index', benchIndex)]
+			if not qtMissing:
+				groups.append(('ui', benchClicks))
+			groups.append(('rig', benchRig))
+
+			for group, bench in groups:
+				groupResults = bench(ctool, fakescene, repeat)
+
+				if groupResults is None:
+					qtMissing = True
+					if log:
+						log("skipping ui benchmarks, PySide / PySide2 not installed")
+					continue
+
+				for name, seconds in sorted(groupResults.items()):
+					key = '{0}/{1}/{2}/{3}'.format(group, backendName, scale, name)
+					results[key] = seconds
+
+					if log:
+						log("{0:<50} {1:>10.2f} ms".format(key, seconds * 1000))
+
+	ctool.setWriteBackend(None)
+	return results
+
+
+
+
+def parseScales(text):
+	return [int(float(scale)) for scale in text.split(',') if scale]
+
+
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="colorTaggingTool core benchmark on the stand-in Maya")
+	parser.add_argument('--scales', type=parseScales, default=DEFAULT_SCALES, help="comma separated node counts")
+	parser.add_argument('--backends', default=','.join(DEFAULT_BACKENDS), help="comma separated write backends")
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--json', action='store_true', help="print the results as JSON")
+	args = parser.parse_args(argv)
+
+	def log(message):
+		if not args.json:
+			print(message)
+
+	results = run(args.scales, args.backends.split(','), args.repeat, log)
+
+	if args.json:
+		print(json.dumps(results, indent=2, sort_keys=True))
+
+	return 0
+
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
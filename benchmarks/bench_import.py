@@ -0,0 +1,101 @@
+"""
+
+=====================================================
+
+File: bench_import.py
+Import-time benchmark for colorTaggingTool
+
+* imports the tool in fresh interpreters and reports the median time
+* fails if the import pulls in Qt, PyMEL or maya.mel
+
+=====================================================
+
+Usage:
+* run from the repository root, with python or mayapy
+
+python benchmarks/bench_import.py
+mayapy benchmarks/bench_import.py --repeat 20
+
+
+"""
+
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+# modules the plain import must not load
+HEAVY_MODULES = ['pymel', 'pymel.core', 'maya.mel', 'PySide', 'PySide2', 'shiboken', 'shiboken2', 'colorTaggingUI']
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# snippet run in each fresh interpreter, prints seconds and the heavy modules it found
+_PROBE = """
+import sys, time, json
+clock = getattr(time, 'perf_counter', time.time)
+start = clock()
+import colorTaggingTool
+elapsed = clock() - start
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+"""
+
+
+
+
+def measureImport(python=None, repeat=10):
+	""" import colorTaggingTool repeat times in fresh interpreters, returns a result dict
+	"""
+	python = python or sys.executable
+	env = dict(os.environ)
+	env['PYTHONPATH'] = os.pathsep.join([REPO_ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+
+	samples = []
+	loaded = set()
+	for i in range(repeat):
+		output = subprocess.check_output([python, '-c', _PROBE % (HEAVY_MODULES,)], env=env)
+		result = json.loads(output.decode('utf-8').strip().splitlines()[-1])
+		samples.append(result['seconds'])
+		loaded.update(result['loaded'])
+
+	samples.sort()
+
+	return {
+			'median': samples[len(samples) // 2],
+			'min': samples[0],
+			'max': samples[-1],
+			'repeat': repeat,
+			'heavyModules': sorted(loaded)
+		}
+
+
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="colorTaggingTool import-time benchmark")
+	parser.add_argument('--python', help="interpreter to import with, e.g. mayapy (default: this one)")
+	parser.add_argument('--repeat', type=int, default=10)
+	parser.add_argument('--json', action='store_true', help="print the result as JSON")
+	args = parser.parse_args(argv)
+
+	result = measureImport(args.python, args.repeat)
+
+	if args.json:
+		print(json.dumps(result, indent=2, sort_keys=True))
+	else:
+		print("import colorTaggingTool: median {0:.2f} ms (min {1:.2f}, max {2:.2f}, n={3})".format(
+			result['median'] * 1000, result['min'] * 1000, result['max'] * 1000, result['repeat']))
+
+	if result['heavyModules']:
+		print("FAIL: import loaded {0}".format(", ".join(result['heavyModules'])))
+		return 1
+
+	return 0
+
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+
+=====================================================
+
+File: bench_library.py
+Library index benchmark for colorTaggingFiles.LibraryIndex, no Maya needed
+
+* writes a library of Maya ASCII files to a temp directory, and the
+  same scenes as Maya Binary, 32 and 64 bit IFF
+* cold: first scan into an empty index, files read across a pool
+* warm: rescan with nothing changed, only stats and the index
+* query: files using a wireframe color on a name pattern
+* mb: scanMbFile() on one 64 bit file with bulky shape forms to skip
+* fails when the index does not find what the files hold or the .mb
+  reader disagrees with the .ma scanner
+* the .mb files here come from writeMbFile(), which shares MbReader's
+  layout assumptions; files saved by Maya go in fixtures/ as name.mb
+  with name.json, {"long name": [outliner, wireframe]}, and are
+  checked too
+
+=====================================================
+
+Usage:
+* run from the repository root
+
+python benchmarks/bench_library.py
+python benchmarks/bench_library.py --files 64 --nodes 5000 --workers 4
+
+
+"""
+
+
+import os
+import sys
+import json
+import struct
+import shutil
+import argparse
+import tempfile
+
+import bench_core
+import bench_batch
+
+
+# Maya saved .mb files and their expected colors
+FIXTURE_DIR = os.path.join(bench_core.BENCH_DIR, 'fixtures')
+
+
+
+
+def writeMbFile(path, nodes, depth=4, wide=True):
+	""" Maya Binary twin of bench_batch.writeMaFile(), FOR8 when wide else FOR4
+	"""
+	if wide:
+		group, header, align = b'FOR8', struct.Struct('>4s4xQ'), 8
+	else:
+		group, header, align = b'FOR4', struct.Struct('>4sI'), 4
+
+	def chunk(tag, payload):
+		padding = b'\0' * (-len(payload) % align)
+		return header.pack(tag, len(payload)) + payload + padding
+
+	def form(formType, children):
+		return chunk(group, formType + b'\0' * (align - 4) + b''.join(children))
+
+	def attr(tag, name, value):
+		return chunk(tag, b'.' + name + b'\0\0' + value)
+
+	def crea(name, parent=None):
+		return chunk(b'CREA', b'\0' + name.encode('ascii') + b'\0' + (parent.encode('ascii') + b'\0' if parent else b''))
+
+	forms = [form(b'HEAD', [chunk(b'VERS', b'2019\0')])]
+
+	for i in range(nodes):
+		name = 'node{0}'.format(i)
+
+		children = [crea(name, 'node{0}'.format(i - 1) if i % depth else None), attr(b'DBL3', b't', struct.pack('>3d', i, 0, 0))]
+		if i % 3 == 0:
+			children += [attr(b'DBLE', b'ove', struct.pack('>d', 1)), attr(b'DBLE', b'ovc', struct.pack('>d', 6))]
+		forms.append(form(b'XFRM', children))
+
+		# shape form with a chunk of curve data, only there to be skipped
+		forms.append(form(b'NCRV', [crea(name + 'Shape', name), attr(b'DBLE', b'ove', struct.pack('>d', 1)), chunk(b'CRVD', b'\x3f' * 512)]))
+
+	with open(path, 'wb') as f:
+		f.write(form(b'Maya', forms))
+
+
+
+
+def checkMbFixtures(log=None):
+	""" scanMbFile() on every fixture against its JSON, the only check of the layout against real files
+	"""
+	import colorTaggingFiles
+
+	paths = sorted(name for name in os.listdir(FIXTURE_DIR) if name.endswith('.mb')) if os.path.isdir(FIXTURE_DIR) else []
+
+	if not paths and log:
+		log("no Maya saved .mb fixtures, the .mb chunk layout is unverified")
+
+	for name in paths:
+		with open(os.path.join(FIXTURE_DIR, name[:-3] + '.json')) as f:
+			expected = dict((node, tuple(colors)) for node, colors in json.load(f).items())
+
+		found = dict((node, colorTaggingFiles.nodeColors(values)) for node, nodeType, values in colorTaggingFiles.scanMbFile(os.path.join(FIXTURE_DIR, name)))
+
+		for node, colors in sorted(expected.items()):
+			bench_core.check(found.get(node) == colors, "{0} {1} read as {2}, expected {3}".format(name, node, found.get(node), colors))
+
+
+
+
+def run(files=16, nodes=2000, workers=2, repeat=3, log=None):
+	""" timings of scanning and querying the library, {'library/...': seconds}
+	"""
+	bench_core.useFakeMaya()
+
+	import colorTaggingFiles
+
+	directory = tempfile.mkdtemp(prefix='colorTaggingLibrary')
+	indexPath = os.path.join(directory, 'library.db')
+	results = {}
+
+	def reset():
+		for suffix in ('', '-wal', '-shm'):
+			if os.path.exists(indexPath + suffix):
+				os.remove(indexPath + suffix)
+
+	def scan():
+		index = colorTaggingFiles.LibraryIndex(indexPath)
+		try:
+			return index.scan([directory], workers)
+		finally:
+			index.close()
+
+	try:
+		bench_batch.writeMaLibrary(directory, files, nodes)
+		size = '{0}x{1}'.format(files, nodes)
+
+		results['library/scanCold/' + size], stats = bench_core.timed(repeat, reset, scan)
+		results['library/scanWarm/' + size], warm = bench_core.timed(repeat, None, scan)
+
+		if stats['nodes'] != files * nodes or warm['scanned']:
+			raise RuntimeError("scan found {0} transforms, rescanned {1} files".format(stats['nodes'], warm['scanned']))
+
+		index = colorTaggingFiles.LibraryIndex(indexPath)
+		try:
+			results['library/query/' + size], found = bench_core.timed(max(repeat, 5), None, index.files, None, 6, 'node1*')
+		finally:
+			index.close()
+
+		if len(found) != files:
+			raise RuntimeError("query found {0} of {1} files".format(len(found), files))
+
+		maPath = os.path.join(directory, 'asset000.ma')
+		expected = colorTaggingFiles.scanMaFile(maPath)
+
+		for wide in (False, True):
+			mbPath = os.path.join(directory, 'mb', 'asset{0}.mb'.format(64 if wide else 32))
+			if not os.path.isdir(os.path.dirname(mbPath)):
+				os.makedirs(os.path.dirname(mbPath))
+			writeMbFile(mbPath, nodes, wide=wide)
+
+			if colorTaggingFiles.scanMbFile(mbPath) != expected:
+				raise RuntimeError("{0} does not match {1}".format(mbPath, maPath))
+
+		results['library/scanMb/' + str(nodes)], unused = bench_core.timed(max(repeat, 5), None, colorTaggingFiles.scanMbFile, mbPath)
+
+		checkMbFixtures(log)
+
+		if log:
+			for key in sorted(results):
+				log("{0:<50} {1:>10.2f} ms".format(key, results[key] * 1000))
+
+	finally:
+		shutil.rmtree(directory, ignore_errors=True)
+
+	return results
+
+
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="colorTaggingFiles library index benchmark")
+	parser.add_argument('--files', type=int, default=16)
+	parser.add_argument('--nodes', type=int, default=2000)
+	parser.add_argument('--workers', type=int, default=2)
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--json', action='store_true', help="print the results as JSON")
+	args = parser.parse_args(argv)
+
+	results = run(args.files, args.nodes, args.workers, args.repeat, None if args.json else print)
+
+	if args.json:
+		print(json.dumps(results, indent=2, sort_keys=True))
+
+	return 0
+
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
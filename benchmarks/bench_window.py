@@ -0,0 +1,128 @@
+"""
+
+=====================================================
+
+File: bench_window.py
+Window construction benchmark for colorTaggingUI, offscreen Qt
+
+* legacy: the old palette, 32 QPushButtons each with its own stylesheet
+* palette: the painted PaletteWidget that replaced it
+* window: a whole ColorTaggingUI, shown once so it is really laid out
+* runReused: ctool.run() when the window already exists
+* needs PySide or PySide2, prints a note and exits 0 without them
+
+=====================================================
+
+Usage:
+* run from the repository root
+
+python benchmarks/bench_window.py
+
+
+"""
+
+
+import os
+import sys
+import json
+import argparse
+
+import bench_core
+
+
+
+
+def legacyButtonGrid(qtWidgets, palette):
+	""" the palette as ColorTaggingUI built it before PaletteWidget
+	"""
+	widget = qtWidgets.QWidget()
+	grid = qtWidgets.QGridLayout(widget)
+	grid.setHorizontalSpacing(1)
+	grid.setVerticalSpacing(1)
+
+	group = qtWidgets.QButtonGroup(widget)
+
+	for colorIndex in range(32):
+		button = qtWidgets.QPushButton("")
+		button.setMinimumSize(20, 20)
+		button.setMaximumSize(20, 20)
+		button.setCheckable(1)
+
+		if colorIndex == 0:
+			button.setText("X")
+		else:
+			button.setStyleSheet('QPushButton {background-color: rgb(%d,%d,%d); color: white}' % palette.rgb[colorIndex])
+
+		group.addButton(button, colorIndex)
+		grid.addWidget(button, colorIndex // 8, colorIndex % 8)
+
+	return widget
+
+
+
+
+def run(repeat=10, log=None):
+	""" construction + first paint timings, {} when Qt is not installed
+	"""
+	bench_core.useFakeMaya()
+
+	app = bench_core._qtApplication()
+	if app is None:
+		if log:
+			log("skipping window benchmarks, PySide / PySide2 not installed")
+		return {}
+
+	import colorTaggingTool as ctool
+	import colorTaggingUI
+
+	qtWidgets = colorTaggingUI.qtToolInstance
+
+	def build(factory):
+		widget = factory()
+		widget.grab()
+		widget.close()
+		widget.deleteLater()
+		app.processEvents()
+
+	results = {}
+	results['window/legacyButtonGrid'], unused = bench_core.timed(repeat, None, build, lambda: legacyButtonGrid(qtWidgets, ctool.PALETTE))
+	results['window/paletteWidget'], unused = bench_core.timed(repeat, None, build, lambda: colorTaggingUI.PaletteWidget(ctool.PALETTE))
+	results['window/colorTaggingUI'], unused = bench_core.timed(repeat, None, build, colorTaggingUI.ColorTaggingUI)
+
+	# run() once the window exists, what a hotkey costs after the first call
+	def showAgain():
+		ctool.run()
+		app.processEvents()
+
+	ctool.run()
+	results['window/runReused'], unused = bench_core.timed(repeat, None, showAgain)
+	colorTaggingUI.deleteWindow(ctool.win)
+	ctool.win = None
+
+	if log:
+		for name, seconds in sorted(results.items()):
+			log("{0:<50} {1:>10.2f} ms".format(name, seconds * 1000))
+
+	return results
+
+
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="colorTaggingUI window construction benchmark")
+	parser.add_argument('--repeat', type=int, default=10)
+	parser.add_argument('--json', action='store_true', help="print the results as JSON")
+	args = parser.parse_args(argv)
+
+	results = run(args.repeat, None if args.json else print)
+
+	if args.json:
+		print(json.dumps(results, indent=2, sort_keys=True))
+
+	return 0
+
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
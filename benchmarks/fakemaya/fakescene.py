@@ -0,0 +1,259 @@
+"""
+
+=====================================================
+
+File: fakescene.py
+In-memory scene shared by the stand-in maya.cmds / maya.mel / pymel.core
+
+* Only what colorTaggingTool touches is modelled: transforms, their
+  override attributes, the selection and the deferred-eval queue
+* Nodes are keyed by long DAG path, short names are the last path part
+
+=====================================================
+
+"""
+
+
+import json
+import uuid as _uuid
+
+
+# attribute defaults of a freshly created transform
+TRANSFORM_DEFAULTS = {
+			'useOutlinerColor':False,
+			'outlinerColor':(0.0, 0.0, 0.0),
+			'overrideEnabled':False,
+			'overrideRGBColors':False,
+			'overrideColor':0,
+			'overrideColorRGB':(0.0, 0.0, 0.0)
+		}
+
+# short attribute names Maya accepts for the override attributes
+SHORT_ATTR_NAMES = {
+			'uoc':'useOutlinerColor',
+			'oclr':'outlinerColor',
+			'ove':'overrideEnabled',
+			'ovrgbf':'overrideRGBColors',
+			'ovc':'overrideColor',
+			'ovrgb':'overrideColorRGB'
+		}
+
+
+
+class FakeNode(object):
+	""" one scene node, attributes live in a plain dict
+	"""
+
+	__slots__ = ('name', 'type', 'uuid', 'attrs')
+
+
+	def __init__(self, name, nodeType='transform', attrs=None):
+		self.name = name
+		self.type = nodeType
+		self.uuid = str(_uuid.uuid4()).upper()
+		self.attrs = dict(TRANSFORM_DEFAULTS)
+
+		if attrs:
+			self.attrs.update(attrs)
+
+
+
+	def shortName(self):
+		return self.name.rsplit('|', 1)[-1]
+
+
+
+
+class FakeScene(object):
+	""" node table, selection and deferred queue of the stand-in session
+	"""
+
+	def __init__(self):
+		self.clear()
+
+
+
+	def clear(self):
+		self.nodes = {}
+		self.byShortName = {}
+		self.byUuid = {}
+		self.selection = []
+		self.deferred = []
+		self.undoChunks = 0
+		self.fileInfo = {}
+		self.optionVars = {}
+		self.currentFile = ''
+
+
+
+	def createNode(self, name, nodeType='transform', parent=None, attrs=None):
+		""" add a node, returns its long name
+		"""
+		longName = '{0}|{1}'.format(parent or '', name)
+		node = FakeNode(longName, nodeType, attrs)
+
+		self.nodes[longName] = node
+		self.byShortName.setdefault(name, []).append(longName)
+		self.byUuid[node.uuid] = longName
+
+		return longName
+
+
+
+	def deleteNode(self, longName):
+		""" remove a node and everything below it
+		"""
+		for name in [n for n in self.nodes if n == longName or n.startswith(longName + '|')]:
+			node = self.nodes.pop(name)
+			self.byShortName[node.shortName()].remove(name)
+			del self.byUuid[node.uuid]
+
+		self.selection = [n for n in self.selection if n in self.nodes]
+
+
+
+	def resolve(self, name):
+		""" long names matching a long name, short name, partial path or UUID
+		"""
+		if name in self.nodes:
+			return [name]
+
+		if name in self.byUuid:
+			return [self.byUuid[name]]
+
+		leaf = name.rsplit('|', 1)[-1]
+		return [n for n in self.byShortName.get(leaf, []) if n.endswith('|' + name.lstrip('|'))]
+
+
+
+	def node(self, name):
+		""" the single node called name, raises like Maya for missing or ambiguous names
+		"""
+		matches = self.resolve(name)
+
+		if len(matches) != 1:
+			raise ValueError("No object matches name: {0}".format(name) if not matches else "More than one object matches name: {0}".format(name))
+
+		return self.nodes[matches[0]]
+
+
+
+	def children(self, longName):
+		""" long names of the direct children of longName
+		"""
+		prefix = longName + '|'
+		return [n for n in self.nodes if n.startswith(prefix) and '|' not in n[len(prefix):]]
+
+
+
+	def descendants(self, longNames):
+		""" longNames followed by everything below them, depth first, each node once
+		"""
+		childMap = {}
+		for name in self.nodes:
+			childMap.setdefault(name.rsplit('|', 1)[0], []).append(name)
+
+		result = []
+		seen = set()
+		stack = list(reversed(longNames))
+
+		while stack:
+			name = stack.pop()
+			if name in seen:
+				continue
+
+			seen.add(name)
+			result.append(name)
+			stack.extend(reversed(childMap.get(name, [])))
+
+		return result
+
+
+
+	def save(self, path):
+		""" write the scene to path, the stand-in scene file is JSON whatever the extension
+		"""
+		nodes = [[node.name, node.type, node.uuid, node.attrs] for node in self.nodes.values()]
+
+		with open(path, 'w') as f:
+			json.dump({'nodes': nodes, 'fileInfo': self.fileInfo}, f)
+
+		self.currentFile = path
+
+
+
+	def load(self, path):
+		""" replace the scene with the one saved at path
+		"""
+		with open(path) as f:
+			data = json.load(f)
+
+		self.clear()
+
+		for name, nodeType, uuid, attrs in data['nodes']:
+			parent, sep, shortName = name.rpartition('|')
+			longName = self.createNode(shortName, nodeType, parent, dict((attr, tuple(value) if isinstance(value, list) else value) for attr, value in attrs.items()))
+
+			node = self.nodes[longName]
+			del self.byUuid[node.uuid]
+			node.uuid = uuid
+			self.byUuid[uuid] = longName
+
+		self.fileInfo = data.get('fileInfo', {})
+		self.currentFile = path
+
+
+
+	def runDeferred(self):
+		""" run everything queued with evalDeferred, like Maya does when it goes idle
+		"""
+		while self.deferred:
+			queued = self.deferred
+			self.deferred = []
+
+			for callback in queued:
+				if callable(callback):
+					callback()
+
+
+
+
+# the session scene, imported by every stand-in module
+scene = FakeScene()
+
+
+
+
+def buildScene(count, selectAll=True, depth=1):
+	""" fill the scene with count transforms spread over depth levels, returns their long names
+	"""
+	scene.clear()
+
+	names = []
+	parents = [None]
+
+	for level in range(depth):
+		levelCount = count // depth if level < depth - 1 else count - len(names)
+		perParent = max(1, levelCount // len(parents))
+		levelNames = []
+
+		for i in range(levelCount):
+			parent = parents[min(i // perParent, len(parents) - 1)]
+			levelNames.append(scene.createNode('node{0}_{1}'.format(level, i), parent=parent))
+
+		names.extend(levelNames)
+		parents = levelNames
+
+	if selectAll:
+		scene.selection = list(names)
+
+	return names
+
+
+
+
+def resetAttrs():
+	""" put every node back to the transform defaults
+	"""
+	for node in scene.nodes.values():
+		node.attrs.update(TRANSFORM_DEFAULTS)
@@ -0,0 +1,11 @@
+"""
+stand-in maya.OpenMayaUI, there is no Maya main window to parent to
+"""
+
+
+
+class MQtUtil(object):
+
+	@staticmethod
+	def mainWindow():
+		return None
@@ -0,0 +1,3 @@
+"""
+stand-in maya package for running colorTaggingTool benchmarks outside Maya
+"""
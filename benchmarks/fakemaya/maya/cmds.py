@@ -0,0 +1,277 @@
+"""
+
+=====================================================
+
+File: maya/cmds.py
+Stand-in maya.cmds backed by fakescene.scene
+
+* Implements the flags colorTaggingTool uses, nothing more
+* Values come back in the same shapes Maya returns them
+
+=====================================================
+
+"""
+
+
+from fakescene import scene, SHORT_ATTR_NAMES
+
+
+
+
+# node types ls -type also finds through their base type
+_BASE_TYPES = {'joint': 'transform'}
+
+
+
+
+def _names(args):
+	""" flatten string / list positional arguments
+	"""
+	names = []
+
+	for arg in args:
+		if isinstance(arg, (list, tuple)):
+			names.extend(arg)
+		elif arg is not None:
+			names.append(arg)
+
+	return names
+
+
+
+
+def ls(*args, **kwargs):
+	selection = kwargs.get('sl') or kwargs.get('selection')
+	nodeType = kwargs.get('type') or kwargs.get('typ')
+	longNames = kwargs.get('long') or kwargs.get('l')
+
+	# like Maya, an empty object list counts as no objects and lists the whole scene
+	objects = _names(args)
+
+	if selection:
+		names = list(scene.selection)
+	elif objects:
+		names = []
+		for name in objects:
+			names.extend(scene.resolve(name))
+	else:
+		names = list(scene.nodes)
+
+	if kwargs.get('dag'):
+		names = scene.descendants(names)
+
+	if nodeType:
+		types = nodeType if isinstance(nodeType, (list, tuple)) else [nodeType]
+		names = [n for n in names if scene.nodes[n].type in types or _BASE_TYPES.get(scene.nodes[n].type) in types]
+
+	if kwargs.get('uuid'):
+		return [scene.nodes[n].uuid for n in names]
+
+	if not longNames:
+		names = [scene.nodes[n].shortName() if len(scene.byShortName[scene.nodes[n].shortName()]) == 1 else n for n in names]
+
+	if kwargs.get('showType'):
+		typed = []
+		for name in names:
+			typed.extend([name, scene.node(name).type])
+		return typed
+
+	return names
+
+
+
+
+def select(*args, **kwargs):
+	names = []
+	for name in _names(args):
+		names.extend(scene.resolve(name))
+
+	if kwargs.get('clear') or kwargs.get('cl'):
+		scene.selection = []
+	elif kwargs.get('add'):
+		scene.selection.extend(n for n in names if n not in scene.selection)
+	else:
+		scene.selection = names
+
+
+
+
+def _plug(plug):
+	node, attr = plug.rsplit('.', 1)
+	return scene.node(node), SHORT_ATTR_NAMES.get(attr, attr)
+
+
+
+
+def getAttr(plug, **kwargs):
+	node, attr = _plug(plug)
+	value = node.attrs[attr]
+
+	if isinstance(value, tuple):
+		return [value]
+
+	return value
+
+
+
+
+def setAttr(plug, *values, **kwargs):
+	node, attr = _plug(plug)
+
+	if attr not in node.attrs:
+		raise RuntimeError("No attribute '{0}'".format(plug))
+
+	if len(values) == 1:
+		value = values[0]
+		node.attrs[attr] = tuple(value) if isinstance(value, (list, tuple)) else value
+	else:
+		node.attrs[attr] = tuple(float(v) for v in values)
+
+
+
+
+def objExists(name):
+	return bool(scene.resolve(name))
+
+
+
+
+def undoInfo(**kwargs):
+	if kwargs.get('openChunk'):
+		scene.undoChunks += 1
+	elif kwargs.get('closeChunk'):
+		scene.undoChunks -= 1
+
+	return True
+
+
+
+
+def pluginInfo(name, **kwargs):
+	return False
+
+
+
+
+def loadPlugin(path, **kwargs):
+	raise RuntimeError("Plug-ins are not supported by the stand-in Maya: {0}".format(path))
+
+
+
+
+def evalDeferred(callback, **kwargs):
+	scene.deferred.append(callback)
+
+
+
+
+def refresh(**kwargs):
+	pass
+
+
+
+
+def getPanel(**kwargs):
+	if kwargs.get('type') == 'outlinerPanel':
+		return ['outlinerPanel1']
+
+	if kwargs.get('withFocus'):
+		return 'modelPanel4'
+
+	if kwargs.get('typeOf'):
+		return kwargs['typeOf'].rstrip('0123456789')
+
+	if kwargs.get('visiblePanels'):
+		return ['modelPanel4', 'outlinerPanel1']
+
+	return []
+
+
+
+
+def isolateSelect(panel, **kwargs):
+	pass
+
+
+
+
+def outlinerEditor(panel, **kwargs):
+	pass
+
+
+
+
+def file(*args, **kwargs):
+	if kwargs.get('open') or kwargs.get('o'):
+		scene.load(args[0])
+		return args[0]
+
+	if kwargs.get('rename') or kwargs.get('rn'):
+		scene.currentFile = kwargs.get('rename') or kwargs.get('rn')
+		return scene.currentFile
+
+	if kwargs.get('save') or kwargs.get('s'):
+		if not scene.currentFile:
+			raise RuntimeError("Scene has not been saved yet")
+		scene.save(scene.currentFile)
+		return scene.currentFile
+
+	if kwargs.get('new') or kwargs.get('n'):
+		scene.clear()
+		return 'untitled'
+
+	if kwargs.get('q') or kwargs.get('query'):
+		if kwargs.get('sceneName') or kwargs.get('sn'):
+			return scene.currentFile
+
+	return None
+
+
+
+
+def fileInfo(*args, **kwargs):
+	if kwargs.get('q') or kwargs.get('query'):
+		return [scene.fileInfo[args[0]]] if args[0] in scene.fileInfo else []
+
+	remove = kwargs.get('remove') or kwargs.get('rm')
+	if remove:
+		scene.fileInfo.pop(remove, None)
+
+	elif len(args) == 2:
+		scene.fileInfo[args[0]] = args[1]
+
+
+
+
+def optionVar(**kwargs):
+	if 'exists' in kwargs:
+		return kwargs['exists'] in scene.optionVars
+
+	if 'q' in kwargs:
+		return scene.optionVars.get(kwargs['q'], 0)
+
+	for flag in ('intValue', 'stringValue', 'floatValue'):
+		if flag in kwargs:
+			key, value = kwargs[flag]
+			scene.optionVars[key] = value
+
+
+
+
+def workspaceControl(name, **kwargs):
+	return False
+
+
+
+
+def deleteUI(*args, **kwargs):
+	pass
+
+
+
+
+def about(**kwargs):
+	if kwargs.get('batch'):
+		return True
+
+	return ''
@@ -0,0 +1,36 @@
+"""
+
+=====================================================
+
+File: maya/mel.py
+Stand-in maya.mel, answers the few MEL snippets colorTaggingTool evaluates
+
+=====================================================
+
+"""
+
+
+import re
+
+
+# procs defined through eval('global proc ...')
+_procs = set(['autoUpdateAttrEd', 'AEdagNodeCommonRefreshOutliners'])
+
+_PROC_RE = re.compile(r'global\s+proc\s+\S+\s+(\w+)\s*\(')
+
+
+
+
+def eval(command):
+	command = command.strip()
+
+	for name in _PROC_RE.findall(command):
+		_procs.add(name)
+
+	if command.startswith('exists '):
+		return int(command.split()[1] in _procs)
+
+	if command.startswith('colorTaggingAECurrentTab'):
+		return ''
+
+	return None
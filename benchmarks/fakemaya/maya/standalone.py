@@ -0,0 +1,14 @@
+"""
+stand-in maya.standalone, the stand-in scene needs no startup
+"""
+
+
+
+def initialize(name='python'):
+	pass
+
+
+
+
+def uninitialize():
+	pass
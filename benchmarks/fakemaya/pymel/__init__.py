@@ -0,0 +1,3 @@
+"""
+stand-in pymel package for running colorTaggingTool benchmarks outside Maya
+"""
@@ -0,0 +1,71 @@
+"""
+
+=====================================================
+
+File: pymel/core.py
+Stand-in pymel.core with PyNode / Attribute on top of fakescene.scene
+
+=====================================================
+
+"""
+
+
+from fakescene import scene, SHORT_ATTR_NAMES
+
+
+
+class Attribute(object):
+
+	def __init__(self, node, attr):
+		self.node = node
+		self.attrName = SHORT_ATTR_NAMES.get(attr, attr)
+
+
+
+	def get(self):
+		return self.node.attrs[self.attrName]
+
+
+
+	def set(self, *values):
+		value = values[0] if len(values) == 1 else values
+		self.node.attrs[self.attrName] = tuple(value) if isinstance(value, (list, tuple)) else value
+
+
+
+
+class PyNode(object):
+
+	def __init__(self, name):
+		self.node = scene.node(name)
+
+
+
+	def attr(self, name):
+		return Attribute(self.node, name)
+
+
+
+	def __getattr__(self, name):
+		if name in self.node.attrs or name in SHORT_ATTR_NAMES:
+			return Attribute(self.node, name)
+
+		raise AttributeError(name)
+
+
+
+	def __str__(self):
+		return self.node.shortName()
+
+
+
+	def longName(self):
+		return self.node.name
+
+
+
+
+def selected(**kwargs):
+	nodeType = kwargs.get('typ') or kwargs.get('type')
+
+	return [PyNode(n) for n in scene.selection if not nodeType or scene.nodes[n].type == nodeType]
@@ -0,0 +1,143 @@
+"""
+
+=====================================================
+
+File: run.py
+Runs the colorTaggingTool benchmarks and checks them against baseline.json
+
+* bench_core.py timings on the stand-in Maya plus the import time
+  from bench_import.py and, when Qt is installed, the window
+  construction times from bench_window.py, the batch mode times
+  from bench_batch.py and the library index times from bench_library.py
+* exits with 1 when a timing is slower than its baseline by more than
+  the tolerance factor (and the absolute floor, to ignore jitter on
+  sub-millisecond timings)
+* baselines are machine specific, refresh them with --update-baseline
+  on the machine that runs the check
+
+=====================================================
+
+Usage:
+* run from the repository root
+
+python benchmarks/run.py
+python benchmarks/run.py --update-baseline
+python benchmarks/run.py --scales 1000,10000 --tolerance 2.0
+
+
+"""
+
+
+import os
+import sys
+import json
+import argparse
+
+import bench_core
+import bench_batch
+import bench_import
+import bench_library
+import bench_window
+
+
+BASELINE_PATH = os.path.join(bench_core.BENCH_DIR, 'baseline.json')
+
+
+
+
+def collect(scales, backends, repeat, log=None):
+	""" timings of every benchmark, {'name': seconds}
+	"""
+	results = bench_core.run(scales, backends, repeat, log)
+	results.update(bench_window.run(log=log))
+	results.update(bench_batch.run(repeat=repeat, log=log))
+	results.update(bench_library.run(repeat=repeat, log=log))
+
+	importResult = bench_import.measureImport(repeat=max(repeat, 5))
+	results['import/colorTaggingTool'] = importResult['median']
+
+	if log:
+		log("{0:<50} {1:>10.2f} ms".format('import/colorTaggingTool', importResult['median'] * 1000))
+
+	if importResult['heavyModules']:
+		raise RuntimeError("import loaded {0}".format(", ".join(importResult['heavyModules'])))
+
+	return results
+
+
+
+
+def compare(results, baseline, tolerance, floor):
+	""" names of results slower than baseline * tolerance + floor, with both timings
+	"""
+	regressions = []
+
+	for name, seconds in sorted(results.items()):
+		reference = baseline.get(name)
+
+		if reference is not None and seconds > reference * tolerance + floor:
+			regressions.append((name, reference, seconds))
+
+	return regressions
+
+
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="colorTaggingTool benchmarks with baseline check")
+	parser.add_argument('--scales', type=bench_core.parseScales, default=bench_core.DEFAULT_SCALES)
+	parser.add_argument('--backends', default=','.join(bench_core.DEFAULT_BACKENDS))
+	parser.add_argument('--repeat', type=int, default=3)
+	parser.add_argument('--baseline', default=BASELINE_PATH)
+	parser.add_argument('--tolerance', type=float, default=1.5, help="allowed slowdown factor")
+	parser.add_argument('--floor', type=float, default=0.005, help="allowed slowdown in seconds on top of the factor")
+	parser.add_argument('--update-baseline', action='store_true', help="write the results as the new baseline")
+	parser.add_argument('--output', help="also write the results to this JSON file")
+	args = parser.parse_args(argv)
+
+	results = collect(args.scales, args.backends.split(','), args.repeat, log=print)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(results, f, indent=2, sort_keys=True)
+
+	if args.update_baseline:
+		baseline = {}
+		if os.path.exists(args.baseline):
+			with open(args.baseline) as f:
+				baseline = json.load(f)
+
+		baseline.update(results)
+		with open(args.baseline, 'w') as f:
+			json.dump(baseline, f, indent=2, sort_keys=True)
+			f.write('\n')
+
+		print("baseline updated: {0}".format(args.baseline))
+		return 0
+
+	if not os.path.exists(args.baseline):
+		print("no baseline at {0}, run with --update-baseline first".format(args.baseline))
+		return 1
+
+	with open(args.baseline) as f:
+		baseline = json.load(f)
+
+	missing = [name for name in results if name not in baseline]
+	if missing:
+		print("{0} timings have no baseline yet: {1}".format(len(missing), ", ".join(sorted(missing))))
+
+	regressions = compare(results, baseline, args.tolerance, args.floor)
+	for name, reference, seconds in regressions:
+		print("REGRESSION {0}: {1:.2f} ms -> {2:.2f} ms".format(name, reference * 1000, seconds * 1000))
+
+	if regressions:
+		return 1
+
+	print("no regressions against {0}".format(args.baseline))
+	return 0
+
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
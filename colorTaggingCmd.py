@@ -0,0 +1,160 @@
+"""
+
+=====================================================
+
+File: colorTaggingCmd.py
+Maya plugin registering the undoable colorTag command
+
+* Loaded automatically by colorTaggingTool.applyPlan(), no need to
+  put it on MAYA_PLUG_IN_PATH
+* A whole batch is one undo step, undo/redo replay compact
+  before/after arrays through one MDGModifier
+
+Copyright (C) 2019 Yinglei Yang www.ying-lei.com
+
+=====================================================
+
+Usage:
+* MEL, colorIndex 0 turns a channel off, objects default to the selection
+
+colorTag -outliner 13 -wireframe 17 pCube1 pCube2;
+colorTag -wireframe 0;
+
+* Python
+
+mc.colorTag('pCube1', outliner=13)
+
+
+"""
+
+
+import maya.api.OpenMaya as om
+
+import colorTaggingTool as ctool
+
+
+
+
+def maya_useNewAPI():
+	""" tells Maya this plugin uses the Python API 2.0
+	"""
+	pass
+
+
+
+
+class ColorTagCommand(om.MPxCommand):
+	""" colorTag command, keeps the override state before and after the write for undo
+	"""
+
+	kCmdName = ctool.COMMAND_NAME
+
+	kOutlinerFlag = '-o'
+	kOutlinerLongFlag = '-outliner'
+	kWireframeFlag = '-w'
+	kWireframeLongFlag = '-wireframe'
+
+
+	def __init__(self):
+		om.MPxCommand.__init__(self)
+
+		self._before = None
+		self._after = None
+
+
+
+	@staticmethod
+	def creator():
+		return ColorTagCommand()
+
+
+
+	@staticmethod
+	def createSyntax():
+		syntax = om.MSyntax()
+		syntax.addFlag(ColorTagCommand.kOutlinerFlag, ColorTagCommand.kOutlinerLongFlag, om.MSyntax.kLong)
+		syntax.addFlag(ColorTagCommand.kWireframeFlag, ColorTagCommand.kWireframeLongFlag, om.MSyntax.kLong)
+		# string objects ignore useSelectionAsDefault, a selection list picks up the active one
+		syntax.setObjectType(om.MSyntax.kSelectionList)
+		syntax.useSelectionAsDefault(True)
+
+		return syntax
+
+
+
+	def isUndoable(self):
+		return True
+
+
+
+	def doIt(self, args):
+		""" take the plan queued by applyPlan(), or build one from the flags
+		"""
+		plan = ctool.takePendingPlan()
+
+		if plan is None:
+			plan = self.planFromArgs(args)
+
+		# modifier writes stay out of the undo queue, this command is the only entry
+		backend = ctool.OpenMayaWriteBackend()
+
+		# diffPlan() already read the plugs, only reread when it didn't run
+		if plan.before is not None:
+			self._before = plan.before
+		else:
+			self._before = backend.read(plan.nodes(), plan.attrs())
+		self._after = self._before.copy()
+		self._after.applyPlan(plan)
+
+		# ChunkedApply already wrote the plan, only the undo record is missing
+		if not plan.applied:
+			backend.write(plan)
+
+		self.setResult(plan.writeCount())
+
+
+
+	def redoIt(self):
+		ctool.OpenMayaWriteBackend().write(self._after.toPlan())
+
+
+
+	def undoIt(self):
+		ctool.OpenMayaWriteBackend().write(self._before.toPlan())
+
+
+
+	def planFromArgs(self, args):
+		""" WritePlan for the -outliner / -wireframe flags on the given or selected transforms
+		"""
+		argData = om.MArgDatabase(self.syntax(), args)
+
+		outliner = None
+		if argData.isFlagSet(self.kOutlinerFlag):
+			outliner = argData.flagArgumentInt(self.kOutlinerFlag, 0)
+
+		wireframe = None
+		if argData.isFlagSet(self.kWireframeFlag):
+			wireframe = argData.flagArgumentInt(self.kWireframeFlag, 0)
+
+		selection = argData.getObjectList()
+		names = selection.getSelectionStrings() if selection.length() else []
+
+		# ls lists the whole scene for an empty list
+		nodes = ctool.mc.ls(names, type='transform', long=True) or [] if names else []
+
+		return ctool.buildPlan(nodes, outliner, wireframe)
+
+
+
+
+def initializePlugin(plugin):
+	pluginFn = om.MFnPlugin(plugin, 'Yinglei Yang', '1.0')
+	pluginFn.registerCommand(ColorTagCommand.kCmdName, ColorTagCommand.creator, ColorTagCommand.createSyntax)
+
+
+
+
+def uninitializePlugin(plugin):
+	pluginFn = om.MFnPlugin(plugin)
+	pluginFn.deregisterCommand(ColorTagCommand.kCmdName)
@@ -0,0 +1,834 @@
+"""
+
+=====================================================
+
+File: colorTaggingFiles.py
+Color tags written straight into Maya ASCII files, no Maya needed
+
+* Streams the file line by line in binary, memory stays flat however
+  big the scene is, lines that are not touched go out byte for byte
+* Edits the .uoc / .oclr / .ove / .ovrgbf / .ovc setAttr lines of the
+  matching createNode transform blocks, adds the missing ones at the
+  end of the block; flags such as -k are kept, locked (-l on) values
+  are left alone and counted as skipped, as setAttr in Maya would
+* Writes a temp file next to the original and swaps it in, an
+  interrupted run leaves the original untouched
+* LibraryIndex scans a whole library of .ma files across a process
+  pool into SQLite, keyed by path, mtime and size
+* .mb files are read by MbReader, an IFF chunk walker over a memory
+  map that steps over every form that is not a transform by its length
+* the .mb attribute chunk layout (CREA flag byte, value at the chunk
+  end) is not verified against files saved by Maya yet, drop one in
+  benchmarks/fixtures with its expected colors to check it
+
+Copyright (C) 2019 Yinglei Yang www.ying-lei.com
+
+=====================================================
+
+Usage:
+* rules pick the nodes by name, type or namespace, tags by long or short name
+
+import colorTaggingTool as ctool
+import colorTaggingFiles
+
+rules = ctool.RuleSet.fromJson('/path/rules.json')
+colorTaggingFiles.tagMaFile('/path/scene.ma', rules=rules)
+colorTaggingFiles.tagMaFile('/path/scene.ma', tags={'|rig|L_arm_CTL': (None, 6)}, output='/path/out.ma')
+
+* from the command line, no mayapy needed for .ma files
+
+python -m colorTaggingTool batch --direct --rules rules.json assets/
+
+* which assets still use wireframe index 13 on their controls
+
+index = colorTaggingFiles.LibraryIndex('/path/library.db')
+index.scan(['/path/assets'])			# again later, only changed files are read
+index.files(wireframe=13, name='*_CTL')
+
+
+"""
+
+
+import os
+import re
+import mmap
+import struct
+import sqlite3
+import tempfile
+
+import colorTaggingTool as ctool
+
+import logging
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.ERROR)
+
+
+
+
+# ==================== VARIABLES ====================
+
+# node types whose createNode block gets tagged, ls -type transform finds the same
+TRANSFORM_TYPES = (b'transform', b'joint')
+
+# short names Maya ASCII uses for the override attributes
+SHORT_ATTR_NAMES = {
+			'useOutlinerColor':b'uoc',
+			'outlinerColor':b'oclr',
+			'overrideEnabled':b'ove',
+			'overrideRGBColors':b'ovrgbf',
+			'overrideColor':b'ovc'
+		}
+
+# value an attribute has when no setAttr line is written for it
+ATTR_DEFAULTS = {
+			'useOutlinerColor':0,
+			'outlinerColor':(0.0, 0.0, 0.0),
+			'overrideEnabled':0,
+			'overrideRGBColors':0,
+			'overrideColor':0
+		}
+
+# only matter while overrideEnabled is on, not worth adding a line for otherwise
+_OVERRIDE_ONLY_ATTRS = ('overrideRGBColors', 'overrideColor')
+
+_LONG_ATTR_NAMES = dict((short, attr) for attr, short in SHORT_ATTR_NAMES.items())
+_LONG_ATTR_NAMES.update((attr.encode('ascii'), attr) for attr in SHORT_ATTR_NAMES)
+
+_CREATE_NODE = re.compile(br'^createNode\s+(\S+)')
+_NAME_FLAG = re.compile(br'\s-n\s+"([^"]+)"')
+_PARENT_FLAG = re.compile(br'\s-p\s+"([^"]+)"')
+_SET_ATTR = re.compile(br'^(\s+)setAttr\b[^"]*"\.([A-Za-z]+)"')
+_LOCK_FLAG = re.compile(br'\s-(?:l|lock)\s+(?:on|yes|true|1)\b')
+
+# read / write buffer, big enough that a multi-GB file streams at disk speed
+_BUFFER_SIZE = 1 << 20
+
+
+
+
+# ==================== FUNCTIONS ====================
+
+def tagMaFile(path, rules=None, tags=None, clear=False, output=None):
+	""" rewrite the override attributes of the transforms in a Maya ASCII file
+	rules is a RuleSet, tags {long or short name: (outliner, wireframe)} and wins over rules,
+	clear turns both channels off on every other transform, None leaves a channel alone
+	output defaults to path; returns counts and timings
+	"""
+	start = ctool._clock()
+	output = output or path
+
+	rewriter = _MaRewriter(rules, tags, clear)
+
+	# temp file in the target directory so the final rename never crosses devices
+	handle, tempPath = tempfile.mkstemp(prefix='.colorTagging', suffix='.ma', dir=os.path.dirname(os.path.abspath(output)))
+
+	try:
+		with open(path, 'rb', _BUFFER_SIZE) as source:
+			with os.fdopen(handle, 'wb', _BUFFER_SIZE) as target:
+				rewriter.run(source, target)
+
+		if os.path.exists(path):
+			_copyMode(path, tempPath)
+
+		_replace(tempPath, output)
+
+	except BaseException:
+		if os.path.exists(tempPath):
+			os.remove(tempPath)
+		raise
+
+	stats = rewriter.stats
+	stats['seconds'] = ctool._clock() - start
+	stats['bytes'] = os.path.getsize(output)
+
+	_logger.info("%s: %d of %d transforms tagged, %d lines edited, %d added, %d locked skipped, %.3fs", path, stats['tagged'], stats['transforms'], stats['edited'], stats['added'], stats['skipped'], stats['seconds'])
+	return stats
+
+
+
+
+def _copyMode(source, target):
+	try:
+		os.chmod(target, os.stat(source).st_mode & 0o7777)
+	except OSError:
+		pass
+
+
+
+
+def _replace(source, target):
+	""" atomic rename over an existing file, Python 2 on Windows can only remove first
+	"""
+	if hasattr(os, 'replace'):
+		os.replace(source, target)
+	else:
+		if os.name == 'nt' and os.path.exists(target):
+			os.remove(target)
+		os.rename(source, target)
+
+
+
+
+def formatValue(attr, value):
+	""" setAttr arguments of value as Maya ASCII writes them
+	"""
+	kind = ctool.ATTR_KINDS[attr]
+
+	if kind == 'bool':
+		return b'yes' if value else b'no'
+
+	if kind == 'float3':
+		return b'-type "float3" ' + b' '.join(('{0:.6g}'.format(v)).encode('ascii') for v in value)
+
+	return str(int(value)).encode('ascii')
+
+
+
+
+def setAttrLine(attr, value, indent=b'\t', newline=b'\n'):
+	return indent + b'setAttr ".' + SHORT_ATTR_NAMES[attr] + b'" ' + formatValue(attr, value) + b';' + newline
+
+
+
+
+# ==================== REWRITER ====================
+
+class _LongNames(object):
+	""" long names of the transforms created so far in a file, to resolve -p
+	"""
+
+	def __init__(self):
+		# leaf name -> long names
+		self._byLeaf = {}
+
+
+
+	def resolve(self, name, parent):
+		""" long name of a createNode, -p can be any unique tail of the parent path
+		"""
+		if not parent:
+			longName = '|' + name
+
+		elif parent.startswith('|'):
+			longName = parent + '|' + name
+
+		else:
+			candidates = self._byLeaf.get(parent.rpartition('|')[2], ())
+			matches = [candidate for candidate in candidates if candidate.endswith('|' + parent)]
+			longName = (matches[-1] if matches else '|' + parent) + '|' + name
+
+		self._byLeaf.setdefault(name, []).append(longName)
+		return longName
+
+
+
+
+
+class _MaRewriter(object):
+	""" line filter for one file, keeps only the current createNode block and a name table
+	"""
+
+	def __init__(self, rules=None, tags=None, clear=False):
+		self.rules = rules
+		self.tags = tags or {}
+		self.clear = clear
+
+		# (outliner, wireframe) -> {attr: value}, every node with the same colors shares one
+		self._valueCache = {}
+
+		self._longNames = _LongNames()
+
+		# block being streamed: {attr: value} still to write, newline of its createNode line
+		self._pending = None
+		self._newline = b'\n'
+
+		self.stats = {'transforms': 0, 'tagged': 0, 'edited': 0, 'added': 0, 'skipped': 0}
+
+
+
+	def run(self, source, target):
+		write = target.write
+
+		for line in source:
+			if self._pending is not None:
+				if line[:1] in (b'\t', b' '):
+					write(self.editLine(line))
+					continue
+
+				# Maya 2016+ writes the node UUID right after createNode, the block goes on
+				if line.startswith(b'rename -uid '):
+					write(line)
+					continue
+
+				# first top level line after the block, the missing attributes go before it
+				self.closeBlock(write)
+
+			if line.startswith(b'createNode '):
+				self.openBlock(line)
+
+			write(line)
+
+		if self._pending is not None:
+			self.closeBlock(write)
+
+
+
+	def openBlock(self, line):
+		""" start tracking a createNode block if it is a transform that gets colors
+		"""
+		match = _CREATE_NODE.match(line)
+		if not match or match.group(1) not in TRANSFORM_TYPES:
+			return
+
+		name = _NAME_FLAG.search(line)
+		if not name:
+			return
+
+		self.stats['transforms'] += 1
+
+		name = name.group(1).decode('utf-8')
+		parent = _PARENT_FLAG.search(line)
+		longName = self._longNames.resolve(name, parent.group(1).decode('utf-8') if parent else None)
+
+		colors = self.colors(longName, match.group(1).decode('ascii'))
+		if colors == (None, None):
+			return
+
+		self._pending = dict(self.values(colors))
+		self._newline = b'\r\n' if line.endswith(b'\r\n') else b'\n'
+		self.stats['tagged'] += 1
+
+
+
+	def editLine(self, line):
+		""" line with its value replaced when it sets one of the pending attributes
+		the flags before the attribute name stay, a locked attribute keeps its value
+		"""
+		if b'setAttr' not in line:
+			return line
+
+		match = _SET_ATTR.match(line)
+		if not match:
+			return line
+
+		attr = _LONG_ATTR_NAMES.get(match.group(2))
+		if attr is None or attr not in self._pending:
+			return line
+
+		value = self._pending.pop(attr)
+
+		if _LOCK_FLAG.search(line, 0, match.start(2)):
+			self.stats['skipped'] += 1
+			return line
+
+		self.stats['edited'] += 1
+		newline = b'\r\n' if line.endswith(b'\r\n') else b'\n'
+
+		return line[:match.end()] + b' ' + formatValue(attr, value) + b';' + newline
+
+
+
+	def closeBlock(self, write):
+		""" add the attributes the block had no line for, skipping default values
+		"""
+		disabled = self._pending.get('overrideEnabled', 1) == 0
+
+		for attr, value in sorted(self._pending.items()):
+			if disabled and attr in _OVERRIDE_ONLY_ATTRS:
+				continue
+
+			if value != ATTR_DEFAULTS[attr]:
+				write(setAttrLine(attr, value, b'\t', self._newline))
+				self.stats['added'] += 1
+
+		self._pending = None
+
+
+
+	def colors(self, longName, nodeType):
+		""" (outliner, wireframe) for one transform, None where the channel stays as it is
+		"""
+		leaf = longName.rpartition('|')[2]
+		tagged = self.tags.get(longName) or self.tags.get(leaf)
+		if tagged is not None:
+			return tuple(tagged)
+
+		outliner = wireframe = None
+		if self.rules is not None:
+			outliner, wireframe = self.rules.match(longName, nodeType)
+
+		if self.clear:
+			outliner = 0 if outliner is None else outliner
+			wireframe = 0 if wireframe is None else wireframe
+
+		return outliner, wireframe
+
+
+
+	def values(self, colors):
+		""" {attr: value} the core writes for these colors, from outlinerPlan / wireframePlan
+		"""
+		values = self._valueCache.get(colors)
+
+		if values is None:
+			plan = ctool.buildPlan(['node'], colors[0], colors[1], skipUnchanged=False)
+			values = self._valueCache[colors] = dict((attr, value) for attr, value, nodes in plan.entries)
+
+		return values.items()
+
+
+
+
+# ==================== SCANNER ====================
+
+_SCAN_TRANSFORM = re.compile(br'^createNode[ \t]+(' + b'|'.join(TRANSFORM_TYPES) + br')\b([^\r\n]*)', re.M)
+_SCAN_SET_ATTR = re.compile(br'^[ \t]+setAttr\b[^"\r\n]*"\.(' + b'|'.join(sorted(_LONG_ATTR_NAMES)) + br')"\s*([^;]*);', re.M)
+
+# first top level line after a createNode line, rename -uid still belongs to the node
+_SCAN_BLOCK_END = re.compile(br'^(?=[^\t \r\n])(?!rename -uid )', re.M)
+
+_BOOL_VALUES = {b'yes': 1, b'true': 1, b'on': 1, b'1': 1, b'no': 0, b'false': 0, b'off': 0, b'0': 0}
+
+
+def scanMaFile(path):
+	""" colors of the transforms in a Maya ASCII file, without Maya
+	the file is memory mapped, only createNode transform blocks get looked at
+	returns [(long name, node type, {attr: value})], attrs with no setAttr line hold their default
+	"""
+	nodes = []
+
+	with open(path, 'rb') as f:
+		if not os.fstat(f.fileno()).st_size:
+			return nodes
+
+		data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+	try:
+		longNames = _LongNames()
+
+		for match in _SCAN_TRANSFORM.finditer(data):
+			flags = match.group(2)
+			name = _NAME_FLAG.search(flags)
+			if not name:
+				continue
+
+			parent = _PARENT_FLAG.search(flags)
+			longName = longNames.resolve(name.group(1).decode('utf-8'), parent.group(1).decode('utf-8') if parent else None)
+
+			end = _SCAN_BLOCK_END.search(data, match.end() + 1)
+			end = end.start() if end else len(data)
+
+			values = dict(ATTR_DEFAULTS)
+			for attrMatch in _SCAN_SET_ATTR.finditer(data, match.end(), end):
+				attr = _LONG_ATTR_NAMES[attrMatch.group(1)]
+				values[attr] = parseValue(attr, attrMatch.group(2))
+
+			nodes.append((longName, match.group(1).decode('ascii'), values))
+
+	finally:
+		data.close()
+
+	return nodes
+
+
+
+
+def parseValue(attr, text):
+	""" value of the setAttr arguments text, formatValue() the other way round
+	"""
+	kind = ctool.ATTR_KINDS[attr]
+	text = text.strip()
+
+	if kind == 'bool':
+		return _BOOL_VALUES.get(text.lower(), 0)
+
+	if kind == 'float3':
+		return tuple(float(v) for v in text.rpartition(b'"')[2].split()[:3])
+
+	return int(text.split()[0])
+
+
+
+
+def nodeColors(values):
+	""" (outliner, wireframe) color index a transform draws with by itself
+	0 for off, CUSTOM_COLOR for a color that is not in the palette or an RGB override
+	"""
+	outliner = 0
+	if values['useOutlinerColor']:
+		outliner = ctool.PALETTE.indexOfFloat(values['outlinerColor'])
+
+	wireframe = 0
+	if values['overrideEnabled']:
+		wireframe = ctool.CUSTOM_COLOR if values['overrideRGBColors'] else values['overrideColor']
+
+	return outliner, wireframe
+
+
+
+
+def scanFile(path):
+	""" scanMaFile() or scanMbFile() by extension
+	"""
+	if ctool._isAscii(path):
+		return scanMaFile(path)
+
+	return scanMbFile(path)
+
+
+
+
+def _scanJob(job):
+	""" pool worker, never raises, the error goes back with the file
+	"""
+	path, mtime, size = job
+
+	try:
+		return path, mtime, size, scanFile(path), None
+	except Exception as e:
+		return path, mtime, size, [], '{0}: {1}'.format(type(e).__name__, e)
+
+
+
+
+# ==================== MAYA BINARY ====================
+
+# IFF flavours by the id of the top form: (group chunk ids, chunk header, alignment)
+# 64 bit files pad the 4 byte id to 8 and carry 8 byte sizes
+_IFF_FORMATS = {
+			b'FOR4':((b'FOR4', b'LIS4', b'CAT4', b'PROP'), struct.Struct('>4sI'), 4),
+			b'FOR8':((b'FOR8', b'LIS8', b'CAT8', b'PRO8'), struct.Struct('>4s4xQ'), 8)
+		}
+
+# node forms that hold a transform, and their node type
+MB_NODE_TYPES = {
+			b'XFRM':'transform',
+			b'JONT':'joint'
+		}
+
+# attribute value chunks: name, NUL, flags, then the big endian value at the chunk end
+# assumed layout, benchmarks/bench_library.py checks it against Maya saved fixtures when there are any
+_MB_VALUE_CHUNKS = {
+			b'DBLE':struct.Struct('>d'),
+			b'DBL3':struct.Struct('>3d'),
+			b'FLT3':struct.Struct('>3f'),
+			b'LONG':struct.Struct('>i'),
+			b'SHRT':struct.Struct('>h'),
+			b'BYTE':struct.Struct('>B')
+		}
+
+# top form of a scene, the node forms are its direct children
+_MB_SCENE_FORM = b'Maya'
+
+
+def scanMbFile(path):
+	""" colors of the transforms in a Maya Binary file, without Maya, same result as scanMaFile()
+	"""
+	with open(path, 'rb') as f:
+		if not os.fstat(f.fileno()).st_size:
+			return []
+
+		data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+	try:
+		return MbReader(data).nodes()
+	finally:
+		data.close()
+
+
+
+
+class MbReader(object):
+	""" IFF chunk walker over a buffer (mmap, bytes), reads headers in place
+	forms that are not transforms are stepped over by their length, never decoded
+	"""
+
+	def __init__(self, data):
+		self.data = data
+
+		tag = bytes(data[:4])
+		if tag not in _IFF_FORMATS:
+			raise ValueError("not a Maya Binary file, starts with {0!r}".format(tag))
+
+		self.groups, self.header, self.align = _IFF_FORMATS[tag]
+
+
+
+	def chunks(self, start, end):
+		""" (id, data start, data end) of the chunks from start to end
+		"""
+		data = self.data
+		header = self.header
+		headerSize = header.size
+		align = self.align
+
+		while start + headerSize <= end:
+			tag, size = header.unpack_from(data, start)
+			dataStart = start + headerSize
+			dataEnd = dataStart + size
+
+			yield tag, dataStart, min(dataEnd, end)
+
+			start = dataEnd + (-dataEnd % align)
+
+
+
+	def nodes(self):
+		""" [(long name, node type, {attr: value})] of every transform, attrs not stored hold their default
+		"""
+		nodes = []
+		self._walk(0, len(self.data), _LongNames(), nodes)
+		return nodes
+
+
+
+	def _walk(self, start, end, longNames, nodes):
+		data = self.data
+
+		for tag, dataStart, dataEnd in self.chunks(start, end):
+			if tag not in self.groups:
+				continue
+
+			formType = bytes(data[dataStart:dataStart + 4])
+			contentStart = dataStart + self.align
+
+			nodeType = MB_NODE_TYPES.get(formType)
+			if nodeType:
+				node = self._node(nodeType, contentStart, dataEnd, longNames)
+				if node:
+					nodes.append(node)
+
+			# the scene form and lists can hold nodes, any other form is skipped whole
+			elif formType == _MB_SCENE_FORM or tag != self.groups[0]:
+				self._walk(contentStart, dataEnd, longNames, nodes)
+
+
+
+	def _node(self, nodeType, start, end, longNames):
+		""" (long name, node type, values) of one node form, None without a CREA chunk
+		"""
+		data = self.data
+		longName = None
+		values = dict(ATTR_DEFAULTS)
+
+		for tag, dataStart, dataEnd in self.chunks(start, end):
+			if tag == b'CREA':
+				# flags byte, then NUL terminated name and parent
+				fields = bytes(data[dataStart + 1:dataEnd]).split(b'\0')
+				parent = fields[1] if len(fields) > 1 and fields[1] else None
+				longName = longNames.resolve(fields[0].decode('utf-8'), parent.decode('utf-8') if parent else None)
+				continue
+
+			value = _MB_VALUE_CHUNKS.get(tag)
+			if value is None:
+				continue
+
+			nameEnd = data.find(b'\0', dataStart, dataEnd)
+			if nameEnd < 0 or dataEnd - value.size <= nameEnd:
+				continue
+
+			attr = _LONG_ATTR_NAMES.get(bytes(data[dataStart:nameEnd]).lstrip(b'.'))
+			if attr is None:
+				continue
+
+			unpacked = value.unpack_from(data, dataEnd - value.size)
+			values[attr] = _mbValue(attr, unpacked)
+
+		if longName is None:
+			return None
+
+		return longName, nodeType, values
+
+
+
+
+def _mbValue(attr, unpacked):
+	kind = ctool.ATTR_KINDS[attr]
+
+	if kind == 'float3':
+		return tuple(float(v) for v in unpacked) if len(unpacked) == 3 else ATTR_DEFAULTS[attr]
+
+	if kind == 'bool':
+		return 1 if unpacked[0] else 0
+
+	return int(unpacked[0])
+
+
+
+
+# ==================== LIBRARY INDEX ====================
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+	id INTEGER PRIMARY KEY,
+	path TEXT UNIQUE NOT NULL,
+	mtime REAL NOT NULL,
+	size INTEGER NOT NULL,
+	error TEXT
+);
+CREATE TABLE IF NOT EXISTS nodes (
+	file INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+	node TEXT NOT NULL,
+	leaf TEXT NOT NULL,
+	type TEXT NOT NULL,
+	outliner INTEGER NOT NULL,
+	wireframe INTEGER NOT NULL,
+	useOutlinerColor INTEGER NOT NULL,
+	outlinerR REAL NOT NULL,
+	outlinerG REAL NOT NULL,
+	outlinerB REAL NOT NULL,
+	overrideEnabled INTEGER NOT NULL,
+	overrideRGBColors INTEGER NOT NULL,
+	overrideColor INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS nodesFile ON nodes (file);
+CREATE INDEX IF NOT EXISTS nodesWireframe ON nodes (wireframe);
+CREATE INDEX IF NOT EXISTS nodesOutliner ON nodes (outliner);
+"""
+
+
+class LibraryIndex(object):
+	""" SQLite index of the transform colors of a library of .ma / .mb files
+	keyed by path, mtime and size; a rescan only reads the files that changed
+	"""
+
+	def __init__(self, path):
+		self.path = path
+
+		self.db = sqlite3.connect(path)
+		self.db.execute('PRAGMA foreign_keys = ON')
+		self.db.execute('PRAGMA journal_mode = WAL')
+		self.db.execute('PRAGMA synchronous = NORMAL')
+		self.db.executescript(_SCHEMA)
+
+		self.lastScan = None
+
+
+
+	def close(self):
+		self.db.close()
+
+
+
+	def scan(self, paths, workers=None, log=None):
+		""" index the scene files of paths (files or directories), skipping the unchanged ones
+		files read across a process pool, workers=0 reads in this process
+		returns counts and timings
+		"""
+		start = ctool._clock()
+
+		files = ctool._sceneFiles(paths)
+		known = dict((path, (mtime, size)) for path, mtime, size in self.db.execute('SELECT path, mtime, size FROM files'))
+
+		jobs = []
+		for path in files:
+			try:
+				stat = os.stat(path)
+			except OSError:
+				continue
+
+			if known.get(path) != (stat.st_mtime, stat.st_size):
+				jobs.append((path, stat.st_mtime, stat.st_size))
+
+		# files that are gone from disk, wherever they were indexed from
+		removed = [path for path in known if not os.path.exists(path)]
+
+		stats = {'files': len(files), 'scanned': len(jobs), 'skipped': len(files) - len(jobs), 'removed': len(removed), 'nodes': 0, 'failed': 0}
+
+		with self.db:
+			self.db.executemany('DELETE FROM files WHERE path = ?', [(path,) for path in removed])
+
+			for path, mtime, size, nodes, error in self._scanFiles(jobs, workers):
+				self._store(path, mtime, size, nodes, error)
+				stats['nodes'] += len(nodes)
+
+				if error:
+					stats['failed'] += 1
+				if log:
+					log("{0}  {1:>7} transforms  {2}{3}".format('FAILED' if error else 'ok    ', len(nodes), path, '  ' + error if error else ''))
+
+		stats['seconds'] = ctool._clock() - start
+		self.lastScan = stats
+
+		_logger.info("%s: %d of %d files scanned, %d removed, %.3fs", self.path, stats['scanned'], stats['files'], stats['removed'], stats['seconds'])
+		return stats
+
+
+
+	def _scanFiles(self, jobs, workers):
+		""" _scanJob() results, in this process or from a pool as they come in
+		"""
+		if workers == 0 or len(jobs) < 2:
+			for job in jobs:
+				yield _scanJob(job)
+			return
+
+		import multiprocessing
+
+		pool = multiprocessing.Pool(min(workers or multiprocessing.cpu_count(), len(jobs)))
+
+		try:
+			for result in pool.imap_unordered(_scanJob, jobs, chunksize=4):
+				yield result
+		finally:
+			pool.close()
+			pool.join()
+
+
+
+	def _store(self, path, mtime, size, nodes, error):
+		self.db.execute('DELETE FROM files WHERE path = ?', (path,))
+		fileId = self.db.execute('INSERT INTO files (path, mtime, size, error) VALUES (?, ?, ?, ?)', (path, mtime, size, error)).lastrowid
+
+		rows = []
+		for node, nodeType, values in nodes:
+			outliner, wireframe = nodeColors(values)
+			r, g, b = values['outlinerColor']
+
+			rows.append((fileId, node, node.rpartition('|')[2], nodeType, outliner, wireframe, values['useOutlinerColor'], r, g, b,
+				values['overrideEnabled'], values['overrideRGBColors'], values['overrideColor']))
+
+		self.db.executemany('INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+
+
+	def query(self, outliner=None, wireframe=None, name=None, nodeType=None, path=None):
+		""" (path, long name, outliner, wireframe) of the indexed transforms matching every filter given
+		colors are the node's own, name a glob of the short name, path a glob of the file path
+		"""
+		where, args = self._where(outliner, wireframe, name, nodeType, path)
+		return self.db.execute('SELECT files.path, node, outliner, wireframe FROM nodes JOIN files ON files.id = nodes.file' + where + ' ORDER BY files.path, node', args).fetchall()
+
+
+
+	def files(self, outliner=None, wireframe=None, name=None, nodeType=None, path=None):
+		""" paths with at least one transform matching the filters, like query()
+		"""
+		where, args = self._where(outliner, wireframe, name, nodeType, path)
+		return [row[0] for row in self.db.execute('SELECT DISTINCT files.path FROM nodes JOIN files ON files.id = nodes.file' + where + ' ORDER BY files.path', args)]
+
+
+
+	def errors(self):
+		""" {path: error} of the files the last scans could not read
+		"""
+		return dict(self.db.execute('SELECT path, error FROM files WHERE error IS NOT NULL'))
+
+
+
+	@staticmethod
+	def _where(outliner, wireframe, name, nodeType, path):
+		clauses = []
+		args = []
+
+		for column, value in (('outliner', outliner), ('wireframe', wireframe), ('type', nodeType)):
+			if value is not None:
+				clauses.append('{0} = ?'.format(column))
+				args.append(value)
+
+		for column, pattern in (('leaf', name), ('files.path', path)):
+			if pattern is not None:
+				clauses.append('{0} GLOB ?'.format(column))
+				args.append(pattern)
+
+		return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', args
@@ -21,30 +21,106 @@ Usage:
 import colorTaggingTool as ctool
 ctool.run()
 
+* from scripts, one call per batch, undoable in one step:
 
-"""
+ctool.tagNodes(ctool.getSelection(), outliner=13, wireframe=17)
 
+* the window is built once and reused, ctool.run(dockable=True) docks it
+  in a workspace control, checkbox states and the last color are kept
+  in optionVars; to build it while Maya is idle after startup, add to
+  userSetup.py:
 
-try:
-	from PySide import QtCore, QtUiTools
-	from PySide import QtGui as qtToolInstance
-except:
-	from PySide2 import QtCore, QtUiTools
-	from PySide2 import QtWidgets as qtToolInstance
+import colorTaggingTool; colorTaggingTool.prewarm()
 
+* snapshot every transform's colors before a bulk recolor, restore
+  them later in one undo step:
 
-try:
-	from shiboken import wrapInstance
-except:
-	from shiboken2 import wrapInstance
+shot = ctool.snapshot(path='/tmp/before.ctsn')
+ctool.restore('/tmp/before.ctsn')
+
+* keep a copy of the tags in the scene's fileInfo, reapplied on open
+  (the "Save Tags In Scene" checkbox does the same):
+
+ctool.enableTagTable()
+ctool.getTagTable().lastRehydrate		# timings of the last reapply
+
+* color by naming convention, first matching rule wins per channel:
+
+rules = ctool.RuleSet()
+rules.add('*_CTL', outliner=17, wireframe=17)
+rules.add('L_*', wireframe=6)
+rules.add('joint', kind='type', wireframe=22)
+rules.add(r'(?i)r_\w+_jnt', kind='regex', wireframe=13)	# regex rules match the whole name, like globs
+ctool.applyRules(rules)				# or ctool.applyRules('/path/rules.json')
+
+* new transforms (imports, references, duplicates) can pick up the
+  rule colors by themselves, one batch per idle:
+
+ctool.enableAutoColor('/path/rules.json')
+
+* in the window, Ctrl+click a swatch to select everything tagged with
+  that color, Ctrl+Shift+click to also isolate it in the viewport
+
+* more colors than Maya's index palette, from a JSON list of
+  "#rrggbb" or [r, g, b]; colorIndex 1 is the first color of the file
+  and wireframes get RGB overrides:
+
+shots = ctool.Palette.fromJson('/path/shots.json')
+ctool.tagNodes(ctool.getSelection(), outliner=3, wireframe=3, palette=shots)
+
+* wireframes that came with RGB overrides from other tools can be
+  switched to the nearest palette index in one undo step:
+
+ctool.rgbToIndex()				# whole scene, or ctool.rgbToIndex(ctool.getSelection())
+
+* or the colorTag command once colorTaggingCmd.py is loaded (done on first use):
+
+colorTag -outliner 13 -wireframe 17 pCube1 pCube2;
 
+* recolor scene files headless, in a pool of mayapy workers:
+
+mayapy -m colorTaggingTool batch --rules rules.json --clear assets/
+python -m colorTaggingTool batch --wireframe 17 --match "*_CTL" --mayapy /path/to/mayapy a.ma b.mb
+python -m colorTaggingTool batch --direct --rules rules.json assets/	# .ma as text, no Maya
+
+* index the colors of a .ma / .mb library, rescans only read changed files:
+
+python -m colorTaggingTool scan --index library.db assets/
+python -m colorTaggingTool query --index library.db --wireframe 13 --name "*_CTL" --files
+
+* time the selection / read / plan / diff / write / refresh phases of
+  the last operations, off by default and free while off:
+
+ctool.enableStats(sink='/tmp/colorTagging.jsonl')	# sink is optional
+ctool.tagNodes(ctool.getSelection(), wireframe=17)
+ctool.stats()['totals']['write']				# count, seconds, nodes, writes
+ctool.stats()['phases'][-1]					# latest phase record, phases never overlap
+
+* importing the module is cheap: Qt, PyMEL and maya.mel are only
+  loaded the first time something needs them, the UI lives in
+  colorTaggingUI.py and is imported by run()
+
+
+"""
+
+
+from __future__ import print_function
 
 import os
+import re
+import sys
+import json
+import time
+import array
+import zlib
+import base64
+import struct
+import binascii
+import fnmatch
 import functools
-import maya.cmds as mc
-import pymel.core as pm
-import maya.OpenMayaUI as omui
-import maya.mel as mel
+import importlib
+import contextlib
+import collections
 
 import logging
 _logger = logging.getLogger(__name__)
@@ -53,10 +129,344 @@ _logger.setLevel(logging.ERROR)
 
 
 
+# ==================== LAZY IMPORTS ====================
+
+class _LazyModule(object):
+	""" module stand-in that imports the real module on first attribute access
+	"""
+
+	def __init__(self, name):
+		self.__dict__['_name'] = name
+		self.__dict__['_module'] = None
+
+		# None until _available() has tried the import, then its answer
+		self.__dict__['_found'] = None
+
+
+
+	def __getattr__(self, attr):
+		return getattr(self._load(), attr)
+
+
+
+	def __setattr__(self, attr, value):
+		setattr(self._load(), attr, value)
+
+
+
+	def _load(self):
+		""" import the wrapped module once and keep it
+		"""
+		module = self.__dict__['_module']
+
+		if module is None:
+			module = importlib.import_module(self.__dict__['_name'])
+			self.__dict__['_module'] = module
+
+		return module
+
+
+
+	def _available(self):
+		""" True if the wrapped module can be imported, a failed import is not retried
+		"""
+		if self.__dict__['_found'] is None:
+			try:
+				self._load()
+				self.__dict__['_found'] = True
+			except ImportError:
+				self.__dict__['_found'] = False
+
+		return self.__dict__['_found']
+
+
+
+	def _loaded(self):
+		""" True once the wrapped module has been imported
+		"""
+		return self.__dict__['_module'] is not None
+
+
+
+
+# heavy Maya modules, only imported when something actually touches them
+mc = _LazyModule('maya.cmds')
+mel = _LazyModule('maya.mel')
+pm = _LazyModule('pymel.core')
+om = _LazyModule('maya.api.OpenMaya')
+
+# optional, Palette.nearest() vectorizes with it when it is installed
+np = _LazyModule('numpy')
+
+try:
+	_stringTypes = (str, unicode)
+except NameError:
+	_stringTypes = (str,)
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+
+
+# ==================== PALETTE ====================
+
+class Palette(object):
+	""" color palette, every color format is worked out once when it is built
+	index 0 is 'no color' and holds None in every table
+	indexed palettes are Maya's index colors, the others are written as RGB overrides
+	"""
+
+	def __init__(self, colors, indexed=True):
+		self.indexed = indexed
+		self.rgb = tuple(None if color is None else tuple(int(c) for c in color) for color in colors)
+		self.floats = tuple(None if color is None else tuple(c / 255.0 for c in color) for color in self.rgb)
+		self.linear = tuple(None if color is None else tuple(_srgbToLinear(c) for c in color) for color in self.floats)
+		self.hex = tuple(None if color is None else '#{0:02x}{1:02x}{2:02x}'.format(*color) for color in self.rgb)
+		self.lab = tuple(None if color is None else _linearToLab(*color) for color in self.linear)
+		self._labEntries = [(i, lab) for i, lab in enumerate(self.lab) if lab is not None]
+
+		# flat float arrays, 3 per entry, index 0 left black
+		self.floatArray = array.array('f', [c for color in self.floats for c in (color or (0.0, 0.0, 0.0))])
+		self.linearArray = array.array('f', [c for color in self.linear for c in (color or (0.0, 0.0, 0.0))])
+
+		self._indexOf = dict((color, i) for i, color in enumerate(self.rgb) if color is not None)
+		self._qcolors = None
+
+		# nearest() lookup table without NumPy, 24 bit color -> colorIndex, filled as colors come
+		self._lut = {}
+
+
+
+	@classmethod
+	def fromDict(cls, colorDict):
+		""" palette from a {colorIndex: (r, g, b)} dict of 0-255 values
+		"""
+		return cls([colorDict.get(i) for i in range(max(colorDict) + 1)])
+
+
+
+	@classmethod
+	def fromJson(cls, source):
+		""" RGB palette of any size from a JSON file or string, {"colors": [...]} or a bare list
+		of "#rrggbb" or [r, g, b] 0-255 colors; they become colorIndex 1, 2 ... after 'no color'
+		"""
+		if os.path.isfile(source):
+			with open(source) as f:
+				source = f.read()
+
+		data = json.loads(source)
+		if isinstance(data, dict):
+			data = data.get('colors', [])
+
+		if not data:
+			raise ValueError("palette has no colors")
+
+		return cls([None] + [_parseColor(color) for color in data], indexed=False)
+
+
+
+	def __len__(self):
+		return len(self.rgb)
+
+
+
+	def __getitem__(self, colorIndex):
+		return self.rgb[colorIndex]
+
+
+
+	def get(self, colorIndex, default=None):
+		""" 0-255 color of colorIndex, like the colorMapDict it replaces
+		"""
+		if 0 <= colorIndex < len(self.rgb):
+			return self.rgb[colorIndex]
+
+		return default
+
+
+
+	def keys(self):
+		return range(len(self.rgb))
+
+
+
+	def items(self):
+		return enumerate(self.rgb)
+
+
+
+	def indexOf(self, rgb):
+		""" colorIndex of a 0-255 color, CUSTOM_COLOR when it is not in the palette
+		"""
+		return self._indexOf.get(tuple(rgb), CUSTOM_COLOR)
+
+
+
+	def indexOfFloat(self, color):
+		""" colorIndex of a 0-1 color, CUSTOM_COLOR when it is not in the palette
+		"""
+		return self._indexOf.get((int(round(color[0] * 255)), int(round(color[1] * 255)), int(round(color[2] * 255))), CUSTOM_COLOR)
+
+
+
+	def nearest(self, colors):
+		""" colorIndex closest to every 0-1 color of colors (flat r, g, b sequence) by CIELAB distance
+		vectorized with NumPy when it is installed, else through a lookup table over 8 bit colors
+		"""
+		if not len(colors):
+			return []
+
+		if np._available():
+			return self._nearestNumpy(colors)
+
+		lut = self._lut
+		indices = []
+
+		for i in range(0, len(colors), 3):
+			key = (_to8Bit(colors[i]) << 16) | (_to8Bit(colors[i + 1]) << 8) | _to8Bit(colors[i + 2])
+
+			colorIndex = lut.get(key)
+			if colorIndex is None:
+				colorIndex = lut[key] = self._nearestLab(_linearToLab(*(_srgbToLinear(((key >> shift) & 255) / 255.0) for shift in (16, 8, 0))))
+
+			indices.append(colorIndex)
+
+		return indices
+
+
+
+	def _nearestNumpy(self, colors):
+		""" nearest() with NumPy, each distinct 8 bit color is matched once, in fixed-size blocks
+		"""
+		entries = self._labEntries
+		paletteLab = np.array([lab for i, lab in entries], dtype=np.float64)
+		paletteIndices = np.array([i for i, lab in entries])
+		paletteNorms = (paletteLab ** 2).sum(axis=1)
+
+		# the same 24 bit keys as the lookup table, so both paths give the same answer
+		c = np.floor(np.clip(np.asarray(colors, dtype=np.float32).reshape(-1, 3), 0.0, 1.0) * 255.0 + 0.5).astype(np.int32)
+		keys, inverse = np.unique((c[:, 0] << 16) | (c[:, 1] << 8) | c[:, 2], return_inverse=True)
+
+		nearest = np.empty(len(keys), dtype=paletteIndices.dtype)
+		for start in range(0, len(keys), _NEAREST_BLOCK):
+			block = keys[start:start + _NEAREST_BLOCK]
+
+			c = np.stack(((block >> 16) & 255, (block >> 8) & 255, block & 255), axis=1) / 255.0
+			c = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+			xyz = c.dot(np.array(_SRGB_TO_XYZ).T) / np.array(_D65)
+			f = np.where(xyz > _LAB_EPSILON, np.cbrt(xyz), xyz * _LAB_KAPPA / 116.0 + 16.0 / 116.0)
+			lab = np.stack((116.0 * f[:, 1] - 16.0, 500.0 * (f[:, 0] - f[:, 1]), 200.0 * (f[:, 1] - f[:, 2])), axis=1)
+
+			# |lab|^2 is the same for every palette entry, argmin only needs the rest
+			distances = paletteNorms - 2.0 * lab.dot(paletteLab.T)
+			nearest[start:start + _NEAREST_BLOCK] = paletteIndices[distances.argmin(axis=1)]
+
+		return nearest[inverse.ravel()].tolist()
+
+
+
+	def _nearestLab(self, color):
+		""" colorIndex closest to a CIELAB color, one pass over the palette
+		"""
+		L, A, B = color
+		best = nearest = None
+
+		for i, lab in self._labEntries:
+			distance = (L - lab[0]) ** 2 + (A - lab[1]) ** 2 + (B - lab[2]) ** 2
+			if best is None or distance < best:
+				best = distance
+				nearest = i
+
+		return nearest
+
+
+
+	def qcolors(self):
+		""" QColor per entry, made on first call so importing stays Qt free
+		"""
+		if self._qcolors is None:
+			QtGui = _loadUI().QtGui
+			self._qcolors = tuple(None if color is None else QtGui.QColor(*color) for color in self.rgb)
+
+		return self._qcolors
+
+
+
+
+def _parseColor(color):
+	""" (r, g, b) 0-255 of a "#rrggbb" string or an [r, g, b] list
+	"""
+	if isinstance(color, _stringTypes):
+		text = color.lstrip('#')
+		if len(text) != 6:
+			raise ValueError("expected #rrggbb, got {0!r}".format(color))
+
+		return tuple(int(text[i:i + 2], 16) for i in (0, 2, 4))
+
+	if len(color) != 3:
+		raise ValueError("expected [r, g, b], got {0!r}".format(color))
+
+	return tuple(min(max(int(round(c)), 0), 255) for c in color)
+
+
+
+
+def _srgbToLinear(c):
+	""" sRGB encoded 0-1 channel to linear
+	"""
+	if c <= 0.04045:
+		return c / 12.92
+
+	return ((c + 0.055) / 1.055) ** 2.4
+
+
+
+
+# linear sRGB to CIE XYZ, D65 white point and the CIELAB constants
+_SRGB_TO_XYZ = (
+			(0.4124564, 0.3575761, 0.1804375),
+			(0.2126729, 0.7151522, 0.0721750),
+			(0.0193339, 0.1191920, 0.9503041)
+		)
+_D65 = (0.95047, 1.0, 1.08883)
+_LAB_EPSILON = 216.0 / 24389.0
+_LAB_KAPPA = 24389.0 / 27.0
+
+# distinct colors matched per NumPy pass, bounds the distance matrix to a few MB
+_NEAREST_BLOCK = 65536
+
+def _to8Bit(c):
+	""" 0-1 channel to 0-255, clamped
+	"""
+	return int(min(max(c, 0.0), 1.0) * 255.0 + 0.5)
+
+
+
+
+def _linearToLab(r, g, b):
+	""" CIELAB of a linear sRGB color
+	"""
+	lab = []
+	for row, white in zip(_SRGB_TO_XYZ, _D65):
+		t = (row[0] * r + row[1] * g + row[2] * b) / white
+		lab.append(t ** (1.0 / 3.0) if t > _LAB_EPSILON else (_LAB_KAPPA * t + 16.0) / 116.0)
+
+	fx, fy, fz = lab
+	return (116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz))
+
+
+
+
+
+
 # ==================== VARIABLES ==================== 
 
+# channel value of a color that is on but not one of the palette indices
+CUSTOM_COLOR = -1
+
 # index color mapping to rgb for qPixMap widgets
-colorMapDict = {
+_INDEX_COLORS = {
             0:None,
             1:(0,0,0),
             2:(64,64,64),
@@ -91,6 +501,12 @@ colorMapDict = {
             31:(162,48,106)
         }
 
+# Maya index color palette, conversions are table lookups
+PALETTE = Palette.fromDict(_INDEX_COLORS)
+
+# kept for scripts written against earlier versions, supports .get() and []
+colorMapDict = PALETTE
+
 
 # UI var
 win = None
@@ -101,272 +517,247 @@ win = None
 def getMayaWindow():
 	""" pointer to the maya main window
 	"""
+	return _loadUI().getMayaWindow()
 
-	ptr = omui.MQtUtil.mainWindow()
-
-	if ptr:
-		return wrapInstance(long(ptr), qtToolInstance.QMainWindow)
 
 
-
-def run():
-	""" builds UI
+def run(dockable=False, rebuild=False):
+	""" shows the tool window, built once per session and only shown / raised after that
+	dockable puts it in a workspace control (Maya 2017+), rebuild forces a fresh window
 	"""
 	global win
 
-	# close window if window exist
-	if win:
-		win.close()
+	ui = _loadUI()
 
-	win = ColorTaggingUI(parent=getMayaWindow())
+	# without the mixin buildWindow() always makes a plain dialog, asking to dock is no change
+	dockable = dockable and ui.MayaQWidgetDockableMixin is not None
 
+	# the C++ side goes away when the window is deleted (new scene in some builds, reloads)
+	if win is not None and (rebuild or not ui.isAlive(win) or ui.isDockable(win) != dockable):
+		ui.deleteWindow(win)
+		win = None
 
+	if win is None:
+		win = ui.buildWindow(dockable)
 
-class ColorTaggingUI(qtToolInstance.QDialog):
-	""" Main UI
-	"""
+	ui.showWindow(win)
+	return win
 
 
-	def __init__(self, parent = None):
-		super(ColorTaggingUI, self).__init__(parent)
 
 
-		# UI variables
-		self.outlinerEnable = 0
-		self.wireframeEnable = 0
+def prewarm(dockable=False):
+	""" build the window hidden on the first idle after startup, so the first run() only shows it,
+	and turn the scene tag table and auto color back on if they were on last session
+	meant for userSetup.py:
 
-		# self.counter = 0
+	import colorTaggingTool; colorTaggingTool.prewarm()
+	"""
+	mc.evalDeferred(functools.partial(_prewarm, dockable), lowestPriority=True)
 
-		# topmost layout
-		self.gridLayout = qtToolInstance.QGridLayout()
-		self.verticalLayout = qtToolInstance.QVBoxLayout()
-	
-		# label
-		self.taggingLabel = qtToolInstance.QLabel("Tagging color for...")
-		self.verticalLayout.addWidget(self.taggingLabel)
-		
-		# checkbox
-		self.outlinerCheckbox = qtToolInstance.QCheckBox("Outliner")
-		self.outlinerCheckbox.setChecked(True)
-		self.verticalLayout.addWidget(self.outlinerCheckbox)
-		
-		self.wireframeCheckbox = qtToolInstance.QCheckBox("Wireframe")
-		self.verticalLayout.addWidget(self.wireframeCheckbox)
-
-		# button grid
-		self.buttonGridLayout_1 = qtToolInstance.QGridLayout()
-		self.buttonGridLayout_1.setHorizontalSpacing(1)
-		self.buttonGridLayout_1.setVerticalSpacing(1)
-
-		self.taggingButtonGrp = qtToolInstance.QButtonGroup()
-
-		# adding buttons to grid
-		outlinerBtnNum = 0
-		for i in range(4):
-			for j in range(8):
-				self.colorButton = qtToolInstance.QPushButton("")
-				self.colorButton.setMinimumSize(20,20)
-				self.colorButton.setMaximumSize(20,20)
-				self.colorButton.setCheckable(1)
-	
-				if outlinerBtnNum == 0:
-					self.colorButton.setText("X")
-	
-	
-				else:
-					bColor = colorMapDict.get(outlinerBtnNum)
-					#_logger.debug("bColor: {0}".format(bColor))
-	
-					self.colorButton.setStyleSheet('QPushButton {background-color: rgb(%d,%d,%d); color: white}' % (bColor))
-	
-	
-				self.taggingButtonGrp.addButton(self.colorButton, outlinerBtnNum)
-	
-				# adding button to the grid
-				self.buttonGridLayout_1.addWidget(self.colorButton, i, j)
-				outlinerBtnNum += 1
-	
-		self.verticalLayout.addLayout(self.buttonGridLayout_1)
 
 
 
-		# disable all btn
-		self.disableAllBtn = qtToolInstance.QPushButton("Disable All On Selections")
-		self.disableAllBtn.setStyleSheet('QPushButton {background-color: rgb(50,0,0); color: white}' )
-		self.verticalLayout.addWidget(self.disableAllBtn)
+def _prewarm(dockable):
+	global win
 
-		self.gridLayout.addLayout(self.verticalLayout, 0, 0, 1, 1)
+	if getSetting('tagTable'):
+		getTagTable().install()
 
+	if getSetting('autoColor') and getSetting('rulesFile'):
+		try:
+			enableAutoColor()
+		except (IOError, OSError, ValueError):
+			_logger.exception("could not load the auto color rules {0}".format(getSetting('rulesFile')))
 
+	if win is None:
+		win = _loadUI().buildWindow(dockable)
 
-		# calling UI
-		self.makeConnections()
-		self.setWindowTitle("COLOR TAGGING TOOL")
-		self.setLayout(self.gridLayout)
 
-		self.setFixedSize(230, 200)
 
-		self.initUIState();
-		self.show();
 
+def _loadUI():
+	""" import the Qt side of the tool on first use
+	"""
+	import colorTaggingUI
+	return colorTaggingUI
 
 
 
-	# ==================== UI FUNCTIONS ====================
-	
-	def initUIState(self, colorIndex = 0):
-		""" sets up init state of UI
-		"""
-		self.initButtonGroup(self.taggingButtonGrp)
-		
-		self.outlinerCheckboxToggled()
-		self.wireframeCheckboxToggled()
 
+def __getattr__(name):
+	""" keeps ctool.ColorTaggingUI working without importing Qt up front (Python 3.7+)
+	"""
+	if name == 'ColorTaggingUI':
+		return getattr(_loadUI(), name)
 
+	raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
 
 
-	def makeConnections(self):
-		""" connect events in UI"""
-	
-		self.taggingButtonGrp.buttonClicked.connect(self.taggingButtonClicked)
-		self.disableAllBtn.clicked.connect(self.disableAllBtnClicked)
 
-		self.outlinerCheckbox.stateChanged.connect(self.outlinerCheckboxToggled)
-		self.wireframeCheckbox.stateChanged.connect(self.wireframeCheckboxToggled)
 
 
 
-	def initButtonGroup(self, buttonGrp=None):
-		""" set buttonGrp back to initial state
-		"""
-		
-		checkedButton = buttonGrp.checkedButton()
-	
-		buttonGrp.setExclusive(False)
-		try:
-			checkedButton.setChecked(False)
-		except:
-			pass
 
-		buttonGrp.setExclusive(True)
 
-		_logger.debug("checkedButton: {0}".format(checkedButton))
-		_logger.debug(buttonGrp.checkedId())
+# ==================== SETTINGS ====================
 
+# window state kept in optionVars, survives closing the window and restarting Maya
+SETTINGS = {
+	'outliner': 1,
+	'wireframe': 0,
+	'hierarchy': 0,
+	'minimal': 0,
+	'tagTable': 0,
+	'autoColor': 0,
+	'rulesFile': '',
+	'lastColor': 0,
+	'paletteFile': '',
+}
 
+OPTION_VAR_PREFIX = 'colorTaggingTool_'
 
 
-	def disableAllBtnClicked(self):
+def getSetting(name):
+	""" optionVar value of a window setting, its default when it was never saved
+	"""
+	key = OPTION_VAR_PREFIX + name
 
-		disableList = getSelection()
+	if mc.optionVar(exists=key):
+		return mc.optionVar(q=key)
 
-		_logger.debug("disableList: {0}".format(disableList)) 
+	return SETTINGS[name]
 
-		if not len(disableList) == 0:
-			outlinerOverrideOff(disableList)
-			wireframeOverrideOff(disableList)
 
-		else:
-			_logger.error("Nothing selected")
 
-		self.initUIState()
-		refreshMayaUI()
 
+def setSetting(name, value):
+	""" save a window setting, ints and strings
+	"""
+	key = OPTION_VAR_PREFIX + name
 
+	if isinstance(value, _stringTypes):
+		mc.optionVar(stringValue=(key, value))
+	else:
+		mc.optionVar(intValue=(key, int(value)))
 
 
-	def taggingButtonClicked(self):
-		""" tagging color based on selected color index
-		"""
 
-		colorIndex = self.taggingButtonGrp.checkedId()
-		_logger.debug("colorIndex: {0}".format(colorIndex)) 
 
-		colorOnList = getSelection()		
-		_logger.debug("colorOnList: {0}".format(colorOnList)) 
 
 
-		# tag outliner color
-		if self.outlinerEnable == 1:
+# ==================== STATS ====================
 
-			if not len(colorOnList) == 0:
+# phase records kept by default, oldest dropped first
+STATS_SIZE = 256
 
-				if colorIndex == 0:
-					outlinerOverrideOff(colorOnList)
-					_logger.debug("Disable outliner color") 
-				
-				else:
-					outlinerOverrideOn(colorOnList, colorIndex)
-					_logger.debug("Enable outliner color") 
+# Stats instance while enableStats() is on, instrumented code only checks this
+_stats = None
 
-			else:
-				_logger.error("Nothing selected")
 
-		else:
-			pass
 
+class Stats(object):
+	""" timings of the selection / read / plan / diff / write / refresh phases, none nested in another
+	ring buffer of the last records plus running totals per phase, optionally appended to a JSONL file
+	"""
 
-		# tag wireframe color
-		if self.wireframeEnable == 1:
+	def __init__(self, size=STATS_SIZE, sink=None):
+		self.records = collections.deque(maxlen=size)
+		self.totals = {}
 
-			if not len(colorOnList) == 0:
+		# path or file object, one JSON object per line
+		self.sink = sink
+		self._sinkFile = None
 
-				if colorIndex == 0:
-					wireframeOverrideOff(colorOnList)
-					_logger.debug("Disable outliner color") 
-				
-				else:
-					wireframeOverrideOn(colorOnList, colorIndex)
-					_logger.debug("Enable outliner color") 
 
-			else:
-				_logger.error("Nothing selected")
 
-		else:
-			pass
+	def record(self, phase, start, nodes=0, writes=0):
+		""" store one phase that began at _clock() time start
+		"""
+		seconds = _clock() - start
+		record = {'phase': phase, 'time': time.time(), 'seconds': seconds, 'nodes': nodes, 'writes': writes}
+		self.records.append(record)
 
+		total = self.totals.get(phase)
+		if total is None:
+			total = self.totals[phase] = {'count': 0, 'seconds': 0.0, 'nodes': 0, 'writes': 0}
 
+		total['count'] += 1
+		total['seconds'] += seconds
+		total['nodes'] += nodes
+		total['writes'] += writes
 
-		self.initUIState()
-		refreshMayaUI()
+		if self.sink is not None:
+			self._write(record)
 
 
 
+	def _write(self, record):
+		if self._sinkFile is None:
+			self._sinkFile = open(self.sink, 'a') if isinstance(self.sink, _stringTypes) else self.sink
 
-	def outlinerCheckboxToggled(self):
-		""" check if outliner checkbox is enable
+		self._sinkFile.write(json.dumps(record, sort_keys=True) + '\n')
+		self._sinkFile.flush()
+
+
+
+	def close(self):
+		""" close the JSONL file if this opened it
 		"""
-		self.outlinerEnable = self.outlinerCheckbox.isChecked() 
-		_logger.debug("outlinerEnable: {0}".format(self.outlinerEnable))
+		if self._sinkFile is not None and isinstance(self.sink, _stringTypes):
+			self._sinkFile.close()
 
+		self._sinkFile = None
 
 
 
-	def wireframeCheckboxToggled(self):
-		""" check if wireframe checkbox is enable
+	def snapshot(self):
+		""" {'phases': [records, oldest first], 'totals': {phase: counts}}, copies
 		"""
-		self.wireframeEnable = self.wireframeCheckbox.isChecked() 
-		_logger.debug("wireframeEnable: {0}".format(self.wireframeEnable))
+		return {
+			'phases': [dict(record) for record in self.records],
+			'totals': dict((phase, dict(total)) for phase, total in self.totals.items())
+		}
 
 
 
 
-	def toggleWireframeColor(self, colorIndex = None):
-		""" toggle wireframe color based on colorIndex
-		"""
+def _planNodeCount(plan):
+	""" number of nodes plan writes to, from the state diffPlan() already read when there is one
+	"""
+	if plan.before is not None:
+		return len(plan.before)
 
-		buttonToToggle = self.wireframeButtonGrp.button(colorIndex)
-		buttonToToggle.setChecked(True)
+	return len(plan.nodes())
 
 
 
 
-	def toggleOutlinerColor(self, colorIndex = None):
-		""" toggle outliner color based on colorIndex
-		"""
+def enableStats(enable=True, size=STATS_SIZE, sink=None):
+	""" start recording phase timings, fresh buffer each call; sink is a JSONL path or file object
+	disabled, the instrumented functions only test one module global
+	"""
+	global _stats
+
+	if _stats is not None:
+		_stats.close()
+
+	_stats = Stats(size, sink) if enable else None
+	return _stats
+
+
+
 
-		buttonToToggle = self.taggingButtonGrp.button(colorIndex)
-		buttonToToggle.setChecked(True)
+def stats():
+	""" recorded phase timings, see Stats.snapshot(), plus 'enabled'
+	"""
+	if _stats is None:
+		return {'enabled': False, 'phases': [], 'totals': {}}
+
+	result = _stats.snapshot()
+	result['enabled'] = True
+
+	return result
 
 
 
@@ -377,74 +768,3049 @@ class ColorTaggingUI(qtToolInstance.QDialog):
 
 # ==================== FUNCTIONS ====================
 
-def getSelection():
+def getSelection(hierarchy=False):
 	"""
 	make sure override only happen in transform
+	hierarchy adds every transform below the selected ones
 	"""
+	start = _clock() if _stats else 0
+
+	if not hierarchy:
+		# one call straight to strings, nothing to expand or dedupe
+		transformList = mc.ls(sl=True, type='transform', long=True) or []
 
-	transformList = pm.selected(typ = 'transform')
+	elif om._available():
+		transformList = [_nodeName(path) for path in iterSelection(hierarchy=True)]
+
+	else:
+		transformList = mc.ls(sl=True, dag=True, type='transform', long=True) or []
 	
-	_logger.debug("filterdSelection: {0}".format(transformList))
+	if _stats:
+		_stats.record('selection', start, nodes=len(transformList))
+
+	_logger.debug("filterdSelection: %s", transformList)
 	return transformList
 
 
 
 
-def outlinerOverrideOn(list=None, colorIndex=0):
-	""" toggle outliner color on
+def iterSelection(hierarchy=False, types=None, selList=None):
+	""" generator of MDagPaths for the selected dag nodes of the MFn types (transforms by default)
+	hierarchy walks each selected node's subtree with MItDag, every node comes out once
+	even when it is instanced or selected together with one of its parents
 	"""
+	if types is None:
+		types = (om.MFn.kTransform,)
 
-	tempClr = colorMapDict.get(colorIndex)
-	outLnrClr = map(lambda x: float(x)/255, tempClr)
-	_logger.debug("colorIndex: {0}". format(outLnrClr))
+	if selList is None:
+		selList = om.MGlobal.getActiveSelectionList()
 
-	for item in list:
-		item.useOutlinerColor.set(1)
-		item.outlinerColor.set(outLnrClr)
+	# MObjectHandle hash of every node yielded, instances share one MObject
+	seen = set()
 
+	selIt = om.MItSelectionList(selList, om.MFn.kDagNode)
+	dagIt = om.MItDag() if hierarchy else None
 
+	# one filter type lets MItDag skip the rest in C++
+	filterType = types[0] if len(types) == 1 else om.MFn.kInvalid
 
+	while not selIt.isDone():
+		# components count as their shape, ls -sl -type transform leaves them out too
+		if selIt.hasComponents():
+			selIt.next()
+			continue
 
-def outlinerOverrideOff(list=None):
-	""" toggle outliner color off
-	"""
-	for item in list:
-		item.outlinerColor.set(0,0,0)
-		item.useOutlinerColor.set(0)
+		path = selIt.getDagPath()
 
+		if not hierarchy:
+			if _matchesTypes(path, types) and _firstVisit(path, seen):
+				yield path
 
+		else:
+			dagIt.reset(path, om.MItDag.kDepthFirst, filterType)
 
+			while not dagIt.isDone():
+				child = dagIt.getPath()
 
-def wireframeOverrideOn(list=None, colorIndex=0):
-	""" toggle wireframe color on
-	"""
-	for item in list:
-		item.overrideEnabled.set(1)
-		item.overrideRGBColors.set(0)		# make sure it's overridng index color
-		item.overrideColor.set(colorIndex)
+				# subtree already walked from an instance or a selected parent
+				if not _firstVisit(child, seen):
+					dagIt.prune()
+				elif _matchesTypes(child, types):
+					yield child
 
+				dagIt.next()
 
+		selIt.next()
 
 
-def wireframeOverrideOff(list=None):
-	""" toggle wireframe color off
+
+
+def _matchesTypes(path, types):
+	for fnType in types:
+		if path.hasFn(fnType):
+			return True
+
+	return False
+
+
+
+
+def _firstVisit(path, seen):
+	""" True the first time the node under path comes up
 	"""
-	for item in list:
-		item.overrideColor.set(1)
-		item.overrideRGBColors.set(0)		# make sure it's overridng index color
-		item.overrideEnabled.set(0)
+	key = om.MObjectHandle(path.node()).hashCode()
 
+	if key in seen:
+		return False
 
+	seen.add(key)
+	return True
 
 
-def refreshMayaUI():
-	""" refresh UI after updates
+
+
+def outlinerOverrideOn(list=None, colorIndex=0):
+	""" toggle outliner color on
 	"""
-	mel.eval('autoUpdateAttrEd')
-	mc.refresh()
+	return applyPlan(diffPlan(outlinerPlan(list, colorIndex)))
+
+
+
+
+def outlinerOverrideOff(list=None):
+	""" toggle outliner color off
+	"""
+	return applyPlan(diffPlan(outlinerPlan(list, 0)))
+
+
+
+
+def wireframeOverrideOn(list=None, colorIndex=0, minimal=False):
+	""" toggle wireframe color on
+	minimal leaves out transforms that inherit the color from a selected parent
+	"""
+	if minimal:
+		return applyPlan(diffPlan(minimalWireframePlan(list, colorIndex)))
+
+	return applyPlan(diffPlan(wireframePlan(list, colorIndex)))
+
+
+
+
+def wireframeOverrideOff(list=None):
+	""" toggle wireframe color off
+	"""
+	return applyPlan(diffPlan(wireframePlan(list, 0)))
+
+
+
+
+def tagNodes(list=None, outliner=None, wireframe=None, minimal=False, palette=None):
+	""" tag outliner and/or wireframe color in one undo step
+	colorIndex 0 turns a channel off, None leaves it untouched
+	colorIndex is into palette when given, Palette.fromJson() ones tag RGB wireframes
+	"""
+	return applyPlan(buildPlan(list, outliner, wireframe, minimal=minimal, palette=palette))
+
+
+
+
+def snapshot(list=None, path=None):
+	""" ColorSnapshot of the outliner and wireframe state of list, every transform by default
+	also saved to path when given
+	"""
+	shot = ColorSnapshot.capture(list)
+
+	if path:
+		shot.save(path)
+
+	return shot
+
+
+
+
+def restore(shot, undoable=True):
+	""" put back a ColorSnapshot, or the snapshot file at shot, in one bulk write
+	nodes deleted since the snapshot are skipped, returns the WritePlan
+	"""
+	if isinstance(shot, _stringTypes):
+		shot = ColorSnapshot.load(shot)
+
+	return applyPlan(diffPlan(shot.toPlan()), undoable)
+
+
+
+
+def buildPlan(list=None, outliner=None, wireframe=None, skipUnchanged=True, minimal=False, palette=None):
+	""" writes for tagNodes(), outliner first then wireframe
+	with skipUnchanged only the plugs whose value actually changes are kept
+	minimal uses minimalWireframePlan() for the wireframe writes, index colors only
+	palette picks the colors of outliner / wireframe, PALETTE by default
+	"""
+	start = _clock() if _stats else 0
+	plan = WritePlan()
+
+	if outliner is not None:
+		outlinerPlan(list, outliner, plan, palette)
+
+	if wireframe is not None and minimal and (palette is None or palette.indexed):
+		minimalWireframePlan(list, wireframe, plan)
+
+	elif wireframe is not None:
+		wireframePlan(list, wireframe, plan, palette)
+
+	# before diffPlan(), its read and diff are phases of their own
+	if _stats:
+		_stats.record('plan', start, nodes=_planNodeCount(plan), writes=plan.writeCount())
+
+	if skipUnchanged:
+		plan = diffPlan(plan)
+
+	return plan
+
+
+
+
+def diffPlan(plan, state=None):
+	""" copy of plan without the writes that would not change anything
+	state is the current OverrideState of the plan nodes, read in one pass if not given
+	"""
+	if not plan:
+		return plan
+
+	if state is None:
+		state = getWriteBackend().read(plan.nodes(), plan.attrs())
+
+	start = _clock() if _stats else 0
+	indexOf = state.indexOf()
+	diffed = WritePlan()
+
+	for attr, value, nodes in plan.entries:
+		column = state.columns[attr]
+
+		if ATTR_KINDS.get(attr) == 'float3':
+			changed = [node for node in nodes if not _sameColor(column, indexOf[_nodeName(node)], value)]
+		else:
+			value = int(value)
+			changed = [node for node in nodes if column[indexOf[_nodeName(node)]] != value]
+
+		diffed.add(attr, value, changed)
+
+	diffed.skipped = plan.skipped + plan.writeCount() - diffed.writeCount()
+	diffed.before = state.subset(diffed.nodes())
+
+	if _stats:
+		_stats.record('diff', start, nodes=len(state), writes=diffed.writeCount())
+
+	_logger.info("%d writes, %d skipped as unchanged", diffed.writeCount(), diffed.skipped)
+	return diffed
+
+
+
+
+def _sameColor(column, i, value, tolerance=1e-5):
+	""" True if the float3 stored for node i in column matches value
+	"""
+	i *= 3
+
+	return abs(column[i] - value[0]) < tolerance and abs(column[i + 1] - value[1]) < tolerance and abs(column[i + 2] - value[2]) < tolerance
+
+
+
+
+def outlinerPlan(list=None, colorIndex=0, plan=None, palette=None):
+	""" writes turning outliner color on for colorIndex of palette (PALETTE by default), off for 0
+	"""
+	plan = plan if plan is not None else WritePlan()
+	palette = palette or PALETTE
+
+	if colorIndex == 0:
+		plan.add('outlinerColor', (0.0, 0.0, 0.0), list)
+		plan.add('useOutlinerColor', 0, list)
+
+	else:
+		outLnrClr = palette.floats[colorIndex]
+		_logger.debug("colorIndex: %s", outLnrClr)
+
+		plan.add('useOutlinerColor', 1, list)
+		plan.add('outlinerColor', outLnrClr, list)
+
+	return plan
+
+
+
+
+def wireframePlan(list=None, colorIndex=0, plan=None, palette=None):
+	""" writes turning wireframe index color on for colorIndex, off for 0
+	an RGB palette writes its color as an RGB override instead
+	"""
+	plan = plan if plan is not None else WritePlan()
+
+	if colorIndex == 0:
+		plan.add('overrideColor', 1, list)
+		plan.add('overrideRGBColors', 0, list)		# make sure it's overridng index color
+		plan.add('overrideEnabled', 0, list)
+
+	elif palette is not None and not palette.indexed:
+		plan.add('overrideEnabled', 1, list)
+		plan.add('overrideRGBColors', 1, list)
+		plan.add('overrideColorRGB', palette.floats[colorIndex], list)
+
+	else:
+		plan.add('overrideEnabled', 1, list)
+		plan.add('overrideRGBColors', 0, list)		# make sure it's overridng index color
+		plan.add('overrideColor', colorIndex, list)
+
+	return plan
+
+
+
+
+# wireframe attributes that decide what a transform and everything below it draws
+WIREFRAME_ATTRS = ('overrideEnabled', 'overrideRGBColors', 'overrideColor')
+
+
+def minimalWireframePlan(list=None, colorIndex=0, plan=None):
+	""" wireframePlan() without the transforms that already inherit colorIndex once it is applied
+	drawing overrides flow down the DAG to every child without its own override, so with a
+	whole rig selected only the top transform gets written; the viewport ends up the same
+	as with wireframePlan(), the skipped transforms just keep following their parent
+	"""
+	plan = plan if plan is not None else WritePlan()
+
+	# turning off has nothing to inherit, every enabled override has to go
+	if colorIndex == 0 or not list:
+		return wireframePlan(list, colorIndex, plan)
+
+	selected = mc.ls([_nodeName(node) for node in list], type='transform', long=True) or []
+	selectedSet = set(selected)
+
+	# unselected ancestors decide what the selection inherits, walk up until a known node
+	ancestors = set()
+	for node in selected:
+		parent = node.rpartition('|')[0]
+
+		while parent and parent not in selectedSet and parent not in ancestors:
+			ancestors.add(parent)
+			parent = parent.rpartition('|')[0]
+
+	nodes = selected + sorted(ancestors)
+	state = getWriteBackend().read(nodes, WIREFRAME_ATTRS)
+	indexOf = state.indexOf()
+
+	enabled = state.columns['overrideEnabled']
+	rgb = state.columns['overrideRGBColors']
+	color = state.columns['overrideColor']
+
+	# color every node draws once colorIndex is written on the selection, parents first
+	drawn = {'': 0}
+	for node in sorted(nodes, key=lambda node: node.count('|')):
+		i = indexOf[node]
+
+		if node in selectedSet:
+			drawn[node] = colorIndex
+		elif enabled[i]:
+			drawn[node] = CUSTOM_COLOR if rgb[i] else color[i]
+		else:
+			drawn[node] = drawn[node.rpartition('|')[0]]
+
+	# a selected transform without its own override already draws whatever its parent draws
+	writeList = []
+	for node in selected:
+		if enabled[indexOf[node]] or drawn[node.rpartition('|')[0]] != colorIndex:
+			writeList.append(node)
+
+	wireframePlan(writeList, colorIndex, plan)
+	plan.skipped += len(WIREFRAME_ATTRS) * (len(selected) - len(writeList))
+
+	_logger.info("minimal wireframe: %d of %d transforms written", len(writeList), len(selected))
+	return plan
+
+
+
+
+def refreshMayaUI(outliner=True, wireframe=True, list=None):
+	""" refresh UI after updates, coalesced onto idle time
+	outliner / wireframe say which colors changed, list the nodes that changed
+	"""
+	flags = 0
+
+	if outliner:
+		flags |= REFRESH_OUTLINER
+	if wireframe:
+		flags |= REFRESH_VIEWPORT
+
+	getRefreshScheduler().request(flags, list)
+
+
+
+
+
+
+# ==================== UI REFRESH ====================
+
+REFRESH_OUTLINER = 1
+REFRESH_VIEWPORT = 2
+
+# MEL helper returning the node shown in the Attribute Editor
+_AE_TAB_PROC = '''
+global proc string colorTaggingAECurrentTab()
+{
+	global string $gAECurrentTab;
+	return $gAECurrentTab;
+}
+'''
+
+# scheduler instance, created by getRefreshScheduler()
+_refreshScheduler = None
+
+
+
+class RefreshScheduler(object):
+	""" collects refresh requests and runs them once when Maya goes idle
+	"""
+
+	def __init__(self):
+		self.flags = 0
+		self.nodes = set()
+		self.scheduled = False
+
+		self._procExists = {}
+
+
+
+	def request(self, flags, nodes=None):
+		""" queue a refresh, requests before the next idle are merged
+		"""
+		self.flags |= flags
+
+		if nodes:
+			for node in nodes:
+				self.nodes.add(_nodeName(node).rsplit('|', 1)[-1])
+
+		if not self.scheduled:
+			self.scheduled = True
+			mc.evalDeferred(self.flush, lowestPriority=True)
+
+
+
+	def flush(self):
+		""" run the merged refresh
+		"""
+		start = _clock() if _stats else 0
+		flags = self.flags
+		nodes = self.nodes
+
+		self.flags = 0
+		self.nodes = set()
+		self.scheduled = False
+
+		# only wireframe colors show in the viewport
+		if flags & REFRESH_VIEWPORT:
+			mc.refresh()
+
+		if flags & REFRESH_OUTLINER:
+			self.refreshOutliners()
+
+		if nodes and self.attrEditorNode() in nodes:
+			mel.eval('autoUpdateAttrEd')
+
+			# AE templates may have defined new procs
+			self._procExists = dict((k, v) for k, v in self._procExists.items() if v)
+
+		if _stats:
+			_stats.record('refresh', start, nodes=len(nodes))
+
+
+
+	def refreshOutliners(self):
+		""" redraw outliner panels only
+		"""
+		for panel in mc.getPanel(type='outlinerPanel') or []:
+			mc.outlinerEditor(panel, edit=True, refresh=True)
+
+		if self.procExists('AEdagNodeCommonRefreshOutliners'):
+			mel.eval('AEdagNodeCommonRefreshOutliners()')
+
+
+
+	def attrEditorNode(self):
+		""" short name of the node shown in the Attribute Editor, '' if none
+		"""
+		if not self.procExists('colorTaggingAECurrentTab'):
+			mel.eval(_AE_TAB_PROC)
+			self._procExists['colorTaggingAECurrentTab'] = True
+
+		return (mel.eval('colorTaggingAECurrentTab()') or '').rsplit('|', 1)[-1]
+
+
+
+	def procExists(self, name):
+		""" cached MEL 'exists' check
+		"""
+		exists = self._procExists.get(name)
+
+		if exists is None:
+			exists = self._procExists[name] = int(mel.eval('exists {0}'.format(name))) == 1
+
+		return exists
+
+
+
+
+def getRefreshScheduler():
+	""" session refresh scheduler
+	"""
+	global _refreshScheduler
+
+	if _refreshScheduler is None:
+		_refreshScheduler = RefreshScheduler()
+
+	return _refreshScheduler
+
+
+
+
+
+
+# ==================== UNDO ====================
+
+# name of the scripted command registered by colorTaggingCmd.py
+COMMAND_NAME = 'colorTag'
+
+# None until loadCommandPlugin() tried, then True/False
+_commandLoaded = None
+
+# plan handed over to the colorTag command by applyPlan()
+_pendingPlan = None
+
+
+
+def applyPlan(plan, undoable=True):
+	""" write plan through the backend as a single undo step
+	goes through the colorTag command when its plugin loads, an undo chunk otherwise
+	"""
+	global _pendingPlan
+
+	if not plan:
+		return plan
+
+	_notifyIndex(plan)
+
+	if not undoable:
+		getWriteBackend().write(plan)
+
+	elif loadCommandPlugin():
+		_pendingPlan = plan
+		try:
+			getattr(mc, COMMAND_NAME)()
+		finally:
+			_pendingPlan = None
+
+	else:
+		# modifier writes bypass the undo queue, fall back to commands inside a chunk
+		backend = getWriteBackend()
+		if not backend.undoable:
+			backend = CmdsWriteBackend()
+
+		with undoChunk(COMMAND_NAME):
+			backend.write(plan)
+
+	return plan
+
+
+
+
+def _notifyIndex(plan):
+	""" point the color index at the nodes plan writes when no callback will
+	"""
+	if _colorIndex is not None and _colorIndex.built and not _colorIndex.tracking and plan.entries:
+		_colorIndex.markDirty(mc.ls([_nodeName(node) for node in plan.nodes()], uuid=True) or [])
+
+
+
+
+def takePendingPlan():
+	""" plan queued by applyPlan(), consumed by the colorTag command
+	"""
+	global _pendingPlan
+
+	plan = _pendingPlan
+	_pendingPlan = None
+
+	return plan
+
+
+
+
+def loadCommandPlugin():
+	""" load colorTaggingCmd.py so the undoable colorTag command exists, True on success
+	"""
+	global _commandLoaded
+
+	if _commandLoaded is None:
+		path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'colorTaggingCmd.py')
+
+		try:
+			if not mc.pluginInfo('colorTaggingCmd', query=True, loaded=True):
+				mc.loadPlugin(path, quiet=True)
+			_commandLoaded = hasattr(mc, COMMAND_NAME)
+
+		except Exception as e:
+			_logger.warning("colorTag command unavailable, using undo chunks: %s", e)
+			_commandLoaded = False
+
+	return _commandLoaded
+
+
+
+
+@contextlib.contextmanager
+def undoChunk(name=COMMAND_NAME):
+	""" group every undoable command inside the block into one undo step
+	"""
+	mc.undoInfo(openChunk=True, chunkName=name)
+	try:
+		yield
+	finally:
+		mc.undoInfo(closeChunk=True)
+
+
+
+
+@contextlib.contextmanager
+def undoSuspended():
+	""" keep every command inside the block out of the undo queue, without flushing it
+	"""
+	state = mc.undoInfo(query=True, state=True)
+	mc.undoInfo(stateWithoutFlush=False)
+	try:
+		yield
+	finally:
+		mc.undoInfo(stateWithoutFlush=state)
+
+
+
+
+
+
+# ==================== CHUNKED APPLY ====================
+
+# plans with more writes than this are applied in chunks by the UI
+CHUNKED_APPLY_THRESHOLD = 20000
+
+
+
+class ChunkedApply(object):
+	""" writes a plan in time-boxed chunks so Maya stays responsive in between
+	call step() from an idle callback until it returns False, cancel() rolls back
+	chunks are written outside the undo queue and the finished job is recorded as one colorTag
+	command, so nothing done between steps joins it; without the command the first step writes
+	the whole plan in one undo chunk
+	"""
+
+	def __init__(self, plan, budget=0.05, chunkSize=1000):
+		self.plan = plan
+		self.budget = budget
+		self.chunkSize = chunkSize
+
+		self.total = plan.writeCount()
+		self.done = 0
+		self.nodeCount = len(plan.nodes())
+		self.elapsed = 0.0
+
+		self.finished = False
+		self.cancelled = False
+
+		# rollback needs the values from before the first chunk
+		if plan.before is None:
+			plan.before = getWriteBackend().read(plan.nodes(), plan.attrs())
+
+		_notifyIndex(plan)
+
+		self._backend = getWriteBackend()
+		self._useCommand = loadCommandPlugin()
+
+		# modifier writes bypass the undo queue, without the command they go through commands
+		if not self._backend.undoable and not self._useCommand:
+			self._backend = CmdsWriteBackend()
+
+		self._entry = 0
+		self._offset = 0
+		self._touched = {}
+
+
+
+	def step(self):
+		""" write chunks until the time budget is spent, True while work is left
+		"""
+		if self.finished:
+			return False
+
+		start = _clock()
+
+		# only the colorTag command can join chunks into one undo step, without it write everything now
+		deadline = start + self.budget if self._useCommand else None
+
+		with self._writing():
+			self._writeChunks(deadline)
+
+		self.elapsed += _clock() - start
+
+		if self._entry >= len(self.plan.entries):
+			self._finish()
+
+		return not self.finished
+
+
+
+	def _writeChunks(self, deadline):
+		""" write chunks until deadline, None for all of them, resizing them as they go
+		"""
+		while self._entry < len(self.plan.entries) and (deadline is None or _clock() < deadline):
+			chunk = self._nextChunk()
+			chunkStart = _clock()
+
+			self._backend.write(chunk)
+
+			chunkTime = _clock() - chunkStart
+			self.done += chunk.writeCount()
+
+			# aim for about four chunks per budget
+			if chunkTime > 0:
+				self.chunkSize = max(100, min(100000, int(self.chunkSize * self.budget / 4 / chunkTime)))
+
+
+
+	def _writing(self):
+		""" undo context of every write: outside the queue for the command to record, else one chunk
+		"""
+		return undoSuspended() if self._useCommand else undoChunk(COMMAND_NAME)
+
+
+
+	def run(self):
+		""" write everything now, for scripts and batch mode, rolls back if a write fails
+		"""
+		try:
+			while self.step():
+				pass
+		except Exception:
+			self.cancel()
+			raise
+
+		return self.plan
+
+
+
+	def cancel(self):
+		""" stop and write the original values back on every node touched so far
+		"""
+		if self.finished:
+			return
+
+		self.done = 0
+		self.finished = True
+		self.cancelled = True
+
+		touched = list(self._touched.values())
+		if touched:
+			with self._writing():
+				self._backend.write(self.plan.before.subset(touched).toPlan())
+
+
+
+	def progress(self):
+		""" fraction of the writes done, 0 to 1
+		"""
+		if not self.total:
+			return 1.0
+
+		return float(self.done) / self.total
+
+
+
+	def nodesPerSecond(self):
+		""" throughput so far, in nodes
+		"""
+		if not self.elapsed:
+			return 0.0
+
+		return self.progress() * self.nodeCount / self.elapsed
+
+
+
+	def _nextChunk(self):
+		""" next chunkSize writes of the plan, in plan order
+		"""
+		chunk = WritePlan()
+		size = self.chunkSize
+
+		while size > 0 and self._entry < len(self.plan.entries):
+			attr, value, nodes = self.plan.entries[self._entry]
+			part = nodes[self._offset:self._offset + size]
+
+			chunk.add(attr, value, part)
+			for node in part:
+				self._touched[_nodeName(node)] = node
+
+			self._offset += len(part)
+			size -= len(part)
+
+			if self._offset >= len(nodes):
+				self._entry += 1
+				self._offset = 0
+
+		return chunk
+
+
+
+	def _finish(self):
+		""" register the whole job as one undo step when the colorTag command is there
+		"""
+		self.finished = True
+
+		if self._useCommand:
+			global _pendingPlan
+
+			self.plan.applied = True
+			_pendingPlan = self.plan
+			try:
+				getattr(mc, COMMAND_NAME)()
+			finally:
+				_pendingPlan = None
+
+		_logger.info("chunked apply: %d writes in %.2fs", self.done, self.elapsed)
+
+
+
+
+
+
+# ==================== OVERRIDE STATE ====================
+
+# array typecode per attribute kind, float3 takes three slots per node
+_TYPECODES = {'bool':'B', 'int':'h', 'float3':'f'}
+
+
+
+class OverrideState(object):
+	""" attribute values of a node list, one flat typed array per attribute
+	"""
+
+	def __init__(self, nodes=None, attrs=()):
+		self.nodes = [node for node in nodes or []]
+		self.attrs = tuple(attrs)
+		self.columns = {}
+
+		for attr in self.attrs:
+			kind = ATTR_KINDS[attr]
+			width = 3 if kind == 'float3' else 1
+			self.columns[attr] = array.array(_TYPECODES[kind], [0]) * (width * len(self.nodes))
+
+
+
+	def __len__(self):
+		return len(self.nodes)
+
+
+
+	def get(self, attr, i):
+		""" value of attr on the i-th node
+		"""
+		column = self.columns[attr]
+
+		if column.typecode == 'f':
+			return tuple(column[i * 3:i * 3 + 3])
+
+		return column[i]
+
+
+
+	def set(self, attr, i, value):
+		""" store value of attr on the i-th node
+		"""
+		column = self.columns[attr]
+
+		if column.typecode == 'f':
+			column[i * 3:i * 3 + 3] = array.array('f', value)
+		else:
+			column[i] = int(value)
+
+
+
+	def indexOf(self):
+		""" node name -> position in self.nodes
+		"""
+		return dict((_nodeName(node), i) for i, node in enumerate(self.nodes))
+
+
+
+	def subset(self, nodes):
+		""" new state holding only the given nodes
+		"""
+		indexOf = self.indexOf()
+		state = OverrideState(nodes, self.attrs)
+
+		for attr in self.attrs:
+			for i, node in enumerate(state.nodes):
+				state.set(attr, i, self.get(attr, indexOf[_nodeName(node)]))
+
+		return state
+
+
+
+	def copy(self):
+		""" independent copy sharing the node list
+		"""
+		state = OverrideState(attrs=())
+		state.nodes = self.nodes
+		state.attrs = self.attrs
+		state.columns = dict((attr, array.array(column.typecode, column)) for attr, column in self.columns.items())
+
+		return state
+
+
+
+	def applyPlan(self, plan):
+		""" update the stored values with the writes of plan
+		"""
+		indexOf = self.indexOf()
+
+		for attr, value, nodes in plan.entries:
+			if attr not in self.columns:
+				continue
+
+			for node in nodes:
+				self.set(attr, indexOf[_nodeName(node)], value)
+
+
+
+	def toPlan(self, attrs=None):
+		""" plan writing the stored values back, nodes grouped by value
+		"""
+		plan = WritePlan()
+
+		for attr in attrs or self.attrs:
+			groups = {}
+			order = []
+
+			for i, node in enumerate(self.nodes):
+				value = self.get(attr, i)
+				group = groups.get(value)
+				if group is None:
+					group = groups[value] = []
+					order.append(value)
+
+				group.append(node)
+
+			for value in order:
+				plan.add(attr, value, groups[value])
+
+		return plan
+
+
+
+
+
+
+# ==================== SNAPSHOT ====================
+
+# flag bits of ColorSnapshot.flags
+SNAPSHOT_USE_OUTLINER = 1
+SNAPSHOT_OVERRIDE = 2
+SNAPSHOT_RGB = 4
+
+# file layout: header, then 16 byte UUIDs, uint8 indices, float32 outliner colors, uint8 flags,
+# float32 RGB override colors (version 2+, version 1 files leave overrideColorRGB alone)
+SNAPSHOT_MAGIC = b'CTSN'
+SNAPSHOT_VERSION = 2
+_SNAPSHOT_HEADER = struct.Struct('<4sHI')
+
+# INDEX_ATTRS plus the RGB color, which is only read and written for nodes drawing with it
+SNAPSHOT_ATTRS = ('useOutlinerColor', 'outlinerColor', 'overrideEnabled', 'overrideRGBColors', 'overrideColor', 'overrideColorRGB')
+
+
+
+class ColorSnapshot(object):
+	""" outliner and wireframe state of a set of transforms, keyed by UUID
+	one packed array per value, about 42 bytes a node on disk
+	"""
+
+	def __init__(self, uuids=None):
+		self.uuids = [uuid for uuid in uuids or []]
+		self.index = array.array('B', [0]) * len(self.uuids)
+		self.outliner = array.array('f', [0.0]) * (3 * len(self.uuids))
+		self.flags = array.array('B', [0]) * len(self.uuids)
+
+		# overrideColorRGB, None for version 1 snapshots that never stored it
+		self.rgb = array.array('f', [0.0]) * (3 * len(self.uuids))
+
+		# long names at capture time, the fallback for UUIDs that no longer resolve
+		self.names = []
+
+		# how the last toState() found the nodes: {'uuid': n, 'name': n, 'missing': n}
+		self.resolved = {}
+
+
+
+	def __len__(self):
+		return len(self.uuids)
+
+
+
+	@classmethod
+	def capture(cls, list=None):
+		""" read the state of list, every transform by default, in one bulk read
+		"""
+		# ls lists the whole scene for an empty list
+		names = []
+		if list is None:
+			names = mc.ls(type='transform', long=True) or []
+		elif list:
+			names = mc.ls([_nodeName(node) for node in list], type='transform', long=True) or []
+
+		uuids = mc.ls(names, uuid=True) or [] if names else []
+
+		return cls.fromState(uuids, getWriteBackend().read(names, INDEX_ATTRS))
+
+
+
+	@classmethod
+	def fromState(cls, uuids, state):
+		""" pack an INDEX_ATTRS or SNAPSHOT_ATTRS OverrideState, uuids in the same order as state.nodes
+		without overrideColorRGB it is read here, for the nodes with an RGB override only
+		"""
+		shot = cls(uuids)
+		shot.names = [_nodeName(node) for node in state.nodes]
+
+		useOutliner = state.columns['useOutlinerColor']
+		enabled = state.columns['overrideEnabled']
+		rgb = state.columns['overrideRGBColors']
+
+		shot.index = array.array('B', state.columns['overrideColor'])
+		shot.outliner = array.array('f', state.columns['outlinerColor'])
+		shot.flags = array.array('B', [
+			(SNAPSHOT_USE_OUTLINER if useOutliner[i] else 0) | (SNAPSHOT_OVERRIDE if enabled[i] else 0) | (SNAPSHOT_RGB if rgb[i] else 0)
+			for i in range(len(shot.uuids))])
+
+		if 'overrideColorRGB' in state.columns:
+			shot.rgb = array.array('f', state.columns['overrideColorRGB'])
+
+		else:
+			picked = [i for i in range(len(shot.uuids)) if rgb[i]]
+			if picked:
+				colors = getWriteBackend().read([state.nodes[i] for i in picked], ('overrideColorRGB',)).columns['overrideColorRGB']
+				for k, i in enumerate(picked):
+					shot.rgb[i * 3:i * 3 + 3] = colors[k * 3:k * 3 + 3]
+
+		return shot
+
+
+
+	def toState(self):
+		""" INDEX_ATTRS OverrideState of the nodes still in the scene, found by UUID
+		then by long name for the ones whose UUID changed (re-exports, re-created references)
+		SNAPSHOT_ATTRS when one of them had an RGB override
+		"""
+		position = dict((uuid, i) for i, uuid in enumerate(self.uuids))
+
+		# ls lists the whole scene for an empty list
+		names = mc.ls(self.uuids, long=True) or [] if self.uuids else []
+		positions = [position[uuid] for uuid in mc.ls(names, uuid=True) or []] if names else []
+		byUuid = len(positions)
+
+		if self.names and byUuid < len(self.uuids):
+			seen = set(self.uuids[j] for j in positions)
+			missing = [j for j, uuid in enumerate(self.uuids) if uuid not in seen]
+
+			existing = set(mc.ls([self.names[j] for j in missing], long=True) or [])
+			existing.difference_update(names)
+
+			for j in missing:
+				if self.names[j] in existing:
+					existing.discard(self.names[j])
+					names.append(self.names[j])
+					positions.append(j)
+
+		self.resolved = {'uuid': byUuid, 'name': len(positions) - byUuid, 'missing': len(self.uuids) - len(positions)}
+
+		withRgb = self.rgb is not None and any(self.flags[j] & SNAPSHOT_RGB for j in positions)
+		state = OverrideState(names, SNAPSHOT_ATTRS if withRgb else INDEX_ATTRS)
+		useOutliner = state.columns['useOutlinerColor']
+		outliner = state.columns['outlinerColor']
+		enabled = state.columns['overrideEnabled']
+		rgb = state.columns['overrideRGBColors']
+		colorIdx = state.columns['overrideColor']
+		rgbColor = state.columns.get('overrideColorRGB')
+
+		for i, j in enumerate(positions):
+			flags = self.flags[j]
+
+			useOutliner[i] = 1 if flags & SNAPSHOT_USE_OUTLINER else 0
+			enabled[i] = 1 if flags & SNAPSHOT_OVERRIDE else 0
+			rgb[i] = 1 if flags & SNAPSHOT_RGB else 0
+			colorIdx[i] = self.index[j]
+			outliner[i * 3:i * 3 + 3] = self.outliner[j * 3:j * 3 + 3]
+
+			if rgbColor is not None:
+				rgbColor[i * 3:i * 3 + 3] = self.rgb[j * 3:j * 3 + 3]
+
+		if self.resolved['missing']:
+			_logger.warning("%d snapshot nodes no longer exist", self.resolved['missing'])
+
+		return state
+
+
+
+	def tagged(self):
+		""" snapshot of only the nodes with an outliner or wireframe override on
+		"""
+		keep = [i for i, flags in enumerate(self.flags) if flags & (SNAPSHOT_USE_OUTLINER | SNAPSHOT_OVERRIDE)]
+
+		shot = ColorSnapshot()
+		shot.uuids = [self.uuids[i] for i in keep]
+		shot.names = [self.names[i] for i in keep] if self.names else []
+		shot.index = array.array('B', [self.index[i] for i in keep])
+		shot.outliner = array.array('f', [value for i in keep for value in self.outliner[i * 3:i * 3 + 3]])
+		shot.flags = array.array('B', [self.flags[i] for i in keep])
+		shot.rgb = None if self.rgb is None else array.array('f', [value for i in keep for value in self.rgb[i * 3:i * 3 + 3]])
+
+		return shot
+
+
+
+	def toPlan(self, state=None):
+		""" plan writing the snapshot back, nodes grouped by value
+		state is the toState() result when there already is one
+		"""
+		if state is None:
+			state = self.toState()
+
+		plan = state.toPlan(INDEX_ATTRS)
+
+		# the RGB color only matters where overrideRGBColors goes back on
+		if 'overrideColorRGB' in state.columns:
+			rgb = state.columns['overrideRGBColors']
+			picked = state.subset([state.nodes[i] for i in range(len(state)) if rgb[i]])
+
+			for attr, value, nodes in picked.toPlan(('overrideColorRGB',)).entries:
+				plan.add(attr, value, nodes)
+
+		return plan
+
+
+
+	# ---------- binary file ----------
+
+	def toBytes(self):
+		header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(self.uuids))
+		uuids = binascii.unhexlify(''.join(self.uuids).replace('-', '').encode('ascii'))
+
+		outliner = array.array('f', self.outliner)
+		rgb = array.array('f', self.rgb) if self.rgb is not None else array.array('f', [0.0]) * (3 * len(self.uuids))
+		if sys.byteorder == 'big':
+			outliner.byteswap()
+			rgb.byteswap()
+
+		return b''.join([header, uuids, _arrayBytes(self.index), _arrayBytes(outliner), _arrayBytes(self.flags), _arrayBytes(rgb)])
+
+
+
+	@classmethod
+	def fromBytes(cls, data):
+		magic, version, count = _SNAPSHOT_HEADER.unpack_from(data, 0)
+
+		if magic != SNAPSHOT_MAGIC:
+			raise ValueError("not a color snapshot")
+		if version > SNAPSHOT_VERSION:
+			raise ValueError("color snapshot version {0} is newer than this tool ({1})".format(version, SNAPSHOT_VERSION))
+
+		offset = _SNAPSHOT_HEADER.size
+		hexUuids = binascii.hexlify(data[offset:offset + 16 * count]).decode('ascii').upper()
+		offset += 16 * count
+
+		shot = cls()
+		shot.uuids = ['{0}-{1}-{2}-{3}-{4}'.format(h[0:8], h[8:12], h[12:16], h[16:20], h[20:32]) for h in (hexUuids[i:i + 32] for i in range(0, 32 * count, 32))]
+
+		shot.index = _arrayFromBytes('B', data[offset:offset + count])
+		offset += count
+
+		shot.outliner = _arrayFromBytes('f', data[offset:offset + 12 * count])
+		if sys.byteorder == 'big':
+			shot.outliner.byteswap()
+		offset += 12 * count
+
+		shot.flags = _arrayFromBytes('B', data[offset:offset + count])
+		offset += count
+
+		if len(shot.flags) != count:
+			raise ValueError("color snapshot is truncated")
+
+		shot.rgb = None
+		if version >= 2:
+			shot.rgb = _arrayFromBytes('f', data[offset:offset + 12 * count])
+			if sys.byteorder == 'big':
+				shot.rgb.byteswap()
+
+			if len(shot.rgb) != 3 * count:
+				raise ValueError("color snapshot is truncated")
+
+		return shot
+
+
+
+	def save(self, path):
+		with open(path, 'wb') as f:
+			f.write(self.toBytes())
+
+
+
+	@classmethod
+	def load(cls, path):
+		with open(path, 'rb') as f:
+			return cls.fromBytes(f.read())
+
+
+
+
+def _arrayBytes(arr):
+	""" raw bytes of an array.array, Python 2 and 3
+	"""
+	return arr.tobytes() if hasattr(arr, 'tobytes') else arr.tostring()
+
+
+
+
+def _arrayFromBytes(typecode, data):
+	arr = array.array(typecode)
+
+	if hasattr(arr, 'frombytes'):
+		arr.frombytes(bytes(data))
+	else:
+		arr.fromstring(bytes(data))
+
+	return arr
+
+
+
+
+
+
+
+
+# ==================== SCENE TAG TABLE ====================
+
+# fileInfo key of the table; base64 of zlib of header + snapshot bytes + newline separated names
+TAG_TABLE_KEY = 'colorTaggingTool'
+TAG_TABLE_MAGIC = b'CTTT'
+TAG_TABLE_VERSION = 2
+_TAG_TABLE_HEADER = struct.Struct('<4sHI')
+
+# session table, created by getTagTable()
+_tagTable = None
+
+
+
+class TagTable(object):
+	""" copy of every tag in the scene's fileInfo, written before save, reapplied after open
+	so tags lost to referencing, re-exports or dropped reference edits come back
+	"""
+
+	def __init__(self):
+		self.tracking = False
+		self._callbacks = []
+
+		# timings of the last rehydrate(), for checking big scenes stay fast
+		self.lastRehydrate = {}
+
+
+
+	@staticmethod
+	def encode(shot):
+		""" fileInfo string of a ColorSnapshot, names included
+		"""
+		snapshotBytes = shot.toBytes()
+		names = '\n'.join(shot.names).encode('utf-8')
+		payload = _TAG_TABLE_HEADER.pack(TAG_TABLE_MAGIC, TAG_TABLE_VERSION, len(snapshotBytes)) + snapshotBytes + names
+
+		return base64.b64encode(zlib.compress(payload, 6)).decode('ascii')
+
+
+
+	@staticmethod
+	def decode(text):
+		""" ColorSnapshot of a fileInfo string from encode()
+		"""
+		payload = zlib.decompress(base64.b64decode(text))
+		magic, version, size = _TAG_TABLE_HEADER.unpack_from(payload, 0)
+
+		if magic != TAG_TABLE_MAGIC:
+			raise ValueError("not a color tag table")
+		if version > TAG_TABLE_VERSION:
+			raise ValueError("color tag table version {0} is newer than this tool ({1})".format(version, TAG_TABLE_VERSION))
+
+		offset = _TAG_TABLE_HEADER.size
+		shot = ColorSnapshot.fromBytes(payload[offset:offset + size])
+
+		names = payload[offset + size:].decode('utf-8')
+		shot.names = names.split('\n') if names else []
+
+		return shot
+
+
+
+	def save(self):
+		""" store the tags of every transform in fileInfo
+		"""
+		start = _clock()
+
+		shot = ColorSnapshot.capture().tagged()
+		mc.fileInfo(TAG_TABLE_KEY, self.encode(shot))
+
+		_logger.info("tag table: %d tagged transforms saved in %.3fs", len(shot), _clock() - start)
+		return shot
+
+
+
+	def load(self):
+		""" ColorSnapshot stored in the scene, None without one
+		"""
+		text = mc.fileInfo(TAG_TABLE_KEY, q=True)
+
+		if not text or not text[0]:
+			return None
+
+		return self.decode(text[0])
+
+
+
+	def remove(self):
+		""" take the table out of fileInfo, the next save goes without it
+		"""
+		mc.fileInfo(remove=TAG_TABLE_KEY)
+
+
+
+	def rehydrate(self):
+		""" reapply the stored tags in one bulk write, outside the undo queue
+		returns the WritePlan, None when the scene has no table
+		"""
+		start = _clock()
+
+		shot = self.load()
+		if shot is None:
+			return None
+
+		decoded = _clock()
+		state = shot.toState()
+
+		resolved = _clock()
+		plan = diffPlan(shot.toPlan(state))
+
+		diffed = _clock()
+		applyPlan(plan, undoable=False)
+		refreshMayaUI()
+
+		end = _clock()
+
+		self.lastRehydrate = {
+			'nodes': len(shot),
+			'byUuid': shot.resolved['uuid'],
+			'byName': shot.resolved['name'],
+			'missing': shot.resolved['missing'],
+			'writes': plan.writeCount(),
+			'decode': decoded - start,
+			'resolve': resolved - decoded,
+			'diff': diffed - resolved,
+			'write': end - diffed,
+			'seconds': end - start,
+		}
+
+		_logger.info("tag table: %(nodes)d nodes rehydrated in %(seconds).3fs, %(writes)d writes, %(byName)d by name, %(missing)d missing", self.lastRehydrate)
+		return plan
+
+
+
+	# ---------- callbacks ----------
+
+	def install(self):
+		""" save the table before every save, rehydrate after every open
+		"""
+		if self.tracking or not OpenMayaWriteBackend.available():
+			return self.tracking
+
+		self._callbacks = [
+				om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeSave, self._beforeSave),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, self._afterOpen)
+			]
+		self.tracking = True
+
+		return self.tracking
+
+
+
+	def uninstall(self):
+		for callbackId in self._callbacks:
+			om.MMessage.removeCallback(callbackId)
+
+		self._callbacks = []
+		self.tracking = False
+
+
+
+	def _beforeSave(self, clientData):
+		try:
+			self.save()
+		except Exception:
+			_logger.exception("could not save the color tag table")
+
+
+
+	def _afterOpen(self, clientData):
+		try:
+			self.rehydrate()
+		except Exception:
+			_logger.exception("could not rehydrate the color tag table")
+
+
+
+
+def getTagTable():
+	""" session TagTable
+	"""
+	global _tagTable
+
+	if _tagTable is None:
+		_tagTable = TagTable()
+
+	return _tagTable
+
+
+
+
+def enableTagTable(enable=True):
+	""" keep a copy of the tags in fileInfo from now on, remembered across sessions
+	turning it off also removes the table from the open scene
+	"""
+	setSetting('tagTable', enable)
+	table = getTagTable()
+
+	if enable:
+		table.install()
+	else:
+		table.uninstall()
+		table.remove()
+
+	return table
+
+
+
+
+
+
+
+
+# ==================== WRITE BACKENDS ====================
+
+# value kind of every attribute the tool writes, used by backends to pick setters
+ATTR_KINDS = {
+			'useOutlinerColor':'bool',
+			'outlinerColor':'float3',
+			'overrideEnabled':'bool',
+			'overrideRGBColors':'bool',
+			'overrideColor':'int',
+			'overrideColorRGB':'float3'
+		}
+
+# write backend instance in use, picked by getWriteBackend()
+_writeBackend = None
+
+
+
+class WritePlan(object):
+	""" ordered attribute writes, grouped by value so a backend can batch them
+	"""
+
+	def __init__(self):
+		self.entries = []
+
+		# writes dropped by diffPlan(), and the OverrideState it read
+		self.skipped = 0
+		self.before = None
+
+		# set by ChunkedApply once the writes are already in the scene
+		self.applied = False
+
+
+
+	def add(self, attr, value, nodes):
+		""" queue attr = value on every node in nodes
+		"""
+		nodes = [node for node in nodes or []]
+
+		if nodes:
+			self.entries.append((attr, value, nodes))
+
+
+
+	def nodes(self):
+		""" every node the plan writes to, in first-write order
+		"""
+		seen = set()
+		nodes = []
+
+		for attr, value, entryNodes in self.entries:
+			for node in entryNodes:
+				key = _nodeName(node)
+				if key not in seen:
+					seen.add(key)
+					nodes.append(node)
+
+		return nodes
+
+
+
+	def attrs(self):
+		""" every attribute the plan writes, in first-write order
+		"""
+		attrs = []
+
+		for attr, value, nodes in self.entries:
+			if attr not in attrs:
+				attrs.append(attr)
+
+		return attrs
+
+
+
+	def writeCount(self):
+		""" number of single plug writes in the plan
+		"""
+		return sum(len(nodes) for attr, value, nodes in self.entries)
+
+
+
+	def __len__(self):
+		return len(self.entries)
+
+
+
+
+class PymelWriteBackend(object):
+	""" per-node PyNode.attr().set() writes, slow but works wherever PyMEL does
+	"""
+
+	name = 'pymel'
+	undoable = True
+
+
+	@staticmethod
+	def available():
+		return pm._available()
+
+
+
+	def write(self, plan):
+		""" apply every entry of plan, one Attribute.set() per node
+		"""
+		start = _clock() if _stats else 0
+
+		for attr, value, nodes in plan.entries:
+			for node in nodes:
+				if not isinstance(node, pm.PyNode):
+					node = pm.PyNode(_nodeName(node))
+
+				node.attr(attr).set(value)
+
+		if _stats:
+			_stats.record('write', start, nodes=_planNodeCount(plan), writes=plan.writeCount())
+
+
+
+	def read(self, nodes, attrs):
+		""" OverrideState of attrs on nodes, one Attribute.get() per plug
+		"""
+		start = _clock() if _stats else 0
+		state = OverrideState(nodes, attrs)
+
+		for i, node in enumerate(state.nodes):
+			if not isinstance(node, pm.PyNode):
+				node = pm.PyNode(_nodeName(node))
+
+			for attr in attrs:
+				state.set(attr, i, node.attr(attr).get())
+
+		if _stats:
+			_stats.record('read', start, nodes=len(state))
+
+		return state
+
+
+
+
+class CmdsWriteBackend(object):
+	""" string based mc.setAttr writes, skips PyNode construction entirely
+	"""
+
+	name = 'cmds'
+	undoable = True
+
+
+	@staticmethod
+	def available():
+		return mc._available()
+
+
+
+	def write(self, plan):
+		""" apply every entry of plan, one mc.setAttr per plug
+		"""
+		start = _clock() if _stats else 0
+
+		for attr, value, nodes in plan.entries:
+			if ATTR_KINDS.get(attr) == 'float3':
+				for node in nodes:
+					mc.setAttr('{0}.{1}'.format(_nodeName(node), attr), *value)
+
+			else:
+				for node in nodes:
+					mc.setAttr('{0}.{1}'.format(_nodeName(node), attr), value)
+
+		if _stats:
+			_stats.record('write', start, nodes=_planNodeCount(plan), writes=plan.writeCount())
+
+
+
+	def read(self, nodes, attrs):
+		""" OverrideState of attrs on nodes, one mc.getAttr per plug
+		"""
+		start = _clock() if _stats else 0
+		state = OverrideState(nodes, attrs)
+
+		for attr in attrs:
+			isFloat3 = ATTR_KINDS.get(attr) == 'float3'
+
+			for i, node in enumerate(state.nodes):
+				value = mc.getAttr('{0}.{1}'.format(_nodeName(node), attr))
+				state.set(attr, i, value[0] if isFloat3 else value)
+
+		if _stats:
+			_stats.record('read', start, nodes=len(state))
+
+		return state
+
+
+
+
+class OpenMayaWriteBackend(object):
+	""" batches the whole plan into one MDGModifier and commits it with a single doIt()
+	"""
+
+	name = 'openmaya'
+	undoable = False
+
+
+	@staticmethod
+	def available():
+		return om._available() and hasattr(om.MDGModifier, 'newPlugValueInt')
+
+
+
+	def write(self, plan):
+		""" apply every entry of plan through one MDGModifier, returns the modifier
+		"""
+		start = _clock() if _stats else 0
+
+		modifier = om.MDGModifier()
+		objects = {}
+		attrObjects = {}
+
+		for attr, value, nodes in plan.entries:
+			kind = ATTR_KINDS.get(attr)
+
+			for node in nodes:
+				if isinstance(node, _stringTypes):
+					obj = objects.get(node)
+					if obj is None:
+						obj = objects[node] = _toMObject(node)
+				else:
+					obj = _toMObject(node)
+
+				# attribute MObjects are shared by every node of a type, look them up once
+				attrObj = attrObjects.get(attr)
+				if attrObj is None:
+					attrObj = attrObjects[attr] = om.MFnDependencyNode(obj).attribute(attr)
+
+				plug = om.MPlug(obj, attrObj)
+
+				if kind == 'float3':
+					for i, channel in enumerate(value):
+						modifier.newPlugValueFloat(plug.child(i), channel)
+				elif kind == 'bool':
+					modifier.newPlugValueBool(plug, bool(value))
+				else:
+					modifier.newPlugValueInt(plug, int(value))
+
+		modifier.doIt()
+
+		if _stats:
+			_stats.record('write', start, nodes=_planNodeCount(plan), writes=plan.writeCount())
+
+		return modifier
+
+
+
+	def read(self, nodes, attrs):
+		""" OverrideState of attrs on nodes, read straight from the plugs
+		"""
+		start = _clock() if _stats else 0
+		state = OverrideState(nodes, attrs)
+		attrObjects = {}
+
+		for i, node in enumerate(state.nodes):
+			obj = _toMObject(node)
+
+			for attr in attrs:
+				attrObj = attrObjects.get(attr)
+				if attrObj is None:
+					attrObj = attrObjects[attr] = om.MFnDependencyNode(obj).attribute(attr)
+
+				plug = om.MPlug(obj, attrObj)
+				kind = ATTR_KINDS.get(attr)
+
+				if kind == 'float3':
+					state.set(attr, i, [plug.child(c).asFloat() for c in range(3)])
+				elif kind == 'bool':
+					state.set(attr, i, plug.asBool())
+				else:
+					state.set(attr, i, plug.asInt())
+
+		if _stats:
+			_stats.record('read', start, nodes=len(state))
+
+		return state
+
+
+
+
+# fastest first, getWriteBackend() uses the first one available
+# backends outside the undo queue only qualify once the colorTag command wraps them
+WRITE_BACKENDS = [OpenMayaWriteBackend, CmdsWriteBackend, PymelWriteBackend]
+
+
+
+def getWriteBackend():
+	""" backend used for attribute writes, picked automatically on first use
+	OpenMaya needs the colorTag command for undo, without it cmds is used
+	"""
+	global _writeBackend
+
+	if _writeBackend is None:
+		for backendClass in WRITE_BACKENDS:
+			if backendClass.available() and (backendClass.undoable or loadCommandPlugin()):
+				_writeBackend = backendClass()
+				break
+		else:
+			raise RuntimeError("No attribute write backend available")
+
+		_logger.debug("writeBackend: %s", _writeBackend.name)
+
+	return _writeBackend
+
+
+
+
+def setWriteBackend(name=None):
+	""" force a backend by name ('openmaya', 'cmds', 'pymel'), None goes back to auto pick
+	"""
+	global _writeBackend
+
+	if name is None:
+		_writeBackend = None
+		return None
+
+	for backendClass in WRITE_BACKENDS:
+		if backendClass.name == name:
+			if not backendClass.available():
+				raise RuntimeError("Write backend not available: {0}".format(name))
+
+			_writeBackend = backendClass()
+			return _writeBackend
+
+	raise ValueError("Unknown write backend: {0}".format(name))
+
+
+
+
+def _nodeName(node):
+	""" node name for strings, MDagPaths, MObjects and PyNodes
+	"""
+	if isinstance(node, _stringTypes):
+		return node
+
+	if om._loaded():
+		if isinstance(node, om.MDagPath):
+			return node.fullPathName()
+
+		if isinstance(node, om.MObject):
+			if node.hasFn(om.MFn.kDagNode):
+				return om.MDagPath.getAPathTo(node).fullPathName()
+
+			return om.MFnDependencyNode(node).name()
+
+	return str(node)
+
+
+
+
+def _toMObject(node):
+	""" MObject for a node name, MDagPath, MObject or PyNode
+	"""
+	if isinstance(node, om.MObject):
+		return node
+
+	if isinstance(node, om.MDagPath):
+		return node.node()
+
+	selList = om.MSelectionList()
+	selList.add(_nodeName(node))
+
+	return selList.getDependNode(0)
+
+
+
+
+
+
+# ==================== COLOR INDEX ====================
+
+# attributes the index reads to work out both channels
+INDEX_ATTRS = ('useOutlinerColor', 'outlinerColor', 'overrideEnabled', 'overrideRGBColors', 'overrideColor')
+
+# session index, created by getColorIndex()
+_colorIndex = None
+
+
+
+class ColorIndex(object):
+	""" color index -> node UUIDs for the outliner and wireframe channels
+	built once from a scene scan, then kept current through Maya callbacks
+	"""
+
+	CHANNELS = ('outliner', 'wireframe')
+
+
+	def __init__(self):
+		self.built = False
+		self.tracking = False
+
+		self._members = dict((channel, {}) for channel in self.CHANNELS)
+		self._colorOf = dict((channel, {}) for channel in self.CHANNELS)
+		self._dirty = set()
+		self._added = []
+		self._paused = False
+
+		# MObjectHandle hash -> attribute changed callback id
+		self._nodeCallbacks = {}
+		self._callbacks = []
+
+
+
+	# ---------- lookups ----------
+
+	def uuids(self, colorIndex, channel='wireframe'):
+		""" UUIDs of the transforms showing colorIndex on channel
+		"""
+		self.update()
+		return set(self._members[channel].get(colorIndex, ()))
+
+
+
+	def colorOf(self, uuid, channel='wireframe'):
+		""" color index of one node on channel, 0 when untagged
+		"""
+		self.update()
+		return self._colorOf[channel].get(uuid, 0)
+
+
+
+	def counts(self, channel='wireframe'):
+		""" colorIndex -> number of tagged nodes
+		"""
+		self.update()
+		return dict((colorIndex, len(members)) for colorIndex, members in self._members[channel].items() if members)
+
+
+
+	# ---------- maintenance ----------
+
+	def update(self):
+		""" build on first use, then re-read the nodes changed since the last lookup
+		"""
+		if not self.built:
+			self.build()
+			return
+
+		if self._added:
+			self._resolveAdded()
+
+		if self._dirty:
+			dirty = list(self._dirty)
+			self._dirty.clear()
+
+			names = mc.ls(dirty, long=True) or []
+			uuids = mc.ls(names, uuid=True) or [] if names else []
+
+			for uuid in set(dirty).difference(uuids):
+				self._forget(uuid)
+
+			if names:
+				self._storeState(uuids, getWriteBackend().read(names, INDEX_ATTRS))
+
+
+
+	def build(self):
+		""" scan every transform of the scene once
+		"""
+		self.clear()
+
+		if OpenMayaWriteBackend.available():
+			objects = []
+			uuids = []
+
+			nodeIter = om.MItDependencyNodes(om.MFn.kTransform)
+			while not nodeIter.isDone():
+				obj = nodeIter.thisNode()
+				objects.append(obj)
+				uuids.append(om.MFnDependencyNode(obj).uuid().asString())
+				nodeIter.next()
+
+			state = OpenMayaWriteBackend().read(objects, INDEX_ATTRS)
+
+			if self.tracking:
+				for obj in objects:
+					self._watchNode(obj)
+
+		else:
+			names = mc.ls(type='transform', long=True) or []
+			uuids = mc.ls(names, uuid=True) or [] if names else []
+			state = getWriteBackend().read(names, INDEX_ATTRS)
+
+		self._storeState(uuids, state)
+		self.built = True
+
+		_logger.debug("color index built: %d transforms", len(uuids))
+
+
+
+	def clear(self):
+		""" drop every entry and per-node callback, next lookup rebuilds
+		"""
+		for callbackId in self._nodeCallbacks.values():
+			om.MMessage.removeCallback(callbackId)
+
+		self._nodeCallbacks = {}
+		self._dirty.clear()
+		self._added = []
+
+		for channel in self.CHANNELS:
+			self._members[channel] = {}
+			self._colorOf[channel] = {}
+
+		self.built = False
+
+
+
+	def markDirty(self, uuids):
+		""" re-read these nodes on the next lookup
+		"""
+		if self.built:
+			self._dirty.update(uuids)
+
+
+
+	def _storeState(self, uuids, state):
+		""" file every node of an INDEX_ATTRS OverrideState under its channel colors
+		"""
+		useOutliner = state.columns['useOutlinerColor']
+		outlinerColor = state.columns['outlinerColor']
+		enabled = state.columns['overrideEnabled']
+		rgb = state.columns['overrideRGBColors']
+		colorIdx = state.columns['overrideColor']
+
+		for i, uuid in enumerate(uuids):
+			outliner = 0
+			if useOutliner[i]:
+				outliner = PALETTE.indexOfFloat(outlinerColor[i * 3:i * 3 + 3])
+
+			wireframe = 0
+			if enabled[i]:
+				wireframe = CUSTOM_COLOR if rgb[i] else colorIdx[i]
+
+			self._file('outliner', uuid, outliner)
+			self._file('wireframe', uuid, wireframe)
+
+
+
+	def _file(self, channel, uuid, colorIndex):
+		""" move uuid to the colorIndex bucket of channel, untagged nodes are not stored
+		"""
+		colorOf = self._colorOf[channel]
+		members = self._members[channel]
+
+		previous = colorOf.get(uuid, 0)
+		if previous == colorIndex:
+			return
+
+		if previous:
+			members[previous].discard(uuid)
+
+		if colorIndex:
+			colorOf[uuid] = colorIndex
+			members.setdefault(colorIndex, set()).add(uuid)
+		else:
+			colorOf.pop(uuid, None)
+
+
+
+	def _forget(self, uuid):
+		for channel in self.CHANNELS:
+			self._file(channel, uuid, 0)
+
+
+
+	def _resolveAdded(self):
+		""" UUIDs of the nodes added since the last lookup, read now that imports have set them
+		"""
+		added = self._added
+		self._added = []
+
+		for handle in added:
+			# deleted again before the lookup
+			if not handle.isValid():
+				continue
+
+			obj = handle.object()
+			self._dirty.add(om.MFnDependencyNode(obj).uuid().asString())
+			self._watchNode(obj)
+
+
+
+	# ---------- callbacks ----------
+
+	def install(self):
+		""" follow node, attribute and scene changes through Maya messages
+		"""
+		if self.tracking or not OpenMayaWriteBackend.available():
+			return self.tracking
+
+		self._callbacks = [
+				om.MDGMessage.addNodeAddedCallback(self._nodeAdded, 'transform'),
+				om.MDGMessage.addNodeRemovedCallback(self._nodeRemoved, 'transform'),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self._beforeSceneChange),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self._beforeSceneChange),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, self._afterSceneChange),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, self._afterSceneChange)
+			]
+		self.tracking = True
+
+		# nodes scanned before now have no attribute callbacks yet
+		self.clear()
+
+		return self.tracking
+
+
+
+	def uninstall(self):
+		""" remove every callback, the index stops following the scene
+		"""
+		self.clear()
+
+		for callbackId in self._callbacks:
+			om.MMessage.removeCallback(callbackId)
+
+		self._callbacks = []
+		self.tracking = False
+
+
+
+	def _watchNode(self, obj):
+		key = om.MObjectHandle(obj).hashCode()
+		if key not in self._nodeCallbacks:
+			self._nodeCallbacks[key] = om.MNodeMessage.addAttributeChangedCallback(obj, self._attrChanged)
+
+
+
+	def _attrChanged(self, msg, plug, otherPlug, clientData):
+		if not msg & om.MNodeMessage.kAttributeSet:
+			return
+
+		# outlinerColorR, overrideColorG ... count as their compound
+		if plug.isChild:
+			plug = plug.parent()
+
+		# translate and friends fire here too, only the color plugs change what the index holds
+		if plug.partialName(useLongNames=True) not in INDEX_ATTRS:
+			return
+
+		# the UUID is read when the attribute changes, it can be reassigned after the callback is added
+		self._dirty.add(om.MFnDependencyNode(plug.node()).uuid().asString())
+
+
+
+	def _nodeAdded(self, obj, clientData):
+		# a handle, not the UUID: .ma imports and references set UUIDs with rename -uid after the node exists
+		if not self._paused and self.built:
+			self._added.append(om.MObjectHandle(obj))
+
+
+
+	def _nodeRemoved(self, obj, clientData):
+		if self._paused or not self.built:
+			return
+
+		callbackId = self._nodeCallbacks.pop(om.MObjectHandle(obj).hashCode(), None)
+		if callbackId is not None:
+			om.MMessage.removeCallback(callbackId)
+
+		uuid = om.MFnDependencyNode(obj).uuid().asString()
+		self._dirty.discard(uuid)
+		self._forget(uuid)
+
+
+
+	def _beforeSceneChange(self, clientData):
+		# the whole scene is about to go, skip the per-node removals
+		self._paused = True
+		self.clear()
+
+
+
+	def _afterSceneChange(self, clientData):
+		self._paused = False
+		self.built = False
+
+
+
+
+def getColorIndex():
+	""" session color index, following the scene through callbacks when OpenMaya is there
+	"""
+	global _colorIndex
+
+	if _colorIndex is None:
+		_colorIndex = ColorIndex()
+		_colorIndex.install()
+
+	return _colorIndex
+
+
+
+
+def nodesWithColor(colorIndex, channel='wireframe'):
+	""" long names of the transforms showing colorIndex on channel ('outliner' / 'wireframe')
+	"""
+	uuids = getColorIndex().uuids(colorIndex, channel)
+
+	if not uuids:
+		return []
+
+	return mc.ls(list(uuids), long=True) or []
+
+
+
+
+def selectByColor(colorIndex, outliner=True, wireframe=False, add=False):
+	""" select every transform showing colorIndex on the enabled channels, returns their names
+	"""
+	index = getColorIndex()
+	uuids = set()
+
+	if outliner:
+		uuids.update(index.uuids(colorIndex, 'outliner'))
+
+	if wireframe:
+		uuids.update(index.uuids(colorIndex, 'wireframe'))
+
+	names = []
+	if uuids:
+		names = mc.ls(list(uuids), long=True) or []
+
+	if names:
+		mc.select(names, add=add, replace=not add)
+	elif not add:
+		mc.select(clear=True)
+
+	_logger.debug("selectByColor %s: %d nodes", colorIndex, len(names))
+	return names
+
+
+
+
+def isolateByColor(colorIndex, outliner=True, wireframe=False, panel=None):
+	""" select by color and isolate the result in panel, the focused model panel by default
+	"""
+	names = selectByColor(colorIndex, outliner, wireframe)
+	panel = panel or _modelPanel()
+
+	if panel is None:
+		_logger.error("No model panel to isolate in")
+		return names
+
+	# turning isolation off and on again replaces the isolated set with the selection
+	mc.isolateSelect(panel, state=False)
+	if names:
+		mc.isolateSelect(panel, state=True)
+
+	return names
+
+
+
+
+def _modelPanel():
+	""" model panel with focus, else the first visible one
+	"""
+	panel = mc.getPanel(withFocus=True)
+
+	if panel and mc.getPanel(typeOf=panel) == 'modelPanel':
+		return panel
+
+	for panel in mc.getPanel(visiblePanels=True) or []:
+		if mc.getPanel(typeOf=panel) == 'modelPanel':
+			return panel
+
+	return None
+
+
+
+
+
+
+
+
+# ==================== RULES ====================
+
+# what a rule pattern is matched against
+RULE_KINDS = ('glob', 'regex', 'type', 'namespace')
+
+# rule position no rule gets, "no match"
+_NO_RULE = sys.maxsize
+
+
+
+class ColorRule(object):
+	""" one naming convention: pattern -> outliner and/or wireframe index, None leaves a channel alone
+	glob and regex match the whole short name without namespace, type the node type,
+	namespace the full namespace ('' for none) as a glob
+	"""
+
+	def __init__(self, pattern, kind='glob', outliner=None, wireframe=None):
+		if kind not in RULE_KINDS:
+			raise ValueError("unknown rule kind {0!r}, expected one of {1}".format(kind, ", ".join(RULE_KINDS)))
+
+		if kind == 'regex':
+			try:
+				re.compile(pattern)
+			except re.error as e:
+				raise ValueError("invalid regex rule {0!r}: {1}".format(pattern, e))
+
+		self.pattern = pattern
+		self.kind = kind
+		self.outliner = outliner
+		self.wireframe = wireframe
+
+
+
+	def __repr__(self):
+		return "ColorRule({0!r}, {1!r}, outliner={2!r}, wireframe={3!r})".format(self.pattern, self.kind, self.outliner, self.wireframe)
+
+
+
+	def colorIndex(self, channel):
+		return self.outliner if channel == 'outliner' else self.wireframe
+
+
+
+	def toDict(self):
+		data = {'pattern': self.pattern, 'kind': self.kind}
+
+		for channel in ('outliner', 'wireframe'):
+			if self.colorIndex(channel) is not None:
+				data[channel] = self.colorIndex(channel)
+
+		return data
+
+
+
+	@classmethod
+	def fromDict(cls, data):
+		return cls(data['pattern'], data.get('kind', 'glob'), data.get('outliner'), data.get('wireframe'))
+
+
+
+
+class _Trie(object):
+	""" literal keys -> lowest rule position, best() walks a text once
+	"""
+
+	def __init__(self):
+		self.root = {}
+
+
+
+	def __bool__(self):
+		return bool(self.root)
+
+	__nonzero__ = __bool__
+
+
+
+	def add(self, key, position):
+		node = self.root
+
+		for char in key:
+			node = node.setdefault(char, {})
+
+		node[None] = min(node.get(None, _NO_RULE), position)
+
+
+
+	def best(self, text):
+		""" lowest position of the keys text starts with
+		"""
+		node = self.root
+		best = node.get(None, _NO_RULE)
+
+		for char in text:
+			node = node.get(char)
+			if node is None:
+				break
+
+			best = min(best, node.get(None, _NO_RULE))
+
+		return best
+
+
+
+
+class _ChannelMatcher(object):
+	""" the rules setting one channel, compiled: literal names in a dict, 'prefix*' and '*suffix'
+	globs in tries, other globs in one alternation regex per subject, regex rules each on their own
+	so their groups and flags stay intact, earliest rule wins
+	"""
+
+	def __init__(self, rules):
+		""" rules is an ordered list of (rule, colorIndex)
+		"""
+		self.exact = {}
+		self.prefixes = _Trie()
+		self.suffixes = _Trie()
+		self.colorIndices = []
+
+		# (position, full match function) of the regex rules, in rule order
+		self.nameRegexes = []
+
+		alternatives = {'name': [], 'type': [], 'namespace': []}
+
+		for position, (rule, colorIndex) in enumerate(rules):
+			self.colorIndices.append(colorIndex)
+
+			if rule.kind == 'glob' and not _hasWildcards(rule.pattern):
+				self.exact.setdefault(rule.pattern, position)
+
+			elif rule.kind == 'glob' and rule.pattern.endswith('*') and not _hasWildcards(rule.pattern[:-1]):
+				self.prefixes.add(rule.pattern[:-1], position)
+
+			elif rule.kind == 'glob' and rule.pattern.startswith('*') and not _hasWildcards(rule.pattern[1:]):
+				self.suffixes.add(rule.pattern[1:][::-1], position)
+
+			elif rule.kind == 'regex':
+				self.nameRegexes.append((position, _fullMatcher(rule.pattern)))
+
+			else:
+				subject = 'name' if rule.kind == 'glob' else rule.kind
+				alternatives[subject].append('(?P<_r{0}>{1})'.format(position, fnmatch.translate(rule.pattern)))
+
+		self.regex = dict((subject, re.compile('|'.join(parts)) if parts else None) for subject, parts in alternatives.items())
+
+
+
+	def match(self, name, nodeType, namespace):
+		""" color index of the earliest matching rule, None without a match
+		"""
+		best = self.exact.get(name, _NO_RULE)
+
+		if self.prefixes:
+			best = min(best, self.prefixes.best(name))
+
+		if self.suffixes:
+			best = min(best, self.suffixes.best(name[::-1]))
+
+		for subject, text in (('name', name), ('type', nodeType), ('namespace', namespace)):
+			regex = self.regex[subject]
+
+			if regex is not None:
+				found = regex.match(text)
+				if found:
+					best = min(best, int(found.lastgroup[2:]))
+
+		for position, fullMatch in self.nameRegexes:
+			if position >= best:
+				break
+
+			if fullMatch(name):
+				best = position
+				break
+
+		return None if best == _NO_RULE else self.colorIndices[best]
+
+
+
+
+def _hasWildcards(pattern):
+	return any(char in pattern for char in '*?[')
+
+
+
+def _fullMatcher(pattern):
+	""" match function of a regex that has to cover the whole text, as a glob does
+	"""
+	if hasattr(re, 'fullmatch'):
+		return re.compile(pattern).fullmatch
+
+	# Python 2 takes inline flags anywhere in the pattern
+	return re.compile('(?:{0})\\Z'.format(pattern)).match
+
+
+
+
+class RuleSet(object):
+	""" ordered ColorRules, the first matching rule decides each channel
+	"""
+
+	CHANNELS = ('outliner', 'wireframe')
+
+
+	def __init__(self, rules=None):
+		self.rules = [rule for rule in rules or []]
+		self._matchers = None
+
+
+
+	def __len__(self):
+		return len(self.rules)
+
+
+
+	def __iter__(self):
+		return iter(self.rules)
+
+
+
+	def add(self, pattern, kind='glob', outliner=None, wireframe=None):
+		""" append a rule, returns it
+		"""
+		rule = pattern if isinstance(pattern, ColorRule) else ColorRule(pattern, kind, outliner, wireframe)
+
+		self.rules.append(rule)
+		self._matchers = None
+
+		return rule
+
+
+
+	def matchers(self):
+		""" channel -> compiled matcher, built on first use
+		"""
+		if self._matchers is None:
+			self._matchers = {}
+
+			for channel in self.CHANNELS:
+				rules = [(rule, rule.colorIndex(channel)) for rule in self.rules if rule.colorIndex(channel) is not None]
+				if rules:
+					self._matchers[channel] = _ChannelMatcher(rules)
+
+		return self._matchers
+
+
+
+	def match(self, node, nodeType='transform'):
+		""" (outliner, wireframe) color indices for one node name, None where no rule matches
+		"""
+		leaf = node.rpartition('|')[2]
+		namespace, sep, name = leaf.rpartition(':')
+		matchers = self.matchers()
+
+		return tuple(matchers[channel].match(name, nodeType, namespace) if channel in matchers else None for channel in self.CHANNELS)
+
+
+
+	def evaluate(self, list=None):
+		""" one pass over list, every transform by default
+		returns {channel: {colorIndex: [long names]}}
+		"""
+		return self._evaluate(list)[1]
+
+
+
+	def _evaluate(self, list):
+		""" (every transform of list, evaluate() result)
+		"""
+		typed = []
+		if list is None:
+			typed = mc.ls(type='transform', long=True, showType=True) or []
+		elif list:
+			typed = mc.ls([_nodeName(node) for node in list], type='transform', long=True, showType=True) or []
+
+		matchers = self.matchers()
+		result = dict((channel, {}) for channel in self.CHANNELS)
+
+		for i in range(0, len(typed), 2):
+			node = typed[i]
+			leaf = node.rpartition('|')[2]
+			namespace, sep, name = leaf.rpartition(':')
+
+			for channel, matcher in matchers.items():
+				colorIndex = matcher.match(name, typed[i + 1], namespace)
+				if colorIndex is not None:
+					result[channel].setdefault(colorIndex, []).append(node)
+
+		return typed[::2], result
+
+
+
+	def plan(self, list=None, clear=False):
+		""" WritePlan putting the rule colors on list, every transform by default
+		clear turns a channel off on the transforms no rule colors
+		"""
+		plan = WritePlan()
+		nodes, result = self._evaluate(list)
+
+		for channel, channelPlan in (('outliner', outlinerPlan), ('wireframe', wireframePlan)):
+			if clear:
+				colored = set(node for members in result[channel].values() for node in members)
+				channelPlan([node for node in nodes if node not in colored], 0, plan)
+
+			for colorIndex, members in sorted(result[channel].items()):
+				channelPlan(members, colorIndex, plan)
+
+		return plan
+
+
+
+	# ---------- json ----------
+
+	def toJson(self, path=None):
+		text = json.dumps({'version': 1, 'rules': [rule.toDict() for rule in self.rules]}, indent=2)
+
+		if path:
+			with open(path, 'w') as f:
+				f.write(text)
+
+		return text
+
+
+
+	@classmethod
+	def fromJson(cls, source):
+		""" rules from a JSON file or string, {"rules": [...]} or a bare list of
+		{"pattern": "*_CTL", "kind": "glob", "outliner": 17, "wireframe": 17}
+		"""
+		if os.path.isfile(source):
+			with open(source) as f:
+				source = f.read()
+
+		data = json.loads(source)
+		if isinstance(data, dict):
+			data = data.get('rules', [])
+
+		return cls([ColorRule.fromDict(rule) for rule in data])
+
+
+
+
+def applyRules(rules, list=None, undoable=True):
+	""" color list, every transform by default, with a RuleSet or a rules JSON file
+	one scene pass, then one bulk write of the plugs that change
+	"""
+	if not isinstance(rules, RuleSet):
+		rules = RuleSet.fromJson(rules)
+
+	start = _clock()
+	plan = applyPlan(diffPlan(rules.plan(list)), undoable)
+
+	_logger.info("rules: %d writes in %.3fs", plan.writeCount(), _clock() - start)
+	return plan
+
+
+
+
+
+
+
+
+# ==================== AUTO COLOR ====================
+
+# session colorer, created by getAutoColorer()
+_autoColorer = None
+
+
+
+class AutoColorer(object):
+	""" colors transforms arriving from imports, references and duplicates with a RuleSet
+	the node added callback only queues a handle, one idle flush evaluates and writes the batch
+	"""
+
+	def __init__(self, rules=None):
+		self.rules = rules
+		self.tracking = False
+
+		self._queue = []
+		self._scheduled = False
+		self._paused = False
+		self._callbacks = []
+
+		# size and timings of the last flush()
+		self.lastFlush = {}
+
+
+
+	def enqueue(self, nodes):
+		""" queue nodes (names, MDagPaths, MObjectHandles) for the next idle flush
+		"""
+		if self._paused or not self.rules:
+			return
+
+		self._queue.extend(nodes)
+
+		if not self._scheduled:
+			self._scheduled = True
+			mc.evalDeferred(self.flush, lowestPriority=True)
+
+
+
+	def flush(self):
+		""" color everything queued in one rules pass and one bulk write, outside the undo queue
+		"""
+		queued = self._queue
+		self._queue = []
+		self._scheduled = False
+
+		if not queued or not self.rules:
+			return None
+
+		start = _clock()
+
+		names = []
+		for node in queued:
+			if om._loaded() and isinstance(node, om.MObjectHandle):
+				# deleted again before the idle came
+				if not node.isValid():
+					continue
+				node = om.MDagPath.getAPathTo(node.object())
+
+			names.append(_nodeName(node))
+
+		plan = applyPlan(diffPlan(self.rules.plan(names)), undoable=False)
+		refreshMayaUI(list=plan.nodes())
+
+		self.lastFlush = {'queued': len(queued), 'writes': plan.writeCount(), 'seconds': _clock() - start}
+		_logger.info("auto color: %(queued)d new transforms, %(writes)d writes in %(seconds).3fs", self.lastFlush)
+
+		return plan
+
+
+
+	# ---------- callbacks ----------
+
+	def install(self):
+		""" start watching for new transforms, paused while a scene is opened or created
+		"""
+		if self.tracking or not OpenMayaWriteBackend.available():
+			return self.tracking
+
+		self._callbacks = [
+				om.MDGMessage.addNodeAddedCallback(self._nodeAdded, 'transform'),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self._beforeSceneChange),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self._beforeSceneChange),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, self._afterSceneChange),
+				om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, self._afterSceneChange)
+			]
+		self.tracking = True
+
+		return self.tracking
+
+
+
+	def uninstall(self):
+		for callbackId in self._callbacks:
+			om.MMessage.removeCallback(callbackId)
+
+		self._callbacks = []
+		self._queue = []
+		self.tracking = False
+
+
+
+	def _nodeAdded(self, obj, clientData):
+		# a handle, not the UUID: .ma imports set UUIDs with rename -uid after the node exists
+		if not self._paused:
+			self.enqueue([om.MObjectHandle(obj)])
+
+
+
+	def _beforeSceneChange(self, clientData):
+		# an opened scene already carries its colors
+		self._paused = True
+		self._queue = []
+
+
+
+	def _afterSceneChange(self, clientData):
+		self._paused = False
+
+
+
+
+def getAutoColorer():
+	""" session AutoColorer
+	"""
+	global _autoColorer
+
+	if _autoColorer is None:
+		_autoColorer = AutoColorer()
+
+	return _autoColorer
+
+
+
+
+def enableAutoColor(rules=None, enable=True):
+	""" color new transforms with rules (a RuleSet or a rules JSON file) from now on
+	a file path is remembered, prewarm() turns auto color back on in the next session
+	"""
+	colorer = getAutoColorer()
+	setSetting('autoColor', enable)
+
+	if not enable:
+		colorer.uninstall()
+		return colorer
+
+	if rules is None:
+		rules = getSetting('rulesFile')
+
+	if isinstance(rules, _stringTypes):
+		setSetting('rulesFile', rules)
+		rules = RuleSet.fromJson(rules)
+
+	colorer.rules = rules
+	colorer.install()
+
+	return colorer
+
+
+
+
+
+
+
+
+# ==================== RGB OVERRIDES ====================
+
+# what decides whether a transform draws with an RGB wireframe override, and its color
+RGB_OVERRIDE_ATTRS = WIREFRAME_ATTRS + ('overrideColorRGB',)
+
+
+def rgbToIndexPlan(list=None):
+	""" writes turning the RGB wireframe overrides of list into the nearest palette index
+	list defaults to every transform in the scene, nodes without an RGB override are left alone
+	"""
+	if list is None:
+		list = mc.ls(type='transform', long=True) or []
+
+	state = getWriteBackend().read(list, RGB_OVERRIDE_ATTRS)
+	enabled = state.columns['overrideEnabled']
+	rgb = state.columns['overrideRGBColors']
+	colors = state.columns['overrideColorRGB']
+
+	picked = [i for i in range(len(state)) if enabled[i] and rgb[i]]
+
+	# one flat r, g, b run for the whole selection, matched in one call
+	flat = array.array('f')
+	for i in picked:
+		flat.extend(colors[i * 3:i * 3 + 3])
+
+	groups = {}
+	for i, colorIndex in zip(picked, PALETTE.nearest(flat)):
+		groups.setdefault(colorIndex, []).append(state.nodes[i])
+
+	plan = WritePlan()
+	for colorIndex, nodes in sorted(groups.items()):
+		wireframePlan(nodes, colorIndex, plan)
+
+	_logger.info("%d of %d transforms with an RGB override", len(picked), len(state))
+	return diffPlan(plan, state)
+
+
+
+
+def rgbToIndex(list=None, undoable=True):
+	""" convert the RGB wireframe overrides of list, every transform by default, to index colors
+	"""
+	return applyPlan(rgbToIndexPlan(list), undoable)
+
+
+
+
+
+
+# ==================== BATCH ====================
+
+# scene files batchFiles() picks up from directories
+SCENE_EXTENSIONS = ('.ma', '.mb')
+
+
+
+def batchFiles(paths, rules=None, clear=False, workers=None, mayapy=None, outputDir=None, filesPerWorker=None, log=None, direct=False):
+	""" recolor scene files headless: open, clear and/or apply rules, save
+	paths are files or directories searched for .ma / .mb, rules a RuleSet or rules JSON file
+	runs in a pool of warm mayapy workers, workers=0 runs in this process
+	direct rewrites .ma files with colorTaggingFiles instead of opening them in Maya
+	returns one result dict per file: path, ok, error, writes and open / apply / save / seconds
+	"""
+	files = _sceneFiles(paths)
+	if not files:
+		return []
+
+	if rules is not None and not isinstance(rules, RuleSet):
+		rules = RuleSet.fromJson(rules)
+
+	# rules travel as JSON, no compiled matchers to pickle
+	jobs = [(path, rules.toJson() if rules is not None else None, clear, outputDir, direct and _isAscii(path)) for path in files]
+	results = []
+
+	# no Maya start-up when every file is rewritten directly
+	needsMaya = not all(job[4] for job in jobs)
+
+	if workers == 0:
+		if needsMaya:
+			_batchWorkerInit()
+		for job in jobs:
+			results.append(_batchLog(_batchFile(job), log))
+
+		return results
+
+	import multiprocessing
+
+	# spawned workers start clean, mayapy in them when we run under another interpreter
+	context = multiprocessing.get_context('spawn') if hasattr(multiprocessing, 'get_context') else multiprocessing
+	if mayapy:
+		context.set_executable(mayapy)
+
+	workers = min(workers or multiprocessing.cpu_count(), len(files))
+	pool = context.Pool(workers, initializer=_batchWorkerInit if needsMaya else None, maxtasksperchild=filesPerWorker)
+
+	try:
+		for result in pool.imap_unordered(_batchFile, jobs):
+			results.append(_batchLog(result, log))
+	finally:
+		pool.close()
+		pool.join()
+
+	return results
+
+
+
+
+def _sceneFiles(paths):
+	""" scene files of paths, directories walked recursively, sorted and unique
+	"""
+	files = set()
+
+	for path in paths:
+		if os.path.isdir(path):
+			for root, dirs, names in os.walk(path):
+				files.update(os.path.join(root, name) for name in names if name.lower().endswith(SCENE_EXTENSIONS))
+		else:
+			files.add(path)
+
+	return sorted(files)
+
+
+
+
+def _isAscii(path):
+	return path.lower().endswith('.ma')
+
+
+
+
+def _batchWorkerInit():
+	""" start Maya once per worker, every file of the worker reuses it
+	"""
+	import maya.standalone
+	maya.standalone.initialize(name='python')
+
+
+
+
+def _batchFile(job):
+	""" open, recolor and save one scene, never raises, errors end up in the result
+	"""
+	path, rulesJson, clear, outputDir, direct = job
+	result = {'path': path, 'ok': False, 'error': None, 'writes': 0}
+	start = _clock()
+
+	rules = RuleSet.fromJson(rulesJson) if rulesJson else RuleSet()
+	output = os.path.join(outputDir, os.path.basename(path)) if outputDir else None
+
+	try:
+		if direct:
+			import colorTaggingFiles
+
+			stats = colorTaggingFiles.tagMaFile(path, rules, clear=clear, output=output)
+			result['writes'] = stats['edited'] + stats['added']
+			result['apply'] = stats['seconds']
+
+		else:
+			mc.file(path, open=True, force=True)
+			opened = _clock()
+			result['open'] = opened - start
+
+			# no undo in batch, one bulk write of the plugs that change
+			plan = applyPlan(diffPlan(rules.plan(clear=clear)), undoable=False)
+			result['writes'] = plan.writeCount()
+
+			applied = _clock()
+			result['apply'] = applied - opened
+
+			if output:
+				mc.file(rename=output)
+
+			mc.file(save=True, force=True)
+			result['save'] = _clock() - applied
+
+		result['ok'] = True
+
+	except Exception as e:
+		result['error'] = '{0}: {1}'.format(type(e).__name__, e)
+
+	result['seconds'] = _clock() - start
+	return result
+
+
+
+
+def _batchLog(result, log):
+	if log:
+		if result['ok']:
+			log("ok      {0:>8.2f}s  {1:>7} writes  {2}".format(result['seconds'], result['writes'], result['path']))
+		else:
+			log("FAILED  {0:>8.2f}s  {1}  {2}".format(result['seconds'], result['path'], result['error']))
+
+	return result
+
+
+
+
+def main(argv=None):
+	""" command line, python -m colorTaggingTool batch --rules rules.json scenes/
+	"""
+	import argparse
+
+	parser = argparse.ArgumentParser(prog='colorTaggingTool', description="colorTaggingTool command line")
+	commands = parser.add_subparsers(dest='command')
+
+	batch = commands.add_parser('batch', help="recolor scene files with mayapy workers")
+	batch.add_argument('paths', nargs='+', help=".ma / .mb files or directories")
+	batch.add_argument('--rules', help="rules JSON file")
+	batch.add_argument('--outliner', type=int, help="preset: outliner color index for --match")
+	batch.add_argument('--wireframe', type=int, help="preset: wireframe color index for --match")
+	batch.add_argument('--match', default='*', help="preset: glob of the transforms the preset colors (default: all)")
+	batch.add_argument('--clear', action='store_true', help="turn both colors off on every transform first")
+	batch.add_argument('--workers', type=int, help="worker processes, 0 runs in this process (default: one per CPU)")
+	batch.add_argument('--mayapy', help="interpreter for the workers when this is not mayapy")
+	batch.add_argument('--output-dir', help="save into this directory instead of over the originals")
+	batch.add_argument('--direct', action='store_true', help="rewrite .ma files as text, without opening them in Maya")
+	batch.add_argument('--files-per-worker', type=int, help="restart a worker after this many files")
+	batch.add_argument('--json', action='store_true', help="print the results as JSON")
+
+	scan = commands.add_parser('scan', help="index the colors of scene files into a SQLite library index, no Maya needed")
+	scan.add_argument('paths', nargs='+', help=".ma / .mb files or directories")
+	scan.add_argument('--index', required=True, help="SQLite index file, created when missing")
+	scan.add_argument('--workers', type=int, help="worker processes, 0 reads in this process (default: one per CPU)")
+
+	query = commands.add_parser('query', help="look up transforms by color in a library index")
+	query.add_argument('--index', required=True, help="SQLite index file")
+	query.add_argument('--outliner', type=int, help="outliner color index, 0 for none")
+	query.add_argument('--wireframe', type=int, help="wireframe color index, 0 for none, -1 for custom / RGB")
+	query.add_argument('--name', help="glob of the transform short names")
+	query.add_argument('--type', help="transform or joint")
+	query.add_argument('--path', help="glob of the file paths")
+	query.add_argument('--files', action='store_true', help="only list the matching files")
+
+	args = parser.parse_args(argv)
+
+	if args.command in ('scan', 'query'):
+		return _libraryCommand(args)
+
+	if args.command != 'batch':
+		parser.print_help()
+		return 2
+
+	rules = RuleSet.fromJson(args.rules) if args.rules else RuleSet()
+	if args.outliner is not None or args.wireframe is not None:
+		rules.add(args.match, outliner=args.outliner, wireframe=args.wireframe)
+
+	if not rules and not args.clear:
+		parser.error("nothing to do, give --rules, --outliner / --wireframe or --clear")
+
+	start = _clock()
+	results = batchFiles(args.paths, rules or None, args.clear, args.workers, args.mayapy, args.output_dir,
+		args.files_per_worker, log=None if args.json else print, direct=args.direct)
+
+	failed = [result for result in results if not result['ok']]
+
+	if args.json:
+		print(json.dumps(results, indent=2, sort_keys=True))
+	else:
+		print("{0} files, {1} failed, {2:.2f}s".format(len(results), len(failed), _clock() - start))
+
+	return 1 if failed else 0
+
+
+
+
+def _libraryCommand(args):
+	""" scan / query subcommands of main()
+	"""
+	import colorTaggingFiles
+
+	index = colorTaggingFiles.LibraryIndex(args.index)
+
+	try:
+		if args.command == 'scan':
+			stats = index.scan(args.paths, args.workers, log=print)
+			print("{files} files, {scanned} scanned, {skipped} unchanged, {removed} removed, {failed} failed, {nodes} transforms, {seconds:.2f}s".format(**stats))
+			return 1 if stats['failed'] else 0
+
+		filters = (args.outliner, args.wireframe, args.name, args.type, args.path)
+
+		if args.files:
+			for path in index.files(*filters):
+				print(path)
+		else:
+			for path, node, outliner, wireframe in index.query(*filters):
+				print("{0:>4} {1:>4}  {2}  {3}".format(outliner, wireframe, path, node))
+
+	finally:
+		index.close()
+
+	return 0
+
+
 
-	if int(mel.eval('exists AEdagNodeCommonRefreshOutliners')) == 1:
-		mel.eval('AEdagNodeCommonRefreshOutliners()')
-	else:
-		pass
 
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,967 @@
+"""
+
+=====================================================
+
+File: colorTaggingUI.py
+Qt interface of colorTaggingTool
+
+* Imported lazily by colorTaggingTool.run(), keeps Qt out of the tool's import
+* Works with PySide (Maya 2016) and PySide2 (Maya 2017+)
+
+Copyright (C) 2019 Yinglei Yang www.ying-lei.com
+
+=====================================================
+
+"""
+
+
+try:
+	from PySide import QtCore, QtGui, QtUiTools
+	from PySide import QtGui as qtToolInstance
+except:
+	from PySide2 import QtCore, QtGui, QtUiTools
+	from PySide2 import QtWidgets as qtToolInstance
+
+
+try:
+	from shiboken import wrapInstance, isValid
+except:
+	from shiboken2 import wrapInstance, isValid
+
+
+# workspace controls only exist in Maya 2017+
+try:
+	from maya.app.general.mayaMixin import MayaQWidgetDockableMixin
+except ImportError:
+	MayaQWidgetDockableMixin = None
+
+
+import maya.OpenMayaUI as omui
+
+import colorTaggingTool as ctool
+
+import logging
+_logger = logging.getLogger(__name__)
+_logger.setLevel(logging.ERROR)
+
+
+try:
+	long
+except NameError:
+	long = int
+
+
+
+
+# ==================== MAIN UI ====================
+
+
+def getMayaWindow():
+	""" pointer to the maya main window
+	"""
+
+	ptr = omui.MQtUtil.mainWindow()
+
+	if ptr:
+		return wrapInstance(long(ptr), qtToolInstance.QMainWindow)
+
+
+
+
+# objectName of the tool, Maya names the workspace control WINDOW_NAME + 'WorkspaceControl'
+WINDOW_NAME = 'colorTaggingTool'
+
+
+def buildWindow(dockable=False):
+	""" tool window, built hidden; a ColorTaggingDock when dockable and workspace controls exist
+	"""
+	if dockable and MayaQWidgetDockableMixin is not None:
+		return ColorTaggingDock()
+
+	return ColorTaggingUI(parent=getMayaWindow(), show=False)
+
+
+
+
+def showWindow(window):
+	""" show and raise a window from buildWindow()
+	"""
+	if isDockable(window):
+		window.show(dockable=True, retain=True)
+	else:
+		window.show()
+		window.raise_()
+		window.activateWindow()
+
+
+
+
+def deleteWindow(window):
+	""" remove a window from buildWindow(), with its workspace control
+	a chunked apply still running is rolled back first
+	"""
+	if isAlive(window):
+		(window.ui if isDockable(window) else window).cancelBtnClicked()
+
+	if isDockable(window) and isAlive(window):
+		control = WINDOW_NAME + 'WorkspaceControl'
+		if ctool.mc.workspaceControl(control, exists=True):
+			ctool.mc.deleteUI(control)
+
+	if isAlive(window):
+		window.close()
+		window.deleteLater()
+
+
+
+
+def isAlive(window):
+	""" False once Qt deleted the widget under the python wrapper
+	"""
+	return isValid(window)
+
+
+
+
+def isDockable(window):
+	return MayaQWidgetDockableMixin is not None and isinstance(window, MayaQWidgetDockableMixin)
+
+
+
+class ColorTaggingUI(qtToolInstance.QDialog):
+	""" Main UI
+	"""
+
+
+	def __init__(self, parent = None, show = True):
+		super(ColorTaggingUI, self).__init__(parent)
+
+		self.setObjectName(WINDOW_NAME)
+
+
+		# UI variables, last session's checkbox states
+		self.outlinerEnable = bool(ctool.getSetting('outliner'))
+		self.wireframeEnable = bool(ctool.getSetting('wireframe'))
+		self.hierarchyEnable = bool(ctool.getSetting('hierarchy'))
+		self.minimalEnable = bool(ctool.getSetting('minimal'))
+		self.tagTableEnable = bool(ctool.getSetting('tagTable'))
+
+		if self.tagTableEnable:
+			ctool.getTagTable().install()
+
+		# self.counter = 0
+
+		# topmost layout
+		self.gridLayout = qtToolInstance.QGridLayout()
+		self.verticalLayout = qtToolInstance.QVBoxLayout()
+	
+		# label
+		self.taggingLabel = qtToolInstance.QLabel("Tagging color for...")
+		self.taggingLabel.setToolTip("Ctrl+click a color to select it, Ctrl+Shift+click to isolate it")
+		self.verticalLayout.addWidget(self.taggingLabel)
+		
+		# checkbox
+		self.outlinerCheckbox = qtToolInstance.QCheckBox("Outliner")
+		self.outlinerCheckbox.setChecked(self.outlinerEnable)
+		self.verticalLayout.addWidget(self.outlinerCheckbox)
+		
+		self.wireframeCheckbox = qtToolInstance.QCheckBox("Wireframe")
+		self.wireframeCheckbox.setChecked(self.wireframeEnable)
+		self.verticalLayout.addWidget(self.wireframeCheckbox)
+
+		self.hierarchyCheckbox = qtToolInstance.QCheckBox("Hierarchy")
+		self.hierarchyCheckbox.setToolTip("Also tag every transform below the selected ones")
+		self.hierarchyCheckbox.setChecked(self.hierarchyEnable)
+		self.verticalLayout.addWidget(self.hierarchyCheckbox)
+
+		self.minimalCheckbox = qtToolInstance.QCheckBox("Minimal Wireframe Writes")
+		self.minimalCheckbox.setToolTip("Skip wireframe writes on transforms that inherit the color from a selected parent")
+		self.minimalCheckbox.setChecked(self.minimalEnable)
+		self.verticalLayout.addWidget(self.minimalCheckbox)
+
+		self.tagTableCheckbox = qtToolInstance.QCheckBox("Save Tags In Scene")
+		self.tagTableCheckbox.setToolTip("Keep a copy of every tag in the scene's fileInfo and reapply it on open")
+		self.tagTableCheckbox.setChecked(self.tagTableEnable)
+		self.verticalLayout.addWidget(self.tagTableCheckbox)
+
+		# color grid, one painted widget with QButtonGroup style ids
+		# self.palette is a user RGB palette, None for Maya's index colors
+		self.palette = self.loadPalette(ctool.getSetting('paletteFile'))
+
+		self.taggingButtonGrp = PaletteWidget(self.palette or ctool.PALETTE)
+		self.taggingButtonGrp.setMarkedId(ctool.getSetting('lastColor'))
+		self.verticalLayout.addWidget(self.taggingButtonGrp)
+
+		# user palettes, any number of colors written as RGB overrides
+		self.paletteLayout = qtToolInstance.QHBoxLayout()
+
+		self.loadPaletteBtn = qtToolInstance.QPushButton("Load Palette...")
+		self.loadPaletteBtn.setToolTip("JSON list of \"#rrggbb\" or [r, g, b] colors, wireframes get RGB overrides")
+		self.paletteLayout.addWidget(self.loadPaletteBtn)
+
+		self.indexPaletteBtn = qtToolInstance.QPushButton("Index Colors")
+		self.indexPaletteBtn.setEnabled(self.palette is not None)
+		self.paletteLayout.addWidget(self.indexPaletteBtn)
+
+		self.verticalLayout.addLayout(self.paletteLayout)
+
+
+
+		# disable all btn
+		self.disableAllBtn = qtToolInstance.QPushButton("Disable All On Selections")
+		self.disableAllBtn.setStyleSheet('QPushButton {background-color: rgb(50,0,0); color: white}' )
+		self.verticalLayout.addWidget(self.disableAllBtn)
+
+		# RGB overrides from other tools to the nearest palette color
+		self.rgbToIndexBtn = qtToolInstance.QPushButton("RGB Overrides To Index")
+		self.verticalLayout.addWidget(self.rgbToIndexBtn)
+
+		# result of the last click
+		self.statusLabel = qtToolInstance.QLabel("")
+		self.verticalLayout.addWidget(self.statusLabel)
+
+		# progress of a chunked apply, only shown while a big selection is written
+		self.progressLayout = qtToolInstance.QHBoxLayout()
+
+		self.progressBar = qtToolInstance.QProgressBar()
+		self.progressBar.setRange(0, 1000)
+		self.progressBar.setTextVisible(False)
+		self.progressLayout.addWidget(self.progressBar)
+
+		self.cancelBtn = qtToolInstance.QPushButton("Cancel")
+		self.progressLayout.addWidget(self.cancelBtn)
+
+		self.verticalLayout.addLayout(self.progressLayout)
+
+		# interval 0 fires whenever the event loop is idle
+		self.chunkTimer = QtCore.QTimer(self)
+		self.chunkTimer.setInterval(0)
+		self.chunkedApply = None
+		self.chunkedRefresh = None
+
+		self.gridLayout.addLayout(self.verticalLayout, 0, 0, 1, 1)
+
+
+
+		# calling UI
+		self.makeConnections()
+		self.setWindowTitle("COLOR TAGGING TOOL")
+		self.setLayout(self.gridLayout)
+
+		self.showProgress(False)
+
+		self.initUIState();
+
+		if show:
+			self.show();
+
+
+
+
+	# ==================== UI FUNCTIONS ====================
+	
+	def initUIState(self, colorIndex = 0):
+		""" sets up init state of UI
+		"""
+		self.initButtonGroup(self.taggingButtonGrp)
+		
+		self.outlinerCheckboxToggled()
+		self.wireframeCheckboxToggled()
+
+
+
+
+	def makeConnections(self):
+		""" connect events in UI"""
+	
+		self.taggingButtonGrp.buttonClicked.connect(self.taggingButtonClicked)
+		self.disableAllBtn.clicked.connect(self.disableAllBtnClicked)
+		self.rgbToIndexBtn.clicked.connect(self.rgbToIndexBtnClicked)
+		self.loadPaletteBtn.clicked.connect(self.loadPaletteBtnClicked)
+		self.indexPaletteBtn.clicked.connect(self.indexPaletteBtnClicked)
+
+		self.cancelBtn.clicked.connect(self.cancelBtnClicked)
+		self.chunkTimer.timeout.connect(self.chunkTimerTick)
+
+		self.outlinerCheckbox.stateChanged.connect(self.outlinerCheckboxToggled)
+		self.wireframeCheckbox.stateChanged.connect(self.wireframeCheckboxToggled)
+		self.hierarchyCheckbox.stateChanged.connect(self.hierarchyCheckboxToggled)
+		self.minimalCheckbox.stateChanged.connect(self.minimalCheckboxToggled)
+		self.tagTableCheckbox.stateChanged.connect(self.tagTableCheckboxToggled)
+
+
+
+	def initButtonGroup(self, buttonGrp=None):
+		""" set buttonGrp back to initial state
+		"""
+		
+		checkedButton = buttonGrp.checkedButton()
+	
+		buttonGrp.setExclusive(False)
+		try:
+			checkedButton.setChecked(False)
+		except:
+			pass
+
+		buttonGrp.setExclusive(True)
+
+		_logger.debug("checkedButton: %s", checkedButton)
+		_logger.debug(buttonGrp.checkedId())
+
+
+
+
+	def disableAllBtnClicked(self):
+
+		disableList = ctool.getSelection(hierarchy=self.hierarchyEnable)
+
+		_logger.debug("disableList: %s", disableList) 
+
+		if self.chunkedApply:
+			_logger.error("Still applying the previous color")
+
+		elif not len(disableList) == 0:
+			plan = ctool.buildPlan(disableList, outliner=0, wireframe=0)
+			self.applyPlan(plan, True, True, disableList)
+
+		else:
+			_logger.error("Nothing selected")
+
+		self.initUIState()
+
+
+
+
+	def rgbToIndexBtnClicked(self):
+		""" RGB wireframe overrides of the selection, or the whole scene with nothing selected, to index colors
+		"""
+		convertList = ctool.getSelection(hierarchy=self.hierarchyEnable) or None
+
+		if self.chunkedApply:
+			_logger.error("Still applying the previous color")
+			return
+
+		plan = ctool.rgbToIndexPlan(convertList)
+		self.applyPlan(plan, False, True, convertList)
+
+
+
+
+	def taggingButtonClicked(self):
+		""" tagging color based on selected color index
+		"""
+
+		colorIndex = self.taggingButtonGrp.checkedId()
+		_logger.debug("colorIndex: %s", colorIndex) 
+
+		# Ctrl+click selects by color instead of tagging
+		modifiers = qtToolInstance.QApplication.keyboardModifiers()
+		if modifiers & QtCore.Qt.ControlModifier:
+			if self.palette is not None:
+				_logger.error("Select by color only works with index colors")
+			else:
+				self.selectByColor(colorIndex, isolate=bool(modifiers & QtCore.Qt.ShiftModifier))
+			return
+
+		colorOnList = ctool.getSelection(hierarchy=self.hierarchyEnable)
+		_logger.debug("colorOnList: %s", colorOnList) 
+
+
+		# one plan for both channels so the click is a single undo step
+		outlinerIndex = None
+		wireframeIndex = None
+
+		if self.outlinerEnable == 1:
+			outlinerIndex = colorIndex
+			_logger.debug("Outliner color: %s", colorIndex)
+
+		if self.wireframeEnable == 1:
+			wireframeIndex = colorIndex
+			_logger.debug("Wireframe color: %s", colorIndex)
+
+
+		if self.chunkedApply:
+			_logger.error("Still applying the previous color")
+
+		elif outlinerIndex is not None or wireframeIndex is not None:
+
+			if not len(colorOnList) == 0:
+				plan = ctool.buildPlan(colorOnList, outliner=outlinerIndex, wireframe=wireframeIndex, minimal=self.minimalEnable, palette=self.palette)
+				self.applyPlan(plan, outlinerIndex is not None, wireframeIndex is not None, colorOnList)
+
+				if colorIndex > 0:
+					self.taggingButtonGrp.setMarkedId(colorIndex)
+					ctool.setSetting('lastColor', colorIndex)
+
+			else:
+				_logger.error("Nothing selected")
+
+
+
+		self.initUIState()
+
+
+
+
+	def selectByColor(self, colorIndex, isolate=False):
+		""" select (and isolate) every transform tagged colorIndex on the enabled channels
+		"""
+		if colorIndex == 0:
+			_logger.error("Pick a color to select by")
+
+		elif not (self.outlinerEnable or self.wireframeEnable):
+			_logger.error("Enable Outliner and/or Wireframe to select by color")
+
+		else:
+			if isolate:
+				names = ctool.isolateByColor(colorIndex, outliner=self.outlinerEnable, wireframe=self.wireframeEnable)
+			else:
+				names = ctool.selectByColor(colorIndex, outliner=self.outlinerEnable, wireframe=self.wireframeEnable)
+
+			self.statusLabel.setText("{0} nodes selected".format(len(names)))
+
+		self.initUIState()
+
+
+
+
+	def applyPlan(self, plan, outliner, wireframe, list):
+		""" write plan and refresh, big plans go in idle-time chunks with a progress bar
+		"""
+		if plan.writeCount() > ctool.CHUNKED_APPLY_THRESHOLD:
+			self.chunkedApply = ctool.ChunkedApply(plan)
+			self.chunkedRefresh = (outliner, wireframe, list)
+
+			self.progressBar.setValue(0)
+			self.showProgress(True)
+			self.chunkTimer.start()
+
+		else:
+			ctool.applyPlan(plan)
+			self.showPlanStatus(plan)
+			ctool.refreshMayaUI(outliner=outliner, wireframe=wireframe, list=list)
+
+
+
+
+	def chunkTimerTick(self):
+		""" write the next time-boxed chunks and update progress and throughput
+		"""
+		job = self.chunkedApply
+
+		try:
+			working = job.step()
+		except Exception:
+			_logger.exception("chunked apply failed, rolling back")
+			try:
+				job.cancel()
+			finally:
+				self.finishChunkedApply()
+				self.statusLabel.setText("Apply failed, changes rolled back")
+			return
+
+		self.progressBar.setValue(int(job.progress() * 1000))
+		self.statusLabel.setText("{0} nodes/s".format(int(job.nodesPerSecond())))
+
+		if not working:
+			self.finishChunkedApply()
+
+
+
+
+	def cancelBtnClicked(self):
+		""" stop the chunked apply and roll back what it already wrote
+		"""
+		if self.chunkedApply:
+			self.chunkedApply.cancel()
+			self.finishChunkedApply()
+
+
+
+
+	def closeEvent(self, event):
+		""" a chunked apply can't outlive the window, roll it back before closing
+		"""
+		self.cancelBtnClicked()
+		super(ColorTaggingUI, self).closeEvent(event)
+
+
+
+
+	def finishChunkedApply(self):
+		""" hide progress, report and refresh once a chunked apply ends
+		"""
+		self.chunkTimer.stop()
+
+		job = self.chunkedApply
+		outliner, wireframe, list = self.chunkedRefresh
+		self.chunkedApply = None
+		self.chunkedRefresh = None
+
+		self.showProgress(False)
+
+		if job.cancelled:
+			self.statusLabel.setText("Cancelled, changes rolled back")
+		else:
+			self.statusLabel.setText("{0} writes, {1} nodes/s".format(job.done, int(job.nodesPerSecond())))
+
+		ctool.refreshMayaUI(outliner=outliner, wireframe=wireframe, list=list)
+
+
+
+
+	def showProgress(self, visible):
+		""" show or hide the progress row, the window height follows the layout
+		"""
+		self.progressBar.setVisible(visible)
+		self.cancelBtn.setVisible(visible)
+
+		self.setFixedSize(230, self.gridLayout.sizeHint().height())
+
+
+
+
+	def loadPalette(self, path):
+		""" Palette of the JSON file at path, None for '' or a file that can't be read
+		"""
+		if not path:
+			return None
+
+		try:
+			return ctool.Palette.fromJson(path)
+		except (IOError, OSError, ValueError) as e:
+			_logger.error("Could not load palette {0}: {1}".format(path, e))
+			return None
+
+
+
+
+	def setPalette(self, path):
+		""" show the palette file at path, '' goes back to the index colors
+		"""
+		palette = self.loadPalette(path)
+		if path and palette is None:
+			return
+
+		self.palette = palette
+		self.taggingButtonGrp.setColorPalette(palette or ctool.PALETTE)
+		self.indexPaletteBtn.setEnabled(palette is not None)
+		ctool.setSetting('paletteFile', path)
+
+		self.setFixedSize(230, self.gridLayout.sizeHint().height())
+
+
+
+
+	def loadPaletteBtnClicked(self):
+		path, unused = qtToolInstance.QFileDialog.getOpenFileName(self, "Load Palette", ctool.getSetting('paletteFile'), "Palette (*.json)")
+
+		if path:
+			self.setPalette(path)
+
+
+
+
+	def indexPaletteBtnClicked(self):
+		self.setPalette('')
+
+
+
+
+	def showPlanStatus(self, plan):
+		""" show how many writes a click made and how many were skipped
+		"""
+		self.statusLabel.setText("{0} writes, {1} skipped".format(plan.writeCount(), plan.skipped))
+
+
+
+
+	def outlinerCheckboxToggled(self):
+		""" check if outliner checkbox is enable
+		"""
+		enable = self.outlinerCheckbox.isChecked()
+
+		if enable != self.outlinerEnable:
+			ctool.setSetting('outliner', enable)
+
+		self.outlinerEnable = enable
+		_logger.debug("outlinerEnable: %s", self.outlinerEnable)
+
+
+
+
+	def wireframeCheckboxToggled(self):
+		""" check if wireframe checkbox is enable
+		"""
+		enable = self.wireframeCheckbox.isChecked()
+
+		if enable != self.wireframeEnable:
+			ctool.setSetting('wireframe', enable)
+
+		self.wireframeEnable = enable
+		_logger.debug("wireframeEnable: %s", self.wireframeEnable)
+
+
+
+
+	def hierarchyCheckboxToggled(self):
+		""" check if hierarchy checkbox is enable
+		"""
+		self.hierarchyEnable = self.hierarchyCheckbox.isChecked()
+		ctool.setSetting('hierarchy', self.hierarchyEnable)
+		_logger.debug("hierarchyEnable: %s", self.hierarchyEnable)
+
+
+
+
+	def minimalCheckboxToggled(self):
+		""" check if minimal wireframe writes checkbox is enable
+		"""
+		self.minimalEnable = self.minimalCheckbox.isChecked()
+		ctool.setSetting('minimal', self.minimalEnable)
+		_logger.debug("minimalEnable: %s", self.minimalEnable)
+
+
+
+
+	def tagTableCheckboxToggled(self):
+		""" check if save tags in scene checkbox is enable
+		"""
+		self.tagTableEnable = self.tagTableCheckbox.isChecked()
+		ctool.enableTagTable(self.tagTableEnable)
+		_logger.debug("tagTableEnable: %s", self.tagTableEnable)
+
+
+
+
+	def toggleWireframeColor(self, colorIndex = None):
+		""" toggle wireframe color based on colorIndex
+		"""
+
+		buttonToToggle = self.wireframeButtonGrp.button(colorIndex)
+		buttonToToggle.setChecked(True)
+
+
+
+
+	def toggleOutlinerColor(self, colorIndex = None):
+		""" toggle outliner color based on colorIndex
+		"""
+
+		buttonToToggle = self.taggingButtonGrp.button(colorIndex)
+		buttonToToggle.setChecked(True)
+
+
+
+
+
+
+
+
+# ==================== PALETTE WIDGET ====================
+
+class PaletteWidget(qtToolInstance.QWidget):
+	""" palette grid painted from one cached pixmap, with hit-testing instead of child buttons
+	keeps the QButtonGroup calls the dialog uses: checkedId, button(id), buttonClicked
+	"""
+
+	buttonClicked = QtCore.Signal(int)
+	idClicked = QtCore.Signal(int)
+
+	# painted grids shared by every instance, keyed by colors and geometry
+	_atlasCache = {}
+
+
+	def __init__(self, palette, columns=8, cellSize=20, spacing=1, parent=None):
+		super(PaletteWidget, self).__init__(parent)
+
+		self.palette = palette
+		self.columns = columns
+		self.cellSize = cellSize
+		self.spacing = spacing
+
+		self._checkedId = -1
+		self._markedId = -1
+		self._hoverId = -1
+		self._pressedId = -1
+		self._exclusive = True
+
+		self.setMouseTracking(True)
+		self.updateSize()
+
+
+
+	# ---------- QButtonGroup style API ----------
+
+	def checkedId(self):
+		return self._checkedId
+
+
+
+	def checkedButton(self):
+		if self._checkedId < 0:
+			return None
+
+		return PaletteSwatch(self, self._checkedId)
+
+
+
+	def button(self, id):
+		if 0 <= id < len(self.palette):
+			return PaletteSwatch(self, id)
+
+		return None
+
+
+
+	def setExclusive(self, exclusive):
+		self._exclusive = exclusive
+
+
+
+	def exclusive(self):
+		return self._exclusive
+
+
+
+	def setChecked(self, id, checked=True):
+		""" check or uncheck id, the checked swatch can't be unchecked while exclusive
+		"""
+		if checked:
+			self._checkedId = id
+		elif id == self._checkedId and not self._exclusive:
+			self._checkedId = -1
+
+		self.update()
+
+
+
+	def click(self, id):
+		""" check id and emit the click signals, like QAbstractButton.click()
+		"""
+		self.setChecked(id)
+		self.buttonClicked.emit(id)
+		self.idClicked.emit(id)
+
+
+
+	def setMarkedId(self, id):
+		""" mark id as the last color used, -1 for none
+		"""
+		self._markedId = id if 0 <= id < len(self.palette) else -1
+		self.update()
+
+
+
+	def setColorPalette(self, palette):
+		""" show another palette, any size
+		"""
+		self.palette = palette
+		self._checkedId = -1
+		self._markedId = -1
+		self._hoverId = -1
+
+		self.updateSize()
+		self.update()
+
+
+
+	# ---------- painting ----------
+
+	def rows(self):
+		return (len(self.palette) + self.columns - 1) // self.columns
+
+
+
+	def updateSize(self):
+		step = self.cellSize + self.spacing
+		self.setFixedSize(self.columns * step - self.spacing, self.rows() * step - self.spacing)
+
+
+
+	def cellRect(self, id):
+		step = self.cellSize + self.spacing
+		return QtCore.QRect((id % self.columns) * step, (id // self.columns) * step, self.cellSize, self.cellSize)
+
+
+
+	def atlas(self):
+		""" the whole grid painted once, reused by every paint and every window
+		"""
+		key = (self.palette.hex, self.columns, self.cellSize, self.spacing)
+		pixmap = self._atlasCache.get(key)
+
+		if pixmap is None:
+			pixmap = QtGui.QPixmap(self.width(), self.height())
+			pixmap.fill(QtCore.Qt.transparent)
+
+			painter = QtGui.QPainter(pixmap)
+			colors = self.palette.qcolors()
+
+			for id in range(len(self.palette)):
+				rect = self.cellRect(id)
+
+				if colors[id] is None:
+					painter.fillRect(rect, QtGui.QColor(68, 68, 68))
+					painter.setPen(QtGui.QColor(255, 255, 255))
+					painter.drawText(rect, QtCore.Qt.AlignCenter, "X")
+				else:
+					painter.fillRect(rect, colors[id])
+
+			painter.end()
+			self._atlasCache[key] = pixmap
+
+		return pixmap
+
+
+
+	def paintEvent(self, event):
+		painter = QtGui.QPainter(self)
+		painter.drawPixmap(0, 0, self.atlas())
+
+		if self._hoverId >= 0:
+			painter.fillRect(self.cellRect(self._hoverId), QtGui.QColor(255, 255, 255, 60))
+
+		# small corner triangle on the last color used
+		if self._markedId > 0:
+			rect = self.cellRect(self._markedId)
+			size = self.cellSize // 3
+			corner = QtGui.QPolygon([rect.topLeft(), rect.topLeft() + QtCore.QPoint(size, 0), rect.topLeft() + QtCore.QPoint(0, size)])
+			painter.setPen(QtCore.Qt.NoPen)
+			painter.setBrush(QtGui.QColor(255, 255, 255))
+			painter.drawPolygon(corner)
+
+		if self._checkedId >= 0:
+			painter.setPen(QtGui.QPen(QtGui.QColor(255, 255, 255), 2))
+			painter.setBrush(QtCore.Qt.NoBrush)
+			painter.drawRect(self.cellRect(self._checkedId).adjusted(1, 1, -1, -1))
+
+		painter.end()
+
+
+
+	# ---------- hit-testing ----------
+
+	def idAt(self, pos):
+		""" palette index under pos, -1 on the gaps and outside the grid
+		"""
+		step = self.cellSize + self.spacing
+		column = pos.x() // step
+		row = pos.y() // step
+
+		if pos.x() < 0 or pos.y() < 0 or column >= self.columns:
+			return -1
+
+		if pos.x() % step >= self.cellSize or pos.y() % step >= self.cellSize:
+			return -1
+
+		id = row * self.columns + column
+		return id if id < len(self.palette) else -1
+
+
+
+	def setHoverId(self, id):
+		if id != self._hoverId:
+			for previous in (self._hoverId, id):
+				if previous >= 0:
+					self.update(self.cellRect(previous))
+
+			self._hoverId = id
+
+
+
+	def mouseMoveEvent(self, event):
+		self.setHoverId(self.idAt(event.pos()))
+
+
+
+	def leaveEvent(self, event):
+		self.setHoverId(-1)
+
+
+
+	def mousePressEvent(self, event):
+		if event.button() == QtCore.Qt.LeftButton:
+			self._pressedId = self.idAt(event.pos())
+
+
+
+	def mouseReleaseEvent(self, event):
+		id = self.idAt(event.pos())
+
+		if event.button() == QtCore.Qt.LeftButton and id >= 0 and id == self._pressedId:
+			self.click(id)
+
+		self._pressedId = -1
+
+
+
+	def event(self, event):
+		if event.type() == QtCore.QEvent.ToolTip:
+			id = self.idAt(event.pos())
+
+			if id > 0 and self.palette.hex[id]:
+				qtToolInstance.QToolTip.showText(event.globalPos(), "{0}  {1}".format(id, self.palette.hex[id]), self)
+			elif id == 0:
+				qtToolInstance.QToolTip.showText(event.globalPos(), "0  off", self)
+			else:
+				qtToolInstance.QToolTip.hideText()
+
+			return True
+
+		return super(PaletteWidget, self).event(event)
+
+
+
+
+class PaletteSwatch(object):
+	""" what PaletteWidget.button(id) returns, stands in for one checkable button
+	"""
+
+	def __init__(self, widget, id):
+		self.widget = widget
+		self.id = id
+
+
+
+	def isChecked(self):
+		return self.widget.checkedId() == self.id
+
+
+
+	def setChecked(self, checked):
+		self.widget.setChecked(self.id, checked)
+
+
+
+	def click(self):
+		self.widget.click(self.id)
+
+
+
+
+if MayaQWidgetDockableMixin is not None:
+
+	class ColorTaggingDock(MayaQWidgetDockableMixin, qtToolInstance.QWidget):
+		""" workspace control host for ColorTaggingUI, Maya keeps it when hidden
+		"""
+
+		def __init__(self, parent = None):
+			super(ColorTaggingDock, self).__init__(parent)
+
+			self.setObjectName(WINDOW_NAME)
+			self.setWindowTitle("COLOR TAGGING TOOL")
+
+			self.ui = ColorTaggingUI(parent=self, show=False)
+			self.ui.setObjectName(WINDOW_NAME + 'Content')
+			self.ui.setWindowFlags(QtCore.Qt.Widget)
+
+			layout = qtToolInstance.QVBoxLayout(self)
+			layout.setContentsMargins(0, 0, 0, 0)
+			layout.addWidget(self.ui)
+
+
+
+		def dockCloseEventTriggered(self):
+			# closing the workspace control gives the content no closeEvent of its own
+			self.ui.cancelBtnClicked()